@@ -0,0 +1,377 @@
+"""
+Akuisisi serial di proses anak dengan ring buffer shared memory.
+
+Di mode thread (default) pembaca serial berbagi GIL dengan Tk dan
+matplotlib: redraw panjang bisa menunda read sampai buffer OS penuh dan byte
+hilang tanpa jejak. Dengan acquisition="process" (config.ACQUISITION_MODE
+atau --acquisition process) port serial dimiliki proses anak yang hanya
+membaca, mem-parse dan menulis sampel ke multiprocessing.shared_memory:
+
+    header   counter (int64): posisi tulis/baca + statistik akuisisi
+    batch    ring BATCH_DTYPE: satu entri per burst (posisi sampel, waktu)
+    adc, di  ring SAMPLE_DTYPE: sampel hasil parse
+
+Proses engine membaca entri batch baru dan membuat SampleBatch yang array
+adc/di-nya adalah VIEW ke ring (tanpa salinan, tanpa pickle). Satu batch
+tidak pernah dipotong di ujung ring, jadi view selalu bersambung. View
+valid sampai ring berputar satu kali (ACQ_RING_SAMPLES sampel, puluhan
+menit pada laju firmware); konsumen yang tertinggal lebih dari itu
+melewati batch yang sudah tertimpa dan menghitungnya di ring_overruns.
+
+Proses anak membangunkan konsumen lewat pipe hanya saat konsumen sedang
+menunggu (sudah membaca semua batch), jadi tidak ada syscall per batch
+saat konsumen sibuk. Perintah ke MCU dikirim lewat pipe yang sama dan
+ditulis ke port oleh thread di proses anak; AcquisitionProcess punya
+write()/close()/is_open sehingga CommandWriter tidak berubah.
+
+Counter kehilangan data (ekspor Prometheus + panel statistik + log):
+
+    acq_dropped_bytes   byte dibuang LineReader (baris tanpa newline terlalu panjang)
+    acq_gaps            baris ADC yang hilang dari urutan channel ADC_Loop firmware
+                        (ADC0..ADC4, atau channel ADC_Mask terakhir yang dikirim)
+    acq_uart_overruns   overrun UART/driver dari TIOCGICOUNT (Linux; tidak ada jika port
+                        tidak mendukung, mis. pty)
+    acq_ring_overruns   batch tertimpa sebelum dibaca engine
+"""
+import multiprocessing
+import multiprocessing.connection
+import signal
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import serial
+
+from commands import parse_adc_mask_command
+from config import ADC_CHANNELS, ACQ_RING_SAMPLES, ACQ_RING_BATCHES
+from recording import open_port
+from samples import SampleBatch, SAMPLE_DTYPE
+from serial_reader import LineReader
+from telemetry import parse_buffer
+
+ACQ_START_TIMEOUT = 10.0 # Detik menunggu proses anak membuka port (termasuk spawn + import)
+COUNTER_INTERVAL = 1.0 # Detik antar pembaruan counter lambat (dropped bytes, UART)
+
+# Counter di header (indeks int64)
+(H_WRITE_BATCHES, H_READ_BATCHES, H_ADC_WRITTEN, H_DI_WRITTEN, H_BYTES, H_LINES, H_MALFORMED,
+ H_DROPPED_BYTES, H_GAPS, H_UART_OVERRUNS) = range(10)
+HEADER_SLOTS = 16
+
+BATCH_DTYPE = np.dtype([
+    ('adc_seq', 'i8'), ('di_seq', 'i8'), # Posisi absolut sampel pertama (seq % kapasitas = indeks ring)
+    ('adc_count', 'i4'), ('di_count', 'i4'),
+    ('malformed', 'i4'), ('nbytes', 'i4'),
+    ('received', 'f8'), ('t_read', 'f8'), ('t_parsed', 'f8'),
+], align=True)
+
+# Linux: struct serial_icounter_struct (cts, dsr, rng, dcd, rx, tx, frame, overrun, parity, brk, buf_overrun, ...)
+TIOCGICOUNT = 0x545D
+ICOUNT = struct.Struct("20i")
+
+
+class AcquisitionRing:
+    """View NumPy ke blok shared memory akuisisi (dipakai kedua proses)."""
+
+    def __init__(self, buf, samples=ACQ_RING_SAMPLES, batches=ACQ_RING_BATCHES):
+        self.samples = samples
+        self.batches = batches
+        offset = 0
+        self.header = np.ndarray(HEADER_SLOTS, dtype=np.int64, buffer=buf, offset=offset)
+        offset += self.header.nbytes
+        self.entries = np.ndarray(batches, dtype=BATCH_DTYPE, buffer=buf, offset=offset)
+        offset += self.entries.nbytes
+        self.adc = np.ndarray(samples, dtype=SAMPLE_DTYPE, buffer=buf, offset=offset)
+        offset += self.adc.nbytes
+        self.di = np.ndarray(samples, dtype=SAMPLE_DTYPE, buffer=buf, offset=offset)
+
+    @staticmethod
+    def size(samples=ACQ_RING_SAMPLES, batches=ACQ_RING_BATCHES):
+        return HEADER_SLOTS * 8 + batches * BATCH_DTYPE.itemsize + 2 * samples * SAMPLE_DTYPE.itemsize
+
+    def _store(self, ring, slot, records):
+        """Menyalin records ke ring tanpa memotong di ujung; mengembalikan seq awal."""
+        n = min(len(records), self.samples)
+        seq = int(self.header[slot])
+        pos = seq % self.samples
+        if pos + n > self.samples:
+            seq += self.samples - pos # Lompat ke awal ring
+            pos = 0
+        ring[pos:pos + n] = records[len(records) - n:]
+        return seq, n
+
+    def publish(self, batch, nbytes):
+        """Menulis satu batch (proses anak). Counter posisi diperbarui paling akhir."""
+        header = self.header
+        adc_seq, adc_count = self._store(self.adc, H_ADC_WRITTEN, batch.adc)
+        di_seq, di_count = self._store(self.di, H_DI_WRITTEN, batch.di)
+        index = int(header[H_WRITE_BATCHES])
+        self.entries[index % self.batches] = (adc_seq, di_seq, adc_count, di_count, batch.malformed, nbytes,
+                                              batch.received, batch.t_read, batch.t_parsed)
+        header[H_ADC_WRITTEN] = adc_seq + adc_count
+        header[H_DI_WRITTEN] = di_seq + di_count
+        header[H_BYTES] += nbytes
+        header[H_LINES] += len(batch) + batch.malformed
+        header[H_MALFORMED] += batch.malformed
+        header[H_WRITE_BATCHES] = index + 1
+        return index + 1
+
+    def release(self):
+        """Melepas view agar shared memory bisa ditutup."""
+        self.header = self.entries = self.adc = self.di = None
+
+
+class GapCounter:
+    """Menghitung baris ADC yang hilang dari urutan channel yang dikirim ADC_Loop (ADC_Mask)."""
+
+    def __init__(self, channels=range(ADC_CHANNELS)):
+        self.set_channels(channels)
+
+    def set_channels(self, channels):
+        """Urutan baru setelah ADC_Mask; dipanggil dari thread penulis perintah."""
+        position = np.full(256, -1, dtype=np.int64) # Channel -> posisi di urutan ADC_Loop
+        channels = sorted(channels)
+        position[channels] = np.arange(len(channels))
+        self._order = (position, len(channels)) # Satu assignment: aman dibaca thread lain
+        self.last = None
+
+    def count(self, adc_channels):
+        position, n = self._order
+        # Channel di luar mask (permintaan sekali ADCn) tidak ikut urutan
+        positions = position[adc_channels]
+        positions = positions[positions >= 0]
+        if n == 0 or len(positions) == 0:
+            return 0
+        previous = np.empty_like(positions)
+        previous[1:] = positions[:-1]
+        previous[0] = positions[0] - 1 if self.last is None else self.last
+        self.last = int(positions[-1])
+        return int(((positions - previous - 1) % n).sum())
+
+
+def uart_overruns(ser):
+    """Jumlah overrun UART + buffer driver (TIOCGICOUNT), atau None jika port tidak mendukung."""
+    try:
+        import fcntl
+        counts = ICOUNT.unpack(fcntl.ioctl(ser.fileno(), TIOCGICOUNT, bytes(ICOUNT.size)))
+    except (ImportError, AttributeError, OSError, ValueError):
+        return None
+    return counts[7] + counts[10]
+
+
+def acquisition_main(port, baud_rate, shm_name, samples, batches, conn, notify):
+    """Proses anak: buka port, baca + parse + publish ke ring sampai pipe perintah ditutup."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C ditangani proses engine (engine.stop menutup pipe)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = AcquisitionRing(shm.buf, samples, batches)
+    try:
+        ser = open_port(port, baud_rate, timeout=0.1)
+    except serial.SerialException as e:
+        conn.send(("error", str(e)))
+        ring.release()
+        shm.close()
+        return
+    conn.send(("open", None))
+    stop = threading.Event()
+    gaps = GapCounter()
+
+    def command_writer():
+        # Perintah dari CommandWriter di proses engine
+        while not stop.is_set():
+            try:
+                data = conn.recv_bytes()
+                ser.write(data)
+            except (EOFError, OSError, serial.SerialException):
+                break
+            for command in data.split():
+                channels = parse_adc_mask_command(command.decode('ascii', 'replace'))
+                if channels is not None:
+                    gaps.set_channels(channels)
+        stop.set()
+
+    threading.Thread(target=command_writer, daemon=True).start()
+    reader = LineReader(ser)
+    overruns_start = uart_overruns(ser)
+    next_counters = 0.0
+    header = ring.header
+    try:
+        while not stop.is_set():
+            try:
+                records = reader.read_records(timeout=0.1)
+            except (serial.SerialException, OSError, ValueError) as e:
+                conn.send(("error", str(e)))
+                break
+            now = time.monotonic()
+            if records:
+                batch, _ = parse_buffer(records)
+                batch.t_read = now
+                batch.t_parsed = time.monotonic()
+                header[H_GAPS] += gaps.count(batch.adc['channel'])
+                written = ring.publish(batch, len(records))
+                if header[H_READ_BATCHES] == written - 1:
+                    notify.send_bytes(b"") # Konsumen sedang menunggu batch ini
+            if now >= next_counters:
+                header[H_DROPPED_BYTES] = reader.dropped_bytes
+                overruns = uart_overruns(ser)
+                header[H_UART_OVERRUNS] = -1 if overruns is None or overruns_start is None else overruns - overruns_start
+                next_counters = now + COUNTER_INTERVAL
+    except (BrokenPipeError, EOFError):
+        pass # Proses engine sudah berhenti
+    finally:
+        stop.set()
+        ser.close()
+        ring.release()
+        shm.close()
+
+
+class AcquisitionProcess:
+    """
+    Sisi engine: proses anak akuisisi + ring shared memory. Menggantikan
+    serial.Serial untuk CommandWriter (write, close, is_open, port) dan
+    LineReader untuk engine (read_batch). Melempar serial.SerialException
+    jika proses anak gagal membuka port.
+    """
+
+    def __init__(self, port, baud_rate, samples=ACQ_RING_SAMPLES, batches=ACQ_RING_BATCHES):
+        self.port = port
+        self.baudrate = baud_rate
+        self.is_open = False
+        self.ring_overruns = 0 # Batch tertimpa sebelum dibaca
+        self.error = None
+        self.last_nbytes = 0 # Byte serial batch terakhir yang dibaca (metrik 'bytes')
+        self._next = 0 # Batch berikutnya yang dibaca
+        self._shm = shared_memory.SharedMemory(create=True, size=AcquisitionRing.size(samples, batches))
+        self.ring = AcquisitionRing(self._shm.buf, samples, batches)
+        self.ring.header[:] = 0
+
+        # spawn: proses anak bersih, tanpa state Tk/thread proses induk (juga satu-satunya pilihan di Windows)
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._notify, child_notify = context.Pipe(duplex=False)
+        self._process = context.Process(target=acquisition_main, daemon=True, name=f"acq-{port}",
+                                        args=(port, baud_rate, self._shm.name, samples, batches, child_conn, child_notify))
+        self._process.start()
+        child_conn.close()
+        child_notify.close()
+        self._write_lock = threading.Lock()
+
+        reply = None
+        if self._conn.poll(ACQ_START_TIMEOUT):
+            try:
+                reply = self._conn.recv()
+            except EOFError:
+                pass
+        if reply is None or reply[0] != "open":
+            self._cleanup()
+            raise serial.SerialException(reply[1] if reply else f"proses akuisisi untuk {port} tidak merespons")
+        self.is_open = True
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    def write(self, data):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        with self._write_lock:
+            self._conn.send_bytes(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _check_alive(self):
+        """Melempar SerialException jika proses anak melaporkan error atau mati."""
+        try:
+            while self._conn.poll():
+                kind, message = self._conn.recv()
+                if kind == "error":
+                    self.error = message
+        except (EOFError, OSError):
+            pass
+        if self.error is not None:
+            raise serial.SerialException(self.error)
+        if not self._process.is_alive():
+            raise serial.SerialException(f"proses akuisisi berhenti (exit code {self._process.exitcode})")
+
+    def read_batch(self, timeout=0.1):
+        """
+        SampleBatch berikutnya dari ring (array adc/di berupa view ke shared
+        memory), atau None jika tidak ada batch baru sampai timeout.
+        """
+        ring = self.ring
+        header = ring.header
+        if self._next >= header[H_WRITE_BATCHES]:
+            multiprocessing.connection.wait([self._notify, self._conn], timeout)
+            try:
+                while self._notify.poll():
+                    self._notify.recv_bytes()
+            except (EOFError, OSError):
+                pass # Proses anak berhenti; dilaporkan _check_alive
+            if self._next >= header[H_WRITE_BATCHES]:
+                self._check_alive()
+                return None
+        written = int(header[H_WRITE_BATCHES])
+        if written - self._next > ring.batches // 2:
+            # Tertinggal lebih dari setengah ring: lompat ke batch yang pasti belum tertimpa
+            skip = written - ring.batches // 2
+            self.ring_overruns += skip - self._next
+            self._next = skip
+        entry = ring.entries[self._next % ring.batches].copy()
+        self._next += 1
+        header[H_READ_BATCHES] = self._next
+        adc = self._view(ring.adc, int(entry['adc_seq']), int(entry['adc_count']), header[H_ADC_WRITTEN])
+        di = self._view(ring.di, int(entry['di_seq']), int(entry['di_count']), header[H_DI_WRITTEN])
+        if adc is None or di is None:
+            self.ring_overruns += 1
+            return SampleBatch(received=float(entry['received']))
+        batch = SampleBatch(adc, di, float(entry['received']), int(entry['malformed']))
+        batch.t_read = float(entry['t_read'])
+        batch.t_parsed = float(entry['t_parsed'])
+        self.last_nbytes = int(entry['nbytes'])
+        return batch
+
+    def _view(self, ring, seq, count, written):
+        if written - seq > self.ring.samples:
+            return None # Sudah tertimpa
+        pos = seq % self.ring.samples
+        return ring[pos:pos + count]
+
+    def counters(self):
+        """Counter akuisisi untuk metrik dan panel statistik."""
+        header = self.ring.header
+        if header is None:
+            return {}
+        counters = {
+            'acq_dropped_bytes': int(header[H_DROPPED_BYTES]),
+            'acq_gaps': int(header[H_GAPS]),
+            'acq_ring_overruns': self.ring_overruns,
+        }
+        uart_overruns = int(header[H_UART_OVERRUNS])
+        if uart_overruns >= 0: # -1: TIOCGICOUNT tidak didukung (mis. pty), counter tidak dilaporkan
+            counters['acq_uart_overruns'] = uart_overruns
+        return counters
+
+    def close(self):
+        if not self.is_open:
+            return
+        self.is_open = False
+        self._conn.close() # Proses anak berhenti saat pipe perintah tertutup
+        self._process.join(timeout=1.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._cleanup()
+
+    def _cleanup(self):
+        for conn in (self._conn, self._notify):
+            conn.close()
+        if self._process.is_alive():
+            self._process.terminate()
+        self.ring.release()
+        try:
+            self._shm.close()
+        except BufferError:
+            pass # Masih ada batch (view) yang dipegang konsumen; dilepas saat di-GC
+        self._shm.unlink()
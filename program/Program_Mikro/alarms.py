@@ -0,0 +1,304 @@
+"""
+Mesin alarm inkremental: aturan operator atas channel ADC / DI mana pun.
+
+Setiap aturan menyimpan state jendela geser sendiri, jadi evaluasi satu
+sampel O(1) (amortized): tidak bergantung panjang jendela, histori atau
+jumlah aturan di channel lain.
+
+    above    threshold, hold_s         nilai > threshold terus-menerus selama hold_s detik
+    below    threshold, hold_s         nilai < threshold terus-menerus selama hold_s detik
+    rate     rate_per_min, window_s    kemiringan regresi linear di jendela > rate_per_min
+                                       (satuan per menit; jumlah t, v, t*v, t*t bergulir)
+    stuck    tolerance, window_s       selama pompa jalan, max - min di jendela <= tolerance
+                                       (min/max bergulir dengan deque monoton)
+    chatter  changes, window_s         >= changes perubahan nilai dalam window_s detik
+
+Nilai ADC dalam satuan fisik hasil kalibrasi (m, Bar), DI 0/1. Aturan melihat
+batch terfilter (nilai yang sama dengan kontrol dan tampilan), kecuali chatter
+yang melihat sampel mentah (debounce justru menyembunyikan chatter). DI hanya
+dikirim firmware dengan DI_Loop atau INn.
+
+Alarm aktif saat kondisi terpenuhi dan selesai saat kondisi hilang; setiap
+perubahan diteruskan ke on_alarm(Alarm). PumpEngine meneruskannya ke log,
+arsip (archive.CODE_ALARM, value = id aturan) dan subscriber (event "alarm").
+Konfigurasi: config.ALARM_RULES atau "alarms" per stasiun di stations.json;
+"id" opsional (bawaan: urutan 1, 2, ...):
+
+    [{"name": "level_tinggi", "type": "above", "channel": "ADC0", "threshold": 1.5, "hold_s": 10},
+     {"name": "level_naik_cepat", "type": "rate", "channel": "ADC0", "rate_per_min": 0.3, "window_s": 60},
+     {"name": "pressure_macet", "type": "stuck", "channel": "ADC1", "tolerance": 0.05, "window_s": 30},
+     {"name": "chatter_in0", "type": "chatter", "channel": "IN0", "changes": 6, "window_s": 10}]
+"""
+import collections
+
+from filters import parse_channel
+from samples import KIND_ADC
+
+
+class Alarm:
+    """Satu perubahan status alarm (aktif / selesai)."""
+
+    __slots__ = ('rule_id', 'name', 'channel', 'active', 'timestamp', 'value', 'message')
+
+    def __init__(self, rule_id, name, channel, active, timestamp, value, message):
+        self.rule_id = rule_id
+        self.name = name
+        self.channel = channel # Nama channel, mis. "ADC0"
+        self.active = active
+        self.timestamp = timestamp # Waktu sampel pemicu (epoch detik)
+        self.value = value
+        self.message = message
+
+
+class Rule:
+    """Basis aturan: update() per sampel mengembalikan apakah kondisi alarm terpenuhi."""
+
+    uses_raw = False # True: dievaluasi pada sampel sebelum filter
+
+    def __init__(self, rule_id, name, channel):
+        self.id = rule_id
+        self.name = name
+        self.channel = channel
+        self.kind, self.ch = parse_channel(channel)
+        self.active = False
+
+    def update(self, t, value, pump_running):
+        raise NotImplementedError
+
+    def describe(self, value):
+        return f"{self.channel} = {value:g}"
+
+
+class ThresholdRule(Rule):
+    """Nilai di atas (atau di bawah) threshold terus-menerus selama hold_s detik."""
+
+    def __init__(self, rule_id, name, channel, threshold, hold_s=0.0, above=True):
+        super().__init__(rule_id, name, channel)
+        self.threshold = threshold
+        self.hold_s = hold_s
+        self.above = above
+        self._since = None # Awal kondisi terpenuhi tanpa putus
+
+    def update(self, t, value, pump_running):
+        if (value > self.threshold) if self.above else (value < self.threshold):
+            if self._since is None:
+                self._since = t
+            return t - self._since >= self.hold_s
+        self._since = None
+        return False
+
+    def describe(self, value):
+        sign = ">" if self.above else "<"
+        return f"{self.channel} = {value:.2f} {sign} {self.threshold:g} selama {self.hold_s:g} s"
+
+
+class RateRule(Rule):
+    """Kemiringan regresi linear atas window_s detik terakhir di atas rate_per_min."""
+
+    def __init__(self, rule_id, name, channel, rate_per_min, window_s=60.0, min_span_s=None):
+        super().__init__(rule_id, name, channel)
+        self.rate_per_min = rate_per_min
+        self.window_s = window_s
+        # Jendela yang terlalu pendek (baru mulai) memberi kemiringan yang berisik
+        self.min_span_s = window_s / 2 if min_span_s is None else min_span_s
+        self.slope = None # Satuan per detik, hasil update terakhir
+        self._samples = collections.deque() # (t - t0, nilai)
+        self._t0 = None
+        self._sums = [0.0, 0.0, 0.0, 0.0] # x, v, x*v, x*x dengan x = t - t0
+        self._evicted = 0
+
+    def _rebase(self):
+        """Hitung ulang jumlah dengan t0 baru agar x tetap kecil (presisi float)."""
+        shift = self._samples[0][0]
+        self._t0 += shift
+        self._samples = collections.deque((x - shift, v) for x, v in self._samples)
+        sums = [0.0, 0.0, 0.0, 0.0]
+        for x, v in self._samples:
+            sums[0] += x
+            sums[1] += v
+            sums[2] += x * v
+            sums[3] += x * x
+        self._sums = sums
+        self._evicted = 0
+
+    def update(self, t, value, pump_running):
+        if self._t0 is None:
+            self._t0 = t
+        samples, sums = self._samples, self._sums
+        x = t - self._t0
+        samples.append((x, value))
+        sums[0] += x
+        sums[1] += value
+        sums[2] += x * value
+        sums[3] += x * x
+        while x - samples[0][0] > self.window_s:
+            old_x, old_v = samples.popleft()
+            sums[0] -= old_x
+            sums[1] -= old_v
+            sums[2] -= old_x * old_v
+            sums[3] -= old_x * old_x
+            self._evicted += 1
+        # Setiap sampel dihitung ulang paling banyak sekali per len(jendela) eviction: tetap O(1) amortized
+        if self._evicted >= len(samples):
+            self._rebase()
+            sums = self._sums
+        self.slope = None
+        if samples[-1][0] - samples[0][0] < self.min_span_s:
+            return False
+        n = len(samples)
+        denominator = n * sums[3] - sums[0] * sums[0]
+        if denominator <= 0:
+            return False
+        self.slope = (n * sums[2] - sums[0] * sums[1]) / denominator
+        return self.slope * 60 > self.rate_per_min
+
+    def describe(self, value):
+        rate = "-" if self.slope is None else f"{self.slope * 60:.3f}"
+        return f"{self.channel} naik {rate}/menit (batas {self.rate_per_min:g}/menit, jendela {self.window_s:g} s)"
+
+
+class StuckRule(Rule):
+    """Selama pompa jalan, nilai tidak bergerak lebih dari tolerance selama window_s detik."""
+
+    def __init__(self, rule_id, name, channel, tolerance, window_s=30.0):
+        super().__init__(rule_id, name, channel)
+        self.tolerance = tolerance
+        self.window_s = window_s
+        self._reset()
+
+    def _reset(self):
+        self._start = None # Awal pompa jalan tanpa putus
+        self._min = collections.deque() # (t, nilai) naik: depan = minimum jendela
+        self._max = collections.deque() # (t, nilai) turun: depan = maksimum jendela
+
+    def update(self, t, value, pump_running):
+        if not pump_running:
+            if self._start is not None:
+                self._reset()
+            return False
+        if self._start is None:
+            self._start = t
+        low, high = self._min, self._max
+        while low and low[-1][1] >= value:
+            low.pop()
+        low.append((t, value))
+        while high and high[-1][1] <= value:
+            high.pop()
+        high.append((t, value))
+        cutoff = t - self.window_s
+        while low[0][0] < cutoff:
+            low.popleft()
+        while high[0][0] < cutoff:
+            high.popleft()
+        return t - self._start >= self.window_s and high[0][1] - low[0][1] <= self.tolerance
+
+    def describe(self, value):
+        return f"{self.channel} macet di {value:.2f} (< {self.tolerance:g} dalam {self.window_s:g} s) saat pompa jalan"
+
+
+class ChatterRule(Rule):
+    """Paling sedikit `changes` perubahan nilai dalam window_s detik (kontak / kabel goyang)."""
+
+    uses_raw = True
+
+    def __init__(self, rule_id, name, channel, changes=6, window_s=10.0):
+        super().__init__(rule_id, name, channel)
+        self.changes = changes
+        self.window_s = window_s
+        self._last = None
+        self._times = collections.deque() # Waktu perubahan di jendela
+
+    def update(self, t, value, pump_running):
+        times = self._times
+        if self._last is not None and value != self._last:
+            times.append(t)
+        self._last = value
+        cutoff = t - self.window_s
+        while times and times[0] < cutoff:
+            times.popleft()
+        return len(times) >= self.changes
+
+    def describe(self, value):
+        return f"{self.channel} berubah {len(self._times)}x dalam {self.window_s:g} s"
+
+
+class BelowRule(ThresholdRule):
+    """Nilai di bawah threshold terus-menerus selama hold_s detik."""
+
+    def __init__(self, rule_id, name, channel, threshold, hold_s=0.0):
+        super().__init__(rule_id, name, channel, threshold, hold_s, above=False)
+
+
+RULE_TYPES = {
+    "above": ThresholdRule,
+    "below": BelowRule,
+    "rate": RateRule,
+    "stuck": StuckRule,
+    "chatter": ChatterRule,
+}
+
+
+def make_rule(spec, default_id):
+    """Aturan dari satu entri konfigurasi {"name", "type", "channel", parameter...}."""
+    params = dict(spec)
+    kind = params.pop("type")
+    if kind not in RULE_TYPES:
+        raise ValueError(f"Tipe aturan alarm tidak dikenal: {kind}")
+    rule_id = params.pop("id", default_id)
+    channel = params.pop("channel")
+    name = params.pop("name", f"{kind}_{channel}")
+    return RULE_TYPES[kind](rule_id, name, channel, **params)
+
+
+class AlarmEngine:
+    """Semua aturan alarm satu engine, dikelompokkan per channel."""
+
+    def __init__(self, specs=None, on_alarm=None, calibration=None):
+        self.rules = [make_rule(spec, i + 1) for i, spec in enumerate(specs or [])]
+        self.on_alarm = on_alarm # callback(Alarm) untuk setiap perubahan status
+        self.calibration = calibration # Konversi ADC ke satuan fisik (None = nilai mentah)
+        self.raised = 0
+        self._groups = {} # (kind, ch, uses_raw) -> [Rule]
+        for rule in self.rules:
+            self._groups.setdefault((rule.kind, rule.ch, rule.uses_raw), []).append(rule)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def active(self):
+        """Aturan yang alarmnya sedang aktif."""
+        return [rule for rule in self.rules if rule.active]
+
+    def _values(self, kind, ch, records):
+        if kind == KIND_ADC and self.calibration is not None:
+            return self.calibration.convert_array(ch, records['value']).tolist()
+        return records['value'].tolist()
+
+    def feed(self, batch, raw=None, pump_running=False):
+        """
+        Mengevaluasi semua aturan untuk setiap sampel batch (terfilter); raw =
+        batch sebelum filter untuk aturan chatter. pump_running berlaku untuk
+        seluruh batch.
+        """
+        raw = batch if raw is None else raw
+        for (kind, ch, uses_raw), rules in self._groups.items():
+            records = (raw if uses_raw else batch).channel(ch, kind)
+            if not len(records):
+                continue
+            timestamps = records['timestamp'].tolist()
+            values = self._values(kind, ch, records)
+            for rule in rules:
+                update = rule.update
+                for t, value in zip(timestamps, values):
+                    if update(t, value, pump_running) != rule.active:
+                        self._transition(rule, t, value)
+
+    def _transition(self, rule, t, value):
+        rule.active = not rule.active
+        if rule.active:
+            self.raised += 1
+            message = f"ALARM {rule.name}: {rule.describe(value)}"
+        else:
+            message = f"Alarm {rule.name} selesai ({rule.channel} = {value:g})"
+        if self.on_alarm is not None:
+            self.on_alarm(Alarm(rule.id, rule.name, rule.channel, rule.active, t, value, message))
@@ -0,0 +1,299 @@
+"""
+Arsip telemetri on-disk: append-only, kolumnar, memory-mapped, dengan rotasi.
+
+Setiap segmen adalah satu file berisi header + tiga kolom lebar-tetap:
+
+    [header 64 byte][timestamp f8 x N][code u1 x N][value u2 x N]
+
+code membedakan jenis record: ADCn = n, INn = 16 + n, perintah OUTn = 32 + n
+(value = state 0/1), alarm selesai / aktif = 48 / 49 (value = id aturan,
+lihat alarms.py). Segmen dialokasikan N record di awal dan dipetakan ke
+memori; penulisan hanyalah salinan array ke kolom, lalu jumlah record di
+header diperbarui SETELAH datanya ditulis, sehingga pembaca bisa membaca
+segmen yang sedang ditulis tanpa melihat record setengah jadi.
+
+Header juga menyimpan timestamp minimum / maksimum segmen dan tanda apakah
+record di segmen urut waktu (diperbarui sebelum jumlah record). Pembaca
+melewati segmen di luar rentang hanya dari header (64 byte), dan memakai
+searchsorted (view tanpa salinan) pada segmen yang urut; mask dan argsort
+hanya untuk segmen yang tidak urut (perintah / alarm dari thread lain bisa
+masuk setelah batch yang lebih baru).
+
+Segmen dirotasi saat penuh (ARCHIVE_SEGMENT_RECORDS) atau sudah terlalu lama
+(ARCHIVE_SEGMENT_SECONDS). Penulisan dilakukan oleh thread ArchiveWriter
+sendiri; engine hanya memasukkan batch ke queue (tidak pernah menunggu disk).
+"""
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from config import ARCHIVE_SEGMENT_RECORDS, ARCHIVE_SEGMENT_SECONDS
+from samples import KIND_ADC
+
+MAGIC = b"BASARC1\0"
+HEADER = struct.Struct("<8sQQdddQ") # magic, capacity, count, waktu dibuat, t_min, t_max, urut
+HEADER_SIZE = 64
+COUNT_OFFSET = 16
+BOUNDS_OFFSET = 32
+ORDERED_OFFSET = 48
+
+CODE_ADC = 0
+CODE_DI = 16
+CODE_OUT = 32
+CODE_ALARM = 48 # + 0 selesai, + 1 aktif
+
+WRITER_QUEUE_SIZE = 1024 # Batch yang boleh antri sebelum dibuang
+FLUSH_INTERVAL = 5.0 # Detik antar msync ke disk
+
+
+def record_code(kind, channel):
+    return (CODE_ADC if kind == KIND_ADC else CODE_DI) + channel
+
+
+class Segment:
+    """Satu file segmen arsip yang dipetakan ke memori."""
+
+    def __init__(self, path, capacity=None, created=None):
+        self.path = path
+        if capacity is not None:
+            # Segmen baru: buat file dan tulis header
+            capacity = (capacity + 7) // 8 * 8 # Jaga alignment kolom
+            size = HEADER_SIZE + capacity * (8 + 1 + 2)
+            with open(path, "wb") as f:
+                f.truncate(size)
+                f.write(HEADER.pack(MAGIC, capacity, 0, time.time() if created is None else created,
+                                    np.inf, -np.inf, 1))
+            mode = "r+"
+        else:
+            mode = "r"
+        self._mm = np.memmap(path, dtype=np.uint8, mode=mode)
+        magic, self.capacity, _, self.created, _, _, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Bukan file arsip BAS: {path}")
+        n = self.capacity
+        self._count = self._mm[COUNT_OFFSET:COUNT_OFFSET + 8].view(np.uint64)
+        self._bounds = self._mm[BOUNDS_OFFSET:BOUNDS_OFFSET + 16].view(np.float64) # t_min, t_max
+        self._ordered = self._mm[ORDERED_OFFSET:ORDERED_OFFSET + 8].view(np.uint64)
+        self.timestamps = self._mm[HEADER_SIZE:HEADER_SIZE + 8 * n].view(np.float64)
+        self.codes = self._mm[HEADER_SIZE + 8 * n:HEADER_SIZE + 9 * n]
+        self.values = self._mm[HEADER_SIZE + 9 * n:HEADER_SIZE + 11 * n].view(np.uint16)
+
+    @property
+    def count(self):
+        return int(self._count[0])
+
+    @property
+    def free(self):
+        return self.capacity - self.count
+
+    @property
+    def ordered(self):
+        return bool(self._ordered[0])
+
+    def append(self, timestamps, codes, values):
+        """Menulis record di belakang; rentang waktu lalu jumlah record diperbarui terakhir."""
+        start = self.count
+        end = start + len(timestamps)
+        self.timestamps[start:end] = timestamps
+        self.codes[start:end] = codes
+        self.values[start:end] = values
+        t_min, t_max = self._bounds
+        if self._ordered[0] and (timestamps[0] < t_max or np.any(timestamps[1:] < timestamps[:-1])):
+            self._ordered[0] = 0
+        self._bounds[0] = min(t_min, timestamps.min())
+        self._bounds[1] = max(t_max, timestamps.max())
+        self._count[0] = end
+
+    def columns(self):
+        """View (timestamps, codes, values) untuk record yang sudah ditulis, tanpa salinan."""
+        n = self.count
+        return self.timestamps[:n], self.codes[:n], self.values[:n]
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self.flush()
+        del self._mm
+
+
+class ArchiveWriter:
+    """Thread penulis arsip. submit_*() tidak pernah blocking."""
+
+    def __init__(self, directory, segment_records=ARCHIVE_SEGMENT_RECORDS, segment_seconds=ARCHIVE_SEGMENT_SECONDS):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.segment_seconds = segment_seconds
+        self.dropped_batches = 0 # Batch yang dibuang karena queue penuh
+        self.records_written = 0
+        self._queue = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+        self._segment = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return # Sudah berjalan (mis. port serial dibuka ulang)
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None) # Tanda berhenti (boleh menunggu, hanya saat shutdown)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def pending(self):
+        """Jumlah item yang menunggu ditulis."""
+        return self._queue.qsize()
+
+    def _submit(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped_batches += 1
+
+    def submit_batch(self, batch):
+        """Antrikan semua sampel ADC/DI dari satu SampleBatch."""
+        if len(batch):
+            self._submit(batch)
+
+    def submit_command(self, output, state, timestamp=None):
+        """Antrikan satu perintah OUTn (output 1..4, state 0/1); timestamp = waktu benar-benar ditulis ke port."""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._submit((timestamp, CODE_OUT + output, state))
+
+    def submit_alarm(self, rule_id, active, timestamp=None):
+        """Antrikan satu perubahan status alarm (id aturan, aktif / selesai)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        self._submit((timestamp, CODE_ALARM + int(bool(active)), rule_id))
+
+    def _run(self):
+        next_flush = time.monotonic() + FLUSH_INTERVAL
+        while True:
+            try:
+                item = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item != ():
+                self._write_item(item)
+            if time.monotonic() >= next_flush and self._segment is not None:
+                self._segment.flush()
+                next_flush = time.monotonic() + FLUSH_INTERVAL
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write_item(self, item):
+        if isinstance(item, tuple):
+            timestamps = np.array([item[0]])
+            codes = np.array([item[1]], dtype=np.uint8)
+            values = np.array([item[2]], dtype=np.uint16)
+        else:
+            adc, di = item.adc, item.di
+            timestamps = np.concatenate((adc['timestamp'], di['timestamp']))
+            codes = np.concatenate((adc['channel'] + CODE_ADC, di['channel'] + CODE_DI)).astype(np.uint8)
+            values = np.concatenate((adc['value'], di['value']))
+            if len(di) and len(adc):
+                # Kolom ADC lalu DI: urutkan agar record satu batch urut waktu di segmen
+                order = np.argsort(timestamps, kind='stable')
+                timestamps, codes, values = timestamps[order], codes[order], values[order]
+        while len(timestamps):
+            segment = self._current_segment(timestamps[0])
+            n = min(segment.free, len(timestamps))
+            segment.append(timestamps[:n], codes[:n], values[:n])
+            self.records_written += n
+            timestamps, codes, values = timestamps[n:], codes[n:], values[n:]
+
+    def _current_segment(self, timestamp):
+        segment = self._segment
+        if segment is not None and segment.free > 0 and timestamp - segment.created < self.segment_seconds:
+            return segment
+        if segment is not None:
+            segment.close()
+        name = time.strftime("seg-%Y%m%d-%H%M%S", time.localtime(timestamp))
+        path = os.path.join(self.directory, f"{name}-{int(timestamp * 1000) % 1000:03d}.basarc")
+        self._segment = Segment(path, self.segment_records, created=timestamp)
+        return self._segment
+
+
+class ArchiveReader:
+    """Membaca arsip (termasuk segmen yang sedang ditulis) lewat memory map."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def segment_paths(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(".basarc"))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def segments(self):
+        for path in self.segment_paths():
+            yield Segment(path)
+
+    def read_parts(self, t_start=None, t_end=None, code=None):
+        """
+        Per segmen yang beririsan dengan t_start <= t < t_end: (timestamps,
+        codes, values, urut). Segmen di luar rentang dilewati hanya dari
+        header; pada segmen urut hasilnya view memory map tanpa salinan
+        (kecuali filter code).
+        """
+        for path in self.segment_paths():
+            with open(path, "rb") as f:
+                magic, _, count, _, t_min, t_max, _ = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or count == 0:
+                continue
+            legacy = t_min == t_max == 0.0 # Segmen format lama tanpa rentang: dibaca dengan mask
+            if not legacy and ((t_end is not None and t_min >= t_end) or (t_start is not None and t_max < t_start)):
+                continue
+            segment = Segment(path)
+            timestamps, codes, values = segment.columns()
+            ordered = segment.ordered and not legacy
+            if ordered:
+                lo = 0 if t_start is None else int(np.searchsorted(timestamps, t_start, side='left'))
+                hi = len(timestamps) if t_end is None else int(np.searchsorted(timestamps, t_end, side='left'))
+                timestamps, codes, values = timestamps[lo:hi], codes[lo:hi], values[lo:hi]
+                mask = None if code is None else codes == code
+            else:
+                mask = np.ones(len(timestamps), dtype=bool)
+                if t_start is not None:
+                    mask &= timestamps >= t_start
+                if t_end is not None:
+                    mask &= timestamps < t_end
+                if code is not None:
+                    mask &= codes == code
+            if mask is not None:
+                timestamps, codes, values = timestamps[mask], codes[mask], values[mask]
+            if len(timestamps):
+                yield timestamps, codes, values, ordered
+
+    def read(self, t_start=None, t_end=None, code=None):
+        """
+        Mengembalikan (timestamps, codes, values) untuk t_start <= t < t_end,
+        opsional hanya untuk satu code (mis. record_code(KIND_ADC, 0)), urut
+        waktu. Jika rentang hanya mengenai satu segmen urut, hasilnya view
+        memory map; beberapa segmen digabung (salinan), lihat read_parts()
+        untuk hasil per segmen tanpa salinan.
+        """
+        parts = []
+        needs_sort = False
+        for timestamps, codes, values, ordered in self.read_parts(t_start, t_end, code):
+            if not ordered or (parts and timestamps[0] < parts[-1][0][-1]):
+                needs_sort = True
+            parts.append((timestamps, codes, values))
+        if not parts:
+            return np.zeros(0), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint16)
+        if len(parts) == 1:
+            timestamps, codes, values = parts[0]
+        else:
+            timestamps, codes, values = (np.concatenate(column) for column in zip(*parts))
+        if needs_sort:
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, codes, values = timestamps[order], codes[order], values[order]
+        return timestamps, codes, values
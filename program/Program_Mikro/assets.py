@@ -0,0 +1,176 @@
+"""
+Aset gambar GUI: dicari relatif terhadap paket dan di-decode saat dipakai.
+
+AssetManager.get(nama) membuat PhotoImage hanya saat gambar itu pertama kali
+dibutuhkan tampilan (panel log/grafik dan gambar status pompa ON tidak
+di-decode sampai ditampilkan) lalu menyimpannya di cache.
+
+Semua gambar dibaca dari SATU file bundle (config.ASSET_BUNDLE_PATH) yang
+di-mmap, bukan dari puluhan file PNG. Bundle dibuat otomatis dari PNG di
+config.ASSETS_DIR saat belum ada atau ada PNG yang berubah:
+
+- gambar tanpa transparansi, dan latar belakang paling bawah yang diratakan ke
+  warna kanvas (FLATTEN_BACKGROUND), disimpan sebagai PPM mentah: Tk
+  memuatnya tanpa inflate/unfilter PNG dan menggambarnya tanpa alpha blending;
+- gambar dengan alpha tetap disimpan sebagai PNG aslinya (PPM tidak punya
+  alpha).
+
+Konversi ke PPM memakai Pillow (sudah terpasang bersama matplotlib); tanpa
+Pillow semua gambar disimpan sebagai PNG dan manfaatnya tinggal satu file
+dan decode yang lazy. Bundle bisa dibuat lebih dulu saat instalasi:
+
+    python assets.py
+"""
+import json
+import mmap
+import os
+import struct
+import tkinter as tk
+
+from config import ASSETS_DIR, ASSET_BUNDLE_PATH
+
+MAGIC = b"BASAST1\n"
+
+# Gambar yang selalu digambar langsung di atas kanvas (lapisan paling bawah):
+# nama -> warna latar kanvas untuk meratakan alpha
+FLATTEN_BACKGROUND = {"image_1.png": (255, 255, 255)}
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _to_ppm(path, background=None):
+    """Byte PPM (P6) dari PNG, atau None jika gambar punya alpha (dan tidak diratakan) / Pillow tidak ada."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(path) as image:
+        image = image.convert("RGBA")
+        if background is not None:
+            flat = Image.new("RGBA", image.size, background + (255,))
+            flat.alpha_composite(image)
+            image = flat
+        elif image.getextrema()[3][0] < 255:
+            return None # Ada piksel transparan
+        width, height = image.size
+        return b"P6\n%d %d\n255\n" % (width, height) + image.convert("RGB").tobytes()
+
+
+def build_bundle(source_dir=ASSETS_DIR, bundle_path=ASSET_BUNDLE_PATH, flatten=FLATTEN_BACKGROUND):
+    """Membuat bundle dari semua PNG di source_dir. Mengembalikan index {nama: entri}."""
+    index = {}
+    blobs = []
+    offset = 0
+    for name in sorted(os.listdir(source_dir)):
+        if not name.endswith(".png"):
+            continue
+        path = os.path.join(source_dir, name)
+        data = _to_ppm(path, flatten.get(name))
+        fmt = "ppm"
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+            fmt = "png"
+        index[name] = [offset, len(data), fmt] + _source_stamp(path)
+        blobs.append(data)
+        offset += len(data)
+
+    header = json.dumps(index).encode('utf-8')
+    tmp_path = f"{bundle_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, bundle_path) # Pembaca lain tidak pernah melihat bundle setengah jadi
+    return index
+
+
+def open_bundle(bundle_path=ASSET_BUNDLE_PATH):
+    """(index, mmap, offset data) dari bundle, atau None jika tidak ada / rusak."""
+    try:
+        with open(bundle_path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("magic")
+        (size,) = struct.unpack_from("<I", mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        index = json.loads(mm[start:start + size])
+    except (ValueError, struct.error):
+        mm.close()
+        return None
+    return index, mm, start + size
+
+
+def is_stale(index, source_dir=ASSETS_DIR):
+    """True jika ada PNG yang ditambah, dihapus atau berubah sejak bundle dibuat."""
+    try:
+        names = {name for name in os.listdir(source_dir) if name.endswith(".png")}
+        if names != set(index):
+            return True
+        return any(_source_stamp(os.path.join(source_dir, name)) != entry[3:] for name, entry in index.items())
+    except OSError:
+        return True
+
+
+class AssetManager:
+    """Cache PhotoImage yang di-decode lazy dari bundle (fallback: file PNG)."""
+
+    def __init__(self, master, source_dir=ASSETS_DIR, bundle_path=ASSET_BUNDLE_PATH):
+        self.master = master
+        self.source_dir = source_dir
+        self._images = {}
+        self._index = {}
+        self._mm = None
+        self._data_start = 0
+
+        bundle = open_bundle(bundle_path)
+        if bundle is not None and is_stale(bundle[0], source_dir):
+            bundle[1].close()
+            bundle = None
+        if bundle is None:
+            try:
+                build_bundle(source_dir, bundle_path)
+                bundle = open_bundle(bundle_path)
+            except OSError as e:
+                print(f"Bundle aset tidak dapat dibuat ({e}), memuat PNG langsung.")
+        if bundle is not None:
+            self._index, self._mm, self._data_start = bundle
+
+    def get(self, name):
+        """PhotoImage untuk file aset `name` (mis. "image_1.png"). Melempar tk.TclError jika tidak ada."""
+        image = self._images.get(name)
+        if image is None:
+            entry = self._index.get(name)
+            if entry is not None:
+                offset, length, fmt = entry[:3]
+                start = self._data_start + offset
+                image = tk.PhotoImage(master=self.master, data=self._mm[start:start + length], format=fmt)
+            else:
+                image = tk.PhotoImage(master=self.master, file=os.path.join(self.source_dir, name))
+            self._images[name] = image
+        return image
+
+    def loaded(self):
+        """Nama aset yang sudah di-decode."""
+        return sorted(self._images)
+
+    def close(self):
+        self._images.clear()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+# === Main Program ===
+if __name__ == "__main__":
+    index = build_bundle()
+    total = sum(entry[1] for entry in index.values())
+    ppm = [name for name, entry in index.items() if entry[2] == "ppm"]
+    print(f"Bundle {ASSET_BUNDLE_PATH}: {len(index)} gambar, {total / 1024:.0f} KiB")
+    print(f"PPM (tanpa decode PNG): {', '.join(ppm) or '-'}")
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark parser telemetri: jalur lama (per baris, str) vs telemetry.parse_buffer.
+
+    python bench_parser.py --lines 200000 --burst 5 --burst 1000
+
+Jalur lama meniru persis parsing di App.check_serial_queue versi awal:
+readline().decode().strip() lalu startswith/split/replace/int per baris.
+Biaya I/O readline() per baris dan pembuatan array TIDAK dihitung untuk jalur
+lama, jadi angka jalur lama adalah batas atas.
+
+parse_buffer diukur setelah satu putaran pemanasan (tabel baris jalur burst
+kecil sudah terisi, seperti setelah beberapa menit berjalan); --cold mengukur
+putaran pertama, saat setiap nilai baru masih lewat parser regex per baris.
+"""
+import argparse
+import random
+import time
+
+from telemetry import parse_buffer
+
+
+def make_stream(n_lines, seed=0):
+    """Stream sintetis seperti firmware: ADC0..ADC4 per tick, sesekali IN0..IN2."""
+    rnd = random.Random(seed)
+    lines = []
+    while len(lines) < n_lines:
+        for ch in range(5):
+            lines.append(f"ADC{ch}={rnd.randint(0, 1023)}\r\n")
+        if rnd.random() < 0.2:
+            for ch in range(3):
+                lines.append(f"IN{ch}={rnd.randint(0, 1)}\r\n")
+    return "".join(lines[:n_lines]).encode('ascii')
+
+
+def legacy_parse(raw_lines):
+    """Parsing gaya check_serial_queue lama; mengembalikan jumlah sampel valid."""
+    count = 0
+    for raw in raw_lines:
+        line = raw.decode('utf-8').strip()
+        if line.startswith("ADC"):
+            try:
+                parts = line.split('=')
+                if len(parts) == 2:
+                    int(parts[0].replace("ADC", ""))
+                    int(parts[1])
+                    count += 1
+            except ValueError:
+                print(f"Error parsing ADC data: {line}")
+        elif line.startswith("IN"):
+            try:
+                parts = line.split('=')
+                if len(parts) == 2:
+                    int(parts[0].replace("IN", ""))
+                    int(parts[1])
+                    count += 1
+            except ValueError:
+                print(f"Error parsing Digital Input data: {line}")
+    return count
+
+
+def bench_legacy(stream):
+    raw_lines = stream.splitlines(keepends=True) # Setara hasil readline() berulang
+    start = time.perf_counter()
+    count = legacy_parse(raw_lines)
+    return count, time.perf_counter() - start
+
+
+def bench_buffer(stream, burst, warm=True):
+    # Potong stream menjadi burst berisi `burst` baris, seperti hasil LineReader.read_records()
+    lines = stream.splitlines(keepends=True)
+    chunks = [b"".join(lines[i:i + burst]) for i in range(0, len(lines), burst)]
+    if warm:
+        # Keadaan tunak: tabel baris jalur kecil sudah berisi semua baris stream (lihat telemetry.py)
+        for chunk in chunks:
+            parse_buffer(memoryview(chunk), 0.0)
+    start = time.perf_counter()
+    count = 0
+    for chunk in chunks:
+        batch, _ = parse_buffer(memoryview(chunk), 0.0)
+        count += len(batch)
+    return count, time.perf_counter() - start
+
+
+# === Main Program ===
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, default=200000)
+    arg_parser.add_argument("--burst", type=int, action="append", help="Jumlah baris per burst (boleh berulang)")
+    arg_parser.add_argument("--cold", action="store_true", help="Tanpa putaran pemanasan")
+    args = arg_parser.parse_args()
+
+    stream = make_stream(args.lines)
+    count, elapsed = bench_legacy(stream)
+    print(f"{'legacy (per baris)':<28} {count / elapsed:>14,.0f} lines/s")
+    for burst in args.burst or [5, 100, 1000, 10000]:
+        count, elapsed = bench_buffer(stream, burst, warm=not args.cold)
+        print(f"{f'parse_buffer (burst={burst})':<28} {count / elapsed:>14,.0f} lines/s")
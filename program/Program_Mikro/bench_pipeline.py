@@ -0,0 +1,325 @@
+"""
+Benchmark pipeline per tahap: read, split, parse, convert, auto, graph.
+
+Tanpa board: stream sintetis ADCn= / INn= (bench_parser.make_stream) dialirkan
+lewat setiap tahap hot path secara terpisah:
+
+    read     os.pipe -> LineReader.read_chunk (select + readv). Dengan --rate
+             penulis mengirim burst sesuai jadwal dan latency = burst ditulis
+             -> byte-nya terbaca; tanpa --rate data dibaca secepat mungkin.
+    split    LineReader.read_records atas chunk acak (baris terpotong) di memori
+    parse    telemetry.parse_buffer per burst
+    convert  CalibrationSet.convert_records per batch
+    filter   SignalFilters (config.SIGNAL_FILTERS) per batch
+    auto     AutoController (series + next_transition + step) per batch
+    graph    TimeSeriesStore.extend_batch + RealtimeGraph.update (canvas Agg)
+             setiap --frame-lines baris
+
+Per tahap dilaporkan lines/s berkelanjutan, latency per panggilan (p50/p99,
+ms) dan memori puncak (tracemalloc, pass terpisah agar tidak memengaruhi
+waktu). Hasil bisa disimpan sebagai JSON untuk dibandingkan antar versi:
+
+    python bench_pipeline.py --lines 200000 --burst 5 --json hasil.json
+    python bench_pipeline.py --stage parse --stage auto --rate 5000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from bench_parser import make_stream
+from calibration import CalibrationSet
+from control import AutoController, PUMP_OFF
+from config import SIGNAL_FILTERS
+from engine import DEFAULT_THRESHOLDS
+from filters import SignalFilters
+from serial_reader import LineReader
+from telemetry import parse_buffer
+from timeseries import TimeSeriesStore
+
+STAGE_NAMES = ("read", "split", "parse", "convert", "filter", "auto", "graph")
+
+
+class _PipePort:
+    """Pengganti serial.Serial minimal untuk LineReader: hanya fileno()."""
+
+    port = "pipe"
+
+    def __init__(self, fd):
+        self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+
+class _MemoryReader(LineReader):
+    """LineReader yang read_chunk-nya mengambil chunk dari memori (tanpa I/O)."""
+
+    def __init__(self, chunks):
+        super().__init__(None)
+        self.chunks = iter(chunks)
+
+    def read_chunk(self, timeout):
+        chunk = next(self.chunks, b"")
+        n = len(chunk)
+        self._buffer[:n] = chunk
+        return self._view[:n]
+
+
+def split_bursts(stream, burst):
+    """Potong stream menjadi burst berisi `burst` baris lengkap."""
+    lines = stream.splitlines(keepends=True)
+    return [b"".join(lines[i:i + burst]) for i in range(0, len(lines), burst)]
+
+
+def make_batches(bursts, rate):
+    """Batch hasil parse dengan timestamp naik sesuai laju `rate` baris/detik."""
+    batches = []
+    t = 0.0
+    for chunk in bursts:
+        batch, _ = parse_buffer(chunk, t)
+        batches.append(batch)
+        t += chunk.count(b"\n") / rate
+    return batches
+
+
+# --- Tahap ---
+# Setiap fungsi tahap menerima data yang sudah disiapkan (di luar pengukuran)
+# dan mengembalikan (jumlah baris, total detik, daftar latency per panggilan).
+
+def stage_read(bursts, rate):
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(write_fd, True)
+    total = sum(len(b) for b in bursts)
+    ends = np.cumsum([len(b) for b in bursts])
+    write_times = [None] * len(bursts)
+
+    def writer():
+        start = time.perf_counter()
+        sent_lines = 0
+        for i, chunk in enumerate(bursts):
+            if rate:
+                # Jadwal burst ke-i: sent_lines / rate detik setelah mulai
+                delay = start + sent_lines / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            write_times[i] = time.perf_counter()
+            os.write(write_fd, chunk)
+            sent_lines += chunk.count(b"\n")
+
+    reader = LineReader(_PipePort(read_fd))
+    latencies = []
+    thread = threading.Thread(target=writer, daemon=True)
+    received = 0
+    done = 0
+    start = time.perf_counter()
+    thread.start()
+    while received < total:
+        t0 = time.perf_counter()
+        received += len(reader.read_chunk(1.0))
+        t1 = time.perf_counter()
+        if rate:
+            # Latency burst: ditulis -> byte terakhirnya terbaca
+            while done < len(bursts) and ends[done] <= received:
+                latencies.append(t1 - write_times[done])
+                done += 1
+        else:
+            latencies.append(t1 - t0)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    os.close(read_fd)
+    os.close(write_fd)
+    return sum(b.count(b"\n") for b in bursts), elapsed, latencies
+
+
+def stage_split(bursts, seed=0):
+    # Gabungkan lalu potong di posisi acak supaya ada sisa baris antar read
+    stream = b"".join(bursts)
+    rnd = random.Random(seed)
+    chunks = []
+    pos = 0
+    mean = max(1, len(stream) // max(1, len(bursts)))
+    while pos < len(stream):
+        size = rnd.randint(max(1, mean // 2), mean * 2)
+        chunks.append(stream[pos:pos + size])
+        pos += size
+    reader = _MemoryReader(chunks)
+    latencies = []
+    lines = 0
+    start = time.perf_counter()
+    for _ in range(len(chunks)):
+        t0 = time.perf_counter()
+        records = reader.read_records(0)
+        latencies.append(time.perf_counter() - t0)
+        lines += bytes(records).count(b"\n")
+    return lines, time.perf_counter() - start, latencies
+
+
+def _timed(items, func):
+    latencies = []
+    lines = 0
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        lines += func(item)
+        latencies.append(time.perf_counter() - t0)
+    return lines, time.perf_counter() - start, latencies
+
+
+def stage_parse(bursts):
+    def parse(chunk):
+        batch, _ = parse_buffer(memoryview(chunk), 0.0)
+        return len(batch) + batch.malformed
+    return _timed(bursts, parse)
+
+
+def stage_convert(batches, calibration):
+    def convert(batch):
+        calibration.convert_records(batch.adc)
+        return len(batch)
+    return _timed(batches, convert)
+
+
+def stage_filter(batches):
+    filters = SignalFilters(SIGNAL_FILTERS) # State baru setiap pass
+
+    def run(batch):
+        filters.apply(batch)
+        return len(batch)
+    return _timed(batches, run)
+
+
+def stage_auto(batches, calibration):
+    controller = AutoController(calibration, dict(DEFAULT_THRESHOLDS))
+    status = {'state': PUMP_OFF, 'lamp': False, 'level': 0, 'pressure': 0}
+
+    def decide(batch):
+        # Sama dengan PumpEngine.run_auto_logic, tanpa I/O
+        level, pressure = controller.series(batch.adc, status['level'], status['pressure'])
+        i = controller.next_transition(status['state'], status['lamp'], level, pressure)
+        while i is not None:
+            status['state'], status['lamp'], _ = controller.step(status['state'], status['lamp'], level[i], pressure[i])
+            i = controller.next_transition(status['state'], status['lamp'], level, pressure, i + 1)
+        latest = batch.latest()
+        status['level'] = latest.get(0, status['level'])
+        status['pressure'] = latest.get(1, status['pressure'])
+        return len(batch)
+    return _timed(batches, decide)
+
+
+def stage_graph(batches, calibration, frame_lines):
+    from graph import RealtimeGraph # Impor di sini: matplotlib hanya untuk tahap ini
+
+    history = TimeSeriesStore(seconds=3600)
+    graph = RealtimeGraph(None, SimpleNamespace(history=history, calibration=calibration), 0, 1)
+    # Kelompokkan batch per frame GUI
+    frames = []
+    frame, count = [], 0
+    for batch in batches:
+        frame.append(batch)
+        count += len(batch)
+        if count >= frame_lines:
+            frames.append(frame)
+            frame, count = [], 0
+    if frame:
+        frames.append(frame)
+
+    def render(frame):
+        for batch in frame:
+            history.extend_batch(batch)
+        graph.update()
+        return sum(len(batch) for batch in frame)
+    return _timed(frames, render)
+
+
+def run_stage(name, args, bursts, batches, calibration):
+    if name == "read":
+        return stage_read(bursts, args.rate)
+    if name == "split":
+        return stage_split(bursts)
+    if name == "parse":
+        return stage_parse(bursts)
+    if name == "convert":
+        return stage_convert(batches, calibration)
+    if name == "filter":
+        return stage_filter(batches)
+    if name == "auto":
+        return stage_auto(batches, calibration)
+    return stage_graph(batches, calibration, args.frame_lines)
+
+
+def summarize(lines, elapsed, latencies, peak_bytes):
+    latencies = np.asarray(latencies) * 1e3
+    return {
+        'lines': int(lines),
+        'seconds': elapsed,
+        'lines_per_sec': lines / elapsed if elapsed > 0 else None,
+        'calls': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'max_ms': float(latencies.max()) if len(latencies) else None,
+        'peak_kib': peak_bytes / 1024,
+    }
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# === Main Program ===
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark pipeline BAS per tahap (headless)")
+    arg_parser.add_argument("--lines", type=int, default=200000, help="Jumlah baris stream sintetis")
+    arg_parser.add_argument("--burst", type=int, default=5, help="Baris per burst (5 = satu tick ADC_Loop)")
+    arg_parser.add_argument("--rate", type=float, default=0.0, help="Laju baris/detik untuk tahap read (0 = secepatnya)")
+    arg_parser.add_argument("--frame-lines", type=int, default=50, help="Baris per frame untuk tahap graph")
+    arg_parser.add_argument("--stage", action="append", choices=STAGE_NAMES, help="Tahap yang dijalankan (boleh berulang)")
+    arg_parser.add_argument("--json", help="Simpan hasil JSON ke file ini ('-' = stdout)")
+    args = arg_parser.parse_args()
+
+    stream = make_stream(args.lines)
+    bursts = split_bursts(stream, args.burst)
+    batches = make_batches(bursts, args.rate or 10 * 8) # Default: laju firmware (~8 baris x 10 Hz)
+    calibration = CalibrationSet()
+
+    results = {}
+    for name in args.stage or STAGE_NAMES:
+        lines, elapsed, latencies = run_stage(name, args, bursts, batches, calibration)
+        # Pass kedua hanya untuk memori puncak (tracemalloc memperlambat eksekusi)
+        tracemalloc.start()
+        run_stage(name, args, bursts, batches, calibration)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = summarize(lines, elapsed, latencies, peak)
+        if args.json != "-":
+            r = results[name]
+            print(f"{name:<8} {r['lines_per_sec']:>14,.0f} lines/s  p50 {r['p50_ms']:8.3f} ms  "
+                  f"p99 {r['p99_ms']:8.3f} ms  peak {r['peak_kib']:10.1f} KiB")
+
+    report = {
+        'version': git_version(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'config': {'lines': args.lines, 'burst': args.burst, 'rate': args.rate, 'frame_lines': args.frame_lines},
+        'stages': results,
+    }
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {args.json}")
@@ -0,0 +1,135 @@
+"""
+Kalibrasi ADC ke nilai fisik berbasis lookup table.
+
+ADC firmware 10-bit, jadi setiap channel cukup punya tabel 1024 entri yang
+dihitung sekali dari kurva kalibrasinya (linear, piecewise-linear atau
+polinomial, plus koreksi offset). Konversi satu sampel = satu indeks array;
+konversi satu batch = satu fancy-index NumPy untuk semua channel sekaligus.
+
+Kurva per stasiun dibaca dari file JSON (lihat calibration.json) dan dimuat
+ulang otomatis saat file berubah, tanpa restart aplikasi.
+"""
+import json
+import os
+
+import numpy as np
+
+from config import ADC_MAX_VALUE, WATER_LEVEL_MAX_METER, PRESSURE_MAX_BAR
+
+ADC_TABLE_SIZE = ADC_MAX_VALUE + 1 # 1024 entri untuk ADC 10-bit
+TABLE_CHANNELS = 10 # Protokol memakai nomor channel satu digit (ADC0..ADC9)
+
+
+class ChannelCalibration:
+    """Kurva kalibrasi satu channel yang sudah dihitung menjadi tabel."""
+
+    def __init__(self, table, name="", unit=""):
+        self.table = np.asarray(table, dtype=np.float64)
+        self.name = name
+        self.unit = unit
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Membuat kalibrasi dari dict spesifikasi (satu entri di file JSON):
+          type      : "linear" | "piecewise" | "polynomial" | "raw"
+          full_scale: nilai fisik pada ADC_MAX_VALUE (linear)
+          points    : [[raw, nilai], ...] urut naik (piecewise)
+          coeffs    : [c0, c1, c2, ...] -> c0 + c1*raw + c2*raw^2 ... (polynomial)
+          raw_offset: koreksi zero dalam count ADC, diterapkan sebelum kurva
+          offset    : koreksi dalam satuan fisik, diterapkan sesudah kurva
+        """
+        raw = np.arange(ADC_TABLE_SIZE, dtype=np.float64) + spec.get("raw_offset", 0.0)
+        raw = np.clip(raw, 0, ADC_MAX_VALUE)
+        kind = spec.get("type", "linear")
+        if kind == "linear":
+            table = raw / ADC_MAX_VALUE * spec["full_scale"]
+        elif kind == "piecewise":
+            points = np.asarray(spec["points"], dtype=np.float64)
+            table = np.interp(raw, points[:, 0], points[:, 1])
+        elif kind == "polynomial":
+            table = np.polynomial.polynomial.polyval(raw, spec["coeffs"])
+        elif kind == "raw":
+            table = raw
+        else:
+            raise ValueError(f"Tipe kalibrasi tidak dikenal: {kind}")
+        return cls(table + spec.get("offset", 0.0), spec.get("name", ""), spec.get("unit", ""))
+
+    def convert(self, value):
+        """Konversi satu nilai ADC mentah ke nilai fisik."""
+        return float(self.table[min(max(int(value), 0), ADC_MAX_VALUE)])
+
+
+# Kurva bawaan = konversi linear lama (0-5 m dan 0-10 Bar)
+DEFAULT_SPECS = {
+    0: {"name": "Water Level", "unit": "m", "type": "linear", "full_scale": WATER_LEVEL_MAX_METER},
+    1: {"name": "Pressure", "unit": "Bar", "type": "linear", "full_scale": PRESSURE_MAX_BAR},
+}
+
+
+class CalibrationSet:
+    """
+    Kumpulan kalibrasi untuk semua channel ADC. Tabel semua channel disusun
+    dalam satu array (channel x 1024) yang diganti secara atomik saat reload,
+    sehingga thread lain selalu melihat set tabel yang konsisten.
+    """
+
+    def __init__(self, specs=None, path=None):
+        self.path = path
+        self._mtime = None
+        self._apply(DEFAULT_SPECS if specs is None else specs)
+
+    def _apply(self, specs):
+        """Channel yang tidak ada di specs memakai kurva bawaan (DEFAULT_SPECS, lalu raw)."""
+        channels = {}
+        for ch in range(TABLE_CHANNELS):
+            spec = specs.get(ch, DEFAULT_SPECS.get(ch, {"name": f"ADC{ch}", "unit": "ADC", "type": "raw"}))
+            channels[ch] = ChannelCalibration.from_spec(spec)
+        self.tables = np.stack([channels[ch].table for ch in range(TABLE_CHANNELS)])
+        self.channels = channels
+
+    @classmethod
+    def load(cls, path):
+        """Memuat kalibrasi dari file JSON; kurva bawaan dipakai jika file tidak ada."""
+        calibration = cls(path=path)
+        calibration.reload_if_changed()
+        return calibration
+
+    def reload_if_changed(self):
+        """Memuat ulang file kalibrasi jika mtime-nya berubah. Mengembalikan True jika dimuat ulang."""
+        if self.path is None:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._apply({int(ch): spec for ch, spec in data.get("channels", {}).items()})
+        except Exception as e:
+            # Spesifikasi rusak (IndexError, TypeError, ...) tidak boleh menghentikan
+            # thread kontrol: tabel lama tetap dipakai sampai file diperbaiki
+            print(f"Error loading calibration {self.path}: {type(e).__name__}: {e}; kalibrasi lama tetap dipakai.")
+            return False
+        print(f"Kalibrasi dimuat dari {self.path}")
+        return True
+
+    def convert(self, ch, value):
+        """Konversi satu nilai ADC mentah channel ch ke nilai fisik."""
+        return float(self.tables[ch, min(max(int(value), 0), ADC_MAX_VALUE)])
+
+    def convert_array(self, ch, values):
+        """Konversi array nilai ADC mentah satu channel dengan satu lookup vektor."""
+        return self.tables[ch, np.minimum(values, ADC_MAX_VALUE)]
+
+    def convert_records(self, records):
+        """
+        Konversi array record SAMPLE_DTYPE (campuran channel) ke nilai fisik
+        dengan satu lookup vektor. Hasil sejajar dengan urutan records.
+        """
+        tables = self.tables
+        return tables[records['channel'], np.minimum(records['value'], ADC_MAX_VALUE)]
@@ -0,0 +1,263 @@
+"""
+Kanal perintah ke mikrokontroler dengan thread penulis sendiri.
+
+send() hanya memasukkan perintah ke antrian dan langsung kembali, jadi
+thread GUI dan thread kontrol tidak pernah menunggu ser.write(). Antrian
+dibatasi (MAX_PENDING_COMMANDS) dan perintah OUTnS digabung: jika OUTn masih
+menunggu dikirim, state-nya diganti di tempat, sehingga hanya state terakhir
+per output yang sampai ke port.
+
+Verifikasi opsional: firmware tidak punya perintah baca balik output, jadi
+status output dibaca lewat digital input yang disambung ke kontak bantu
+relay/kontaktor (config.OUTPUT_FEEDBACK, mis. OUT1 -> IN2). Setelah OUTnS
+ditulis, writer meminta INm ("INm") dan menunggu nilai yang diharapkan.
+Jika belum cocok sampai COMMAND_VERIFY_TIMEOUT, OUTnS dikirim ulang
+(COMMAND_VERIFY_RETRIES kali) lalu dilaporkan gagal lewat on_failure.
+"""
+import collections
+import threading
+import time
+
+import serial
+
+from config import ADC_CHANNELS
+
+MAX_PENDING_COMMANDS = 64 # Perintah non-OUT yang boleh antri
+COMMAND_VERIFY_TIMEOUT = 1.0 # Detik menunggu konfirmasi DI per percobaan
+COMMAND_VERIFY_RETRIES = 2 # Kirim ulang sebelum dinyatakan gagal
+
+
+def parse_output_command(command):
+    """(output, state) untuk perintah OUTnS, atau None untuk perintah lain."""
+    if len(command) == 5 and command.startswith("OUT") and command[3:].isdigit():
+        return int(command[3]), int(command[4])
+    return None
+
+
+# Batas ADC_Period di firmware (lib/protocol/protocol.h)
+ADC_PERIOD_MIN_MS = 10
+ADC_PERIOD_MAX_MS = 1000
+
+
+def adc_mask_command(channels):
+    """Perintah ADC_Mask=N: channel ADC yang dikirim ADC_Loop firmware."""
+    mask = 0
+    for ch in channels:
+        if not 0 <= ch < ADC_CHANNELS:
+            raise ValueError(f"Channel ADC tidak valid: {ch}")
+        mask |= 1 << ch
+    return f"ADC_Mask={mask}"
+
+
+def parse_adc_mask_command(command):
+    """Daftar channel untuk perintah ADC_Mask=N, atau None untuk perintah lain."""
+    if command.startswith("ADC_Mask=") and command[9:].isdigit():
+        mask = int(command[9:])
+        return [ch for ch in range(ADC_CHANNELS) if mask & (1 << ch)]
+    return None
+
+
+def sample_period_command(period_ms):
+    """Perintah ADC_Period=T: periode Timer1 firmware dalam ms."""
+    if not ADC_PERIOD_MIN_MS <= period_ms <= ADC_PERIOD_MAX_MS:
+        raise ValueError(f"Periode sampling harus {ADC_PERIOD_MIN_MS}..{ADC_PERIOD_MAX_MS} ms: {period_ms}")
+    return f"ADC_Period={int(period_ms)}"
+
+
+class CommandWriter:
+    """Antrian perintah serial + thread penulis + verifikasi output."""
+
+    def __init__(self, feedback=None, on_write=None, on_failure=None,
+                 verify_timeout=COMMAND_VERIFY_TIMEOUT, verify_retries=COMMAND_VERIFY_RETRIES,
+                 max_pending=MAX_PENDING_COMMANDS, metrics=None):
+        self.feedback = dict(feedback or {}) # output -> (channel DI, terbalik)
+        self.on_write = on_write # callback(command, timestamp) setelah ditulis
+        self.on_failure = on_failure # callback(output, state, channel) jika verifikasi gagal
+        self.verify_timeout = verify_timeout
+        self.verify_retries = verify_retries
+        self.max_pending = max_pending
+        self.metrics = metrics # PipelineMetrics (opsional): tahap 'command' dan 'end_to_end'
+
+        self.ser = None
+        self._queue = collections.deque() # (kunci, waktu antri, origin); kunci: perintah, ("OUT", n) atau ("IN", m)
+        self._outputs = {} # n -> state terakhir yang menunggu dikirim
+        self._output_stamps = {} # n -> (waktu antri, origin) perintah OUTn pertama yang belum terkirim
+        self._polls = set() # Channel INm yang permintaannya masih di antrian (paling banyak satu per channel)
+        self._verify = {} # n -> [state, deadline, percobaan]
+        self._poll_turn = 0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+        # Statistik
+        self.written = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.retries = 0
+        self.verified = 0
+        self.failures = 0
+
+    # --- Siklus hidup ---
+    def start(self, ser):
+        """Memakai port ser; thread penulis dijalankan sekali saja."""
+        with self._cond:
+            self.ser = ser
+            self._stop = False
+        if self.feedback:
+            self.send("DI_Set") # INn hanya dijawab firmware jika DI aktif
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self, flush_timeout=0.5):
+        """Menghentikan thread penulis setelah antrian terkirim (maksimal flush_timeout detik)."""
+        deadline = time.monotonic() + flush_timeout
+        while self._queue and self._thread is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    # --- API untuk engine / GUI (tidak pernah blocking) ---
+    def send(self, command, origin=None):
+        """
+        Mengantrikan perintah. origin = SampleBatch.t_read batch yang memicu
+        perintah (untuk metrik end_to_end). Mengembalikan False jika antrian penuh.
+        """
+        output = parse_output_command(command)
+        now = time.monotonic()
+        with self._cond:
+            if output is not None:
+                n, state = output
+                if n in self._outputs:
+                    self.coalesced += 1 # Ganti state yang belum terkirim
+                else:
+                    self._queue.append((("OUT", n), now, origin))
+                    self._output_stamps[n] = (now, origin)
+                self._outputs[n] = state
+            elif len(self._queue) >= self.max_pending:
+                self.dropped += 1
+                return False
+            else:
+                self._queue.append((command, now, origin))
+            self._cond.notify()
+        return True
+
+    def pending(self):
+        """Jumlah perintah yang menunggu dikirim (gauge queue depth)."""
+        return len(self._queue)
+
+    def pending_output(self, n):
+        """State OUTn yang sudah diantrikan tapi belum ditulis, atau None."""
+        with self._cond:
+            return self._outputs.get(n)
+
+    def notify_inputs(self, channels, values):
+        """Dipanggil engine untuk setiap batch DI: cek output yang menunggu verifikasi."""
+        if not self._verify:
+            return
+        latest = dict(zip(channels, values))
+        with self._cond:
+            for n, (state, _, _) in list(self._verify.items()):
+                channel, inverted = self.feedback[n]
+                if latest.get(channel) == (state ^ int(inverted)):
+                    del self._verify[n]
+                    self.verified += 1
+            if self._verify:
+                # Firmware hanya menyimpan SATU permintaan INn per tick, jadi
+                # channel yang belum cocok dibaca bergiliran, satu per jawaban
+                self._poll_turn += 1
+                pending = sorted(self._verify)
+                n = pending[self._poll_turn % len(pending)]
+                if self._poll(self.feedback[n][0], time.monotonic()):
+                    self._cond.notify()
+
+    def _poll(self, channel, now, first=False):
+        """Mengantrikan permintaan INm kecuali sudah ada di antrian. Dipanggil dengan lock."""
+        if channel in self._polls:
+            return False
+        self._polls.add(channel)
+        if first:
+            self._queue.appendleft((("IN", channel), now, None))
+        else:
+            self._queue.append((("IN", channel), now, None))
+        return True
+
+    # --- Thread penulis ---
+    def _next_command(self):
+        """
+        (perintah, waktu antri, origin) berikutnya, atau None. Dipanggil dengan
+        lock; sekaligus menjadwalkan pengiriman ulang yang jatuh tempo.
+        """
+        now = time.monotonic()
+        for n, entry in list(self._verify.items()):
+            state, deadline, attempts = entry
+            if now < deadline:
+                continue
+            if attempts > self.verify_retries:
+                del self._verify[n]
+                self.failures += 1
+                if self.on_failure is not None:
+                    self.on_failure(n, state, self.feedback[n][0])
+            elif n not in self._outputs:
+                self.retries += 1
+                self._queue.append((("OUT", n), now, None))
+                self._output_stamps[n] = (now, None)
+                self._outputs[n] = state
+        if not self._queue:
+            return None
+        key, queued, origin = self._queue.popleft()
+        if isinstance(key, tuple) and key[0] == "IN":
+            self._polls.discard(key[1])
+            return f"IN{key[1]}", queued, origin
+        if isinstance(key, tuple):
+            n = key[1]
+            state = self._outputs.pop(n)
+            queued, origin = self._output_stamps.pop(n)
+            if n in self.feedback:
+                entry = self._verify.get(n)
+                attempts = entry[2] + 1 if entry is not None and entry[0] == state else 1
+                self._verify[n] = [state, now + self.verify_timeout, attempts]
+                self._poll(self.feedback[n][0], now, first=True) # Minta konfirmasi setelah OUT
+            return f"OUT{n}{state}", queued, origin
+        return key, queued, origin
+
+    def _wait_timeout(self):
+        if not self._verify:
+            return None
+        return max(0.0, min(entry[1] for entry in self._verify.values()) - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                item = self._next_command()
+                while item is None and not self._stop:
+                    self._cond.wait(self._wait_timeout())
+                    item = self._next_command()
+                if item is None:
+                    return
+                # Item yang sudah diambil tetap ditulis walau sedang berhenti: state
+                # OUTn-nya sudah dipindah dari _outputs ke _verify
+                stopping = self._stop
+                ser = self.ser
+            self._write(ser, *item)
+            if stopping:
+                return
+
+    def _write(self, ser, command, queued, origin):
+        try:
+            ser.write(f"{command}\r\n".encode('utf-8'))
+        except (serial.SerialException, OSError) as e:
+            print(f"Gagal mengirim {command}: {e}")
+            return
+        self.written += 1
+        if self.metrics is not None:
+            written = time.monotonic()
+            self.metrics.observe('command', written - queued)
+            if origin is not None:
+                self.metrics.observe('end_to_end', written - origin)
+        if self.on_write is not None:
+            self.on_write(command, time.time())
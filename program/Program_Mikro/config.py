@@ -0,0 +1,101 @@
+from pathlib import Path
+
+# === CONFIG ===
+# Konfigurasi bersama untuk engine (headless) dan GUI.
+# Modul ini tidak boleh mengimpor tkinter / matplotlib.
+
+SERIAL_PORT = 'COM23'  # <--- PASTIKAN INI SESUAI DENGAN PORT SERIAL MIKROKONTROLER ANDA
+BAUD_RATE = 115200
+THRESHOLD_ADC0 = 800   # Threshold untuk water level (raw ADC value)
+THRESHOLD_ADC1 = 600   # Threshold untuk pressure (raw ADC value)
+
+# Range konversi ADC ke nilai fisik
+ADC_MAX_VALUE = 1023 # Untuk ADC 10-bit
+
+# Water Level: 0-5 meter
+WATER_LEVEL_MAX_METER = 5.0
+WATER_LEVEL_ON_THRESHOLD_METER = 2.5 # Pompa nyala jika > 3 meter
+WATER_LEVEL_OFF_THRESHOLD_METER = 0.5 # Pompa mati jika <= 0.5 meter
+
+# Pressure: 0-10 Bar (asumsi standar untuk sensor pompa air)
+PRESSURE_MAX_BAR = 10.0
+PRESSURE_MOTOR_OFF_THRESHOLD_BAR = 1.0 # Motor mati jika pressure <= 1.0 Bar
+
+# Jumlah channel yang dikirim firmware (lihat src/main.c)
+ADC_CHANNELS = 5
+DI_CHANNELS = 3
+
+# Histori time-series per channel (dialokasikan di awal: detik x laju sampel)
+HISTORY_SECONDS = 24 * 3600
+HISTORY_RATE_HZ = 10 # Laju ADC_Loop firmware (Timer1 100 ms)
+
+# Langganan channel ADC_Loop dan periode Timer1 firmware (ADC_Mask / ADC_Period,
+# dikirim bersama perintah awal). None = bawaan firmware: ADC0..ADC4 setiap 100 ms.
+# Mode Auto dan GUI hanya memakai ADC0 (level) dan ADC1 (pressure), mis.
+# ADC_SUBSCRIPTION = (0, 1) dengan ADC_SAMPLE_PERIOD_MS = 20. Histori mentah
+# berkapasitas HISTORY_SECONDS x HISTORY_RATE_HZ sampel per channel, jadi pada
+# laju lebih tinggi jangkauannya lebih pendek (rollup tidak terpengaruh).
+ADC_SUBSCRIPTION = None
+ADC_SAMPLE_PERIOD_MS = None
+
+# Rollup min/max/mean/count per channel untuk zoom grafik jangka panjang:
+# (resolusi detik, retensi detik); None = sama dengan histori mentah
+ROLLUP_LEVELS = (
+    (1, None),
+    (60, 7 * 24 * 3600),
+    (600, 30 * 24 * 3600),
+    (3600, 365 * 24 * 3600),
+)
+
+# File kalibrasi ADC per stasiun (dimuat ulang otomatis saat berubah)
+CALIBRATION_PATH = Path(__file__).parent / "calibration.json"
+
+# Arsip telemetri on-disk (lihat archive.py); None untuk menonaktifkan
+ARCHIVE_DIR = Path(__file__).parent / "archive"
+ARCHIVE_SEGMENT_RECORDS = 1_000_000 # Record per segmen (11 byte/record, ~11 MB)
+ARCHIVE_SEGMENT_SECONDS = 24 * 3600 # Segmen baru paling lambat setiap hari
+
+# Filter sinyal per channel sebelum kontrol Auto dan tampilan (lihat filters.py).
+# Median meredam riak/percikan di pit, spike membuang lonjakan sesaat pressure.
+SIGNAL_FILTERS = {
+    "ADC0": [{"type": "median", "window": 5}],
+    "ADC1": [{"type": "spike", "window": 5, "max_delta": 50}],
+}
+
+# Aturan alarm operator (lihat alarms.py): level tinggi, laju naik, pressure
+# macet saat pompa jalan, chatter DI. Kosong = tidak ada alarm.
+ALARM_RULES = []
+
+# Aset gambar GUI (lihat assets.py): PNG sumber + bundle cache yang dibuat otomatis
+ASSETS_DIR = Path(__file__).parent / "assets" / "frame0"
+ASSET_BUNDLE_PATH = Path(__file__).parent / "assets" / "frame0.bundle"
+
+# Handshake setelah port dibuka (pengganti sleep(2)): Arduino reset saat port
+# dibuka, jadi probe ADC_Set + ADC0 dikirim ulang sampai MCU menjawab
+MCU_READY_TIMEOUT = 3.0 # Detik maksimal menunggu jawaban pertama
+MCU_READY_PROBE_SECONDS = 0.15 # Jeda antar probe
+
+# Akuisisi serial (lihat acquisition.py): "thread" = thread pembaca di proses
+# engine, "process" = proses anak + ring shared memory (tahan GIL / redraw GUI)
+ACQUISITION_MODE = "thread"
+ACQ_RING_SAMPLES = 1 << 16 # Sampel per ring (ADC dan DI masing-masing), ~50 menit pada 20 baris/detik
+ACQ_RING_BATCHES = 1 << 14 # Entri burst
+
+# Multi-stasiun (stations.py): histori per stasiun dibuat pendek agar biaya
+# memori per stasiun kecil (8 channel x 1 jam x 10 Hz ~ 3.5 MB)
+STATIONS_PATH = Path(__file__).parent / "stations.json"
+STATION_HISTORY_SECONDS = 3600
+STATION_RECONNECT_SECONDS = 5.0
+
+# Verifikasi output lewat digital input (lihat commands.py):
+# output -> (channel DI kontak bantu, terbalik). Contoh relay pompa aktif-low
+# dengan kontak bantu kontaktor di IN2: {1: (2, True)}. Kosong = tanpa verifikasi.
+OUTPUT_FEEDBACK = {}
+
+# Endpoint metrik Prometheus lokal (http://127.0.0.1:METRICS_PORT/metrics); None = mati
+METRICS_PORT = 9108
+
+# Server Modbus TCP untuk SCADA (lihat modbus.py); None = mati. Ganti host ke
+# "0.0.0.0" agar bisa dipolling dari komputer lain (coil mengendalikan output!)
+MODBUS_PORT = None
+MODBUS_HOST = "127.0.0.1"
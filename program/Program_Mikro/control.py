@@ -0,0 +1,116 @@
+"""
+State machine logika mode Auto, dievaluasi untuk SETIAP sampel ADC.
+
+State pompa (PumpEngine.state) dan transisinya, dengan level/pressure dalam
+satuan fisik (hasil kalibrasi) dan threshold dari PumpEngine.thresholds:
+
+    PUMP_OFF --level > level_on_m-------------> PUMP_ON    OUT10, event pump True
+    PUMP_ON  --level <= level_off_m-----------> PUMP_OFF   OUT11, event pump False
+    PUMP_ON  --pressure <= pressure_off_bar---> PUMP_OFF   OUT30, event pump False (proteksi)
+
+Transisi ke PUMP_ON dan trip proteksi pressure bisa terjadi pada sampel yang
+sama (pressure belum naik saat pompa baru menyala), persis seperti logika
+lama. Lampu motor (out_states[1]) independen dari state pompa: OUT1 dikirim
+setiap kali (pressure > lamp) berubah.
+
+Evaluasi per sampel: setiap sampel ADC0/ADC1 di batch menghasilkan satu
+pasangan (level, pressure) dengan forward-fill dari nilai channel lain.
+next_transition() mencari secara vektor sampel PERTAMA yang memicu transisi
+dari state sekarang, step() menjalankan transisi itu, lalu pencarian
+dilanjutkan dari sampel berikutnya. Biaya per batch O(n) NumPy + O(jumlah
+transisi) Python, jadi burst ribuan sampel tidak menunda keputusan.
+
+Latency (batch di-parse -> keputusan dan perintah OUT ditulis ke port):
+  - reader thread bangun dari select() segera saat byte datang; parse satu
+    burst 5 baris ~20 us (bench_parser.py)
+  - serah terima queue ke thread kontrol: segera, tetapi harus mendapat GIL.
+    Setiap thread Python lain yang sedang jalan (GUI menggambar grafik)
+    bisa menahannya sys.getswitchinterval() (5 ms) per giliran
+  - reload kalibrasi (hanya saat file berubah): beberapa ms, sekali
+  - evaluasi state machine + ser.write: puluhan us
+  Diukur dengan mcu_sim.py (storm, rate 10): p50 0.4 ms, p99 1.9 ms,
+  maks 6.4 ms; dengan satu thread Python lain yang 100% sibuk: p50 0.3 ms,
+  p99 9.3 ms, maks 31 ms. Batas atas desain: 50 ms. Ditambah periode
+  sampling firmware (ADC_Loop, 100 ms) dan waktu kirim burst di 115200 baud
+  (~5 ms), reaksi terhadap perubahan fisik <= ~155 ms.
+  Thread kontrol tidak pernah menunggu GUI: GUI hanya menerima event lewat
+  queue miliknya sendiri, dan messagebox / redraw hanya memblokir thread Tk.
+"""
+import numpy as np
+
+PUMP_OFF = 0
+PUMP_ON = 1
+
+CH_WATER_LEVEL = 0
+CH_PRESSURE = 1
+
+
+class AutoController:
+    """Transisi state machine mode Auto; tanpa I/O, aksi dijalankan oleh engine."""
+
+    def __init__(self, calibration, thresholds):
+        self.calibration = calibration
+        self.thresholds = thresholds # Dict milik engine (bisa diubah saat berjalan)
+
+    def series(self, adc_records, level_raw, pressure_raw):
+        """
+        (level_m, pressure_bar) yang dilihat kontrol pada setiap sampel
+        ADC0/ADC1 di adc_records. level_raw / pressure_raw adalah nilai
+        mentah terakhir SEBELUM batch ini (untuk forward-fill awal).
+        """
+        records = adc_records[np.isin(adc_records['channel'], (CH_WATER_LEVEL, CH_PRESSURE))]
+        n = len(records)
+        positions = np.arange(n)
+        series = []
+        for ch, initial in ((CH_WATER_LEVEL, level_raw), (CH_PRESSURE, pressure_raw)):
+            # Indeks sampel terakhir channel ini pada/sebelum setiap posisi (-1 = belum ada)
+            last = np.maximum.accumulate(np.where(records['channel'] == ch, positions, -1)) if n else positions
+            raw = np.where(last >= 0, records['value'][np.maximum(last, 0)], initial)
+            series.append(self.calibration.convert_array(ch, raw))
+        return series[0], series[1]
+
+    def next_transition(self, state, lamp_state, level, pressure, start=0):
+        """Indeks sampel pertama >= start yang memicu transisi, atau None."""
+        thresholds = self.thresholds
+        level = level[start:]
+        pressure = pressure[start:]
+        if state == PUMP_OFF:
+            pump = level > thresholds['level_on_m']
+        else:
+            pump = (level <= thresholds['level_off_m']) | (pressure <= thresholds['pressure_off_bar'])
+        lamp = (pressure > thresholds['lamp']) != lamp_state
+        hits = np.flatnonzero(pump | lamp)
+        return start + int(hits[0]) if len(hits) else None
+
+    def step(self, state, lamp_state, level_m, pressure_bar):
+        """
+        Menjalankan transisi untuk satu sampel. Mengembalikan
+        (state baru, lamp_state baru, aksi); setiap aksi adalah
+        (perintah MCU, event pompa atau None, pesan log).
+        """
+        level_on_m = self.thresholds['level_on_m']
+        level_off_m = self.thresholds['level_off_m']
+        pressure_off_bar = self.thresholds['pressure_off_bar']
+        actions = []
+
+        # Logika untuk OUT1 (Pompa) berdasarkan Water Level
+        if state == PUMP_OFF and level_m > level_on_m:
+            state = PUMP_ON
+            actions.append((f"OUT1{0}", True, f"Auto Mode: Water Level LOW ({level_m:.2f}m <= {level_off_m}m), turning pump OFF."))
+        elif state == PUMP_ON and level_m <= level_off_m:
+            state = PUMP_OFF
+            actions.append((f"OUT1{1}", False, f"Auto Mode: Water Level HIGH ({level_m:.2f}m > {level_on_m}m), turning pump ON."))
+
+        # Mematikan pompa berdasarkan Pressure, hanya jika pompa sedang menyala
+        if state == PUMP_ON and pressure_bar <= pressure_off_bar:
+            # Pompa sedang nyala, tapi pressure rendah (0-1 bar) -> Matikan pompa untuk proteksi
+            state = PUMP_OFF
+            actions.append((f"OUT3{state}", False, f"Auto Mode: WARNING! Pressure LOW ({pressure_bar:.2f} Bar <= {pressure_off_bar} Bar), turning pump OFF for protection."))
+
+        # Logika untuk OUT3 (Lampu Motor) berdasarkan Pressure (ADC1)
+        new_lamp_state = bool(pressure_bar > self.thresholds['lamp']) # Menggunakan threshold raw ADC untuk lampu
+        if new_lamp_state != lamp_state:
+            lamp_state = new_lamp_state
+            actions.append((f"OUT1{int(new_lamp_state)}", None, f"Auto Mode: Pressure ({pressure_bar:.2f} Bar), updating Lamp Motor to {new_lamp_state}."))
+
+        return state, lamp_state, actions
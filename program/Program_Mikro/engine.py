@@ -0,0 +1,635 @@
+"""
+Engine akuisisi dan kontrol pompa tanpa GUI (headless).
+
+Engine memegang port serial, thread pembaca serial, parsing data ADC/IN,
+status mode Auto/Manual dan perintah OUT1/OUT3 ke mikrokontroler. Modul ini
+sengaja tidak mengimpor tkinter maupun matplotlib sehingga bisa dijalankan
+sebagai daemon ringan:
+
+    python engine.py --port /dev/ttyUSB0 --auto
+
+GUI Tk (gui.py) hanya menjadi salah satu klien yang berlangganan event
+engine lewat subscribe()/unsubscribe(). Dengan --acquisition process port
+serial dibaca oleh proses anak (acquisition.py), bukan oleh thread di sini.
+"""
+import argparse
+import queue
+import threading
+import time
+
+import serial
+
+from telemetry import parse_buffer
+from serial_reader import LineReader
+from calibration import CalibrationSet
+from filters import SignalFilters
+from alarms import AlarmEngine
+from timeseries import TimeSeriesStore
+from archive import ArchiveWriter
+from commands import CommandWriter, parse_output_command, adc_mask_command, sample_period_command
+from metrics import PipelineMetrics, MetricsServer
+from recording import SessionRecorder, open_port
+from acquisition import AcquisitionProcess
+from control import AutoController, PUMP_OFF, PUMP_ON, CH_WATER_LEVEL, CH_PRESSURE # CH_* juga dipakai gui.py / stations.py
+from config import (
+    SERIAL_PORT, BAUD_RATE, THRESHOLD_ADC1, ADC_CHANNELS, DI_CHANNELS, CALIBRATION_PATH, ARCHIVE_DIR, HISTORY_SECONDS, OUTPUT_FEEDBACK, METRICS_PORT, MODBUS_PORT,
+    MCU_READY_TIMEOUT, MCU_READY_PROBE_SECONDS, SIGNAL_FILTERS, ACQUISITION_MODE, ADC_SUBSCRIPTION, ADC_SAMPLE_PERIOD_MS, ALARM_RULES,
+    WATER_LEVEL_ON_THRESHOLD_METER, WATER_LEVEL_OFF_THRESHOLD_METER, PRESSURE_MOTOR_OFF_THRESHOLD_BAR,
+)
+
+# Mode sistem
+MODE_MANUAL = 0
+MODE_AUTO = 1
+
+# Threshold logika Auto; tiap engine (stasiun) punya salinan sendiri yang bisa diubah
+DEFAULT_THRESHOLDS = {
+    'level_on_m': WATER_LEVEL_ON_THRESHOLD_METER,
+    'level_off_m': WATER_LEVEL_OFF_THRESHOLD_METER,
+    'pressure_off_bar': PRESSURE_MOTOR_OFF_THRESHOLD_BAR,
+    'lamp': THRESHOLD_ADC1,
+}
+
+CALIBRATION_CHECK_INTERVAL = 1.0 # Detik antar pengecekan perubahan file kalibrasi
+LOSS_CHECK_INTERVAL = 1.0 # Detik antar pengecekan counter kehilangan data akuisisi
+
+# Mode akuisisi serial (lihat acquisition.py)
+ACQ_THREAD = "thread"
+ACQ_PROCESS = "process"
+
+# --- Jenis event yang dikirim ke subscriber ---
+# ("batch", SampleBatch)    : sampel ADC/DI baru dari satu burst serial
+# ("pump", is_started)      : gambar status pompa perlu diperbarui
+# ("mode", mode)            : mode berubah (MODE_MANUAL / MODE_AUTO)
+# ("log", message)          : pesan untuk log aktivitas
+# ("output", n, state)      : perintah OUTnS sudah ditulis ke port
+# ("alarm", Alarm)          : alarm aktif / selesai (lihat alarms.py)
+EVENT_BATCH = "batch"
+EVENT_PUMP = "pump"
+EVENT_MODE = "mode"
+EVENT_LOG = "log"
+EVENT_OUTPUT = "output"
+EVENT_ALARM = "alarm"
+
+OUTPUT_CHANNELS = 4 # OUT1..OUT4 di firmware
+AUTO_OUTPUTS = (1, 3) # Output yang dikendalikan logika Auto (pompa, lampu motor)
+
+
+# --- Fungsi Thread Pembaca Serial ---
+def parse_records(records, t_read, metrics=None):
+    """Parse buffer baris lengkap menjadi SampleBatch dan mencatat metrik tahap parse."""
+    batch, _ = parse_buffer(records)
+    batch.t_read = t_read
+    batch.t_parsed = time.monotonic()
+    if metrics is not None:
+        metrics.observe('parse', batch.t_parsed - t_read)
+        metrics.count('bytes', len(records))
+        metrics.count('lines', len(batch) + batch.malformed)
+        metrics.count('parse_errors', batch.malformed)
+        metrics.count('batches')
+    return batch
+
+
+def serial_reader_thread(ser_instance, data_queue, stop_event=None, metrics=None, reader=None):
+    """
+    Fungsi ini berjalan di thread terpisah untuk membaca data dari port serial.
+    Thread tidur di select() sampai ada data (tanpa polling), lalu semua
+    baris dari satu burst di-parse menjadi satu SampleBatch dan dimasukkan
+    ke dalam queue sebagai satu item. reader: LineReader yang sudah dipakai
+    handshake, agar sisa baris yang belum lengkap tidak hilang.
+    """
+    print(f"Serial reader thread started for {ser_instance.port}")
+    if reader is None:
+        reader = LineReader(ser_instance)
+    while stop_event is None or not stop_event.is_set():
+        try:
+            records = reader.read_records(timeout=0.1)
+            if records:
+                data_queue.put(parse_records(records, time.monotonic(), metrics)) # Satu item queue per burst
+        except EOFError:
+            break # Akhir replay: berhenti tanpa error
+        except (serial.SerialException, OSError, ValueError) as e:
+            if stop_event is not None and stop_event.is_set():
+                break # Port ditutup saat engine berhenti
+            print(f"Serial port error in thread: {e}")
+            break # Keluar dari loop jika ada error serial
+        except Exception as e:
+            print(f"An unexpected error occurred in serial thread: {e}")
+            break # Keluar dari loop jika ada error lain
+
+
+def count_batch_metrics(batch, nbytes, metrics):
+    """Metrik tahap parse untuk batch yang di-parse di proses akuisisi (acquisition.py)."""
+    metrics.observe('parse', batch.t_parsed - batch.t_read)
+    metrics.count('bytes', nbytes)
+    metrics.count('lines', len(batch) + batch.malformed)
+    metrics.count('parse_errors', batch.malformed)
+    metrics.count('batches')
+
+
+def acquisition_reader_thread(acquisition, data_queue, stop_event=None, metrics=None):
+    """
+    Pengganti serial_reader_thread di mode akuisisi "process": mengambil
+    batch dari ring shared memory (tanpa salinan) dan memasukkannya ke queue.
+    """
+    print(f"Acquisition reader started for {acquisition.port} (pid {acquisition.pid})")
+    while stop_event is None or not stop_event.is_set():
+        try:
+            batch = acquisition.read_batch(timeout=0.1)
+        except (serial.SerialException, OSError, ValueError) as e:
+            if stop_event is not None and stop_event.is_set():
+                break
+            print(f"Acquisition process error: {e}")
+            break
+        if batch is not None:
+            if metrics is not None and batch.t_read is not None:
+                count_batch_metrics(batch, acquisition.last_nbytes, metrics)
+            data_queue.put(batch)
+
+
+class PumpEngine:
+    """
+    Engine akuisisi + kontrol pompa. Semua logika mode Auto/Manual ada di
+    sini sehingga kontrol tetap berjalan walaupun GUI tidak dibuka.
+    """
+
+    def __init__(self, port=SERIAL_PORT, baud_rate=BAUD_RATE, calibration_path=CALIBRATION_PATH, archive_dir=ARCHIVE_DIR,
+                 thresholds=None, history_seconds=HISTORY_SECONDS, record_path=None, filters=None, acquisition=None,
+                 adc_subscription=ADC_SUBSCRIPTION, sample_period_ms=ADC_SAMPLE_PERIOD_MS, alarms=None):
+        self.port = port
+        self.baud_rate = baud_rate
+        # "thread": pembaca serial di proses ini; "process": proses anak + ring shared memory
+        self.acquisition = ACQUISITION_MODE if acquisition is None else acquisition
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.calibration = CalibrationSet.load(calibration_path)
+        self.controller = AutoController(self.calibration, self.thresholds) # State machine mode Auto
+        # Filter per channel; kontrol dan tampilan melihat nilai terfilter, arsip nilai mentah
+        self.filters = SignalFilters(SIGNAL_FILTERS if filters is None else filters)
+        self.history = TimeSeriesStore(history_seconds) # Histori semua channel ADC/DI
+        # Aturan alarm operator, dievaluasi per sampel setelah logika auto
+        self.alarms = AlarmEngine(ALARM_RULES if alarms is None else alarms, on_alarm=self._on_alarm,
+                                  calibration=self.calibration)
+        # Arsip on-disk semua sampel mentah + perintah OUT (None = tidak diarsipkan)
+        self.archive = ArchiveWriter(archive_dir) if archive_dir is not None else None
+        # Rekaman byte serial mentah + perintah untuk replay (lihat recording.py)
+        self.record_path = record_path
+        self.recorder = None
+        # Instrumentasi latency / throughput (lihat metrics.py)
+        self.metrics = PipelineMetrics()
+        # Perintah ke MCU ditulis oleh thread CommandWriter (tidak pernah blocking)
+        self.commands = CommandWriter(OUTPUT_FEEDBACK, on_write=self._on_command_written, on_failure=self._on_command_failed,
+                                      metrics=self.metrics)
+
+        # Variabel status
+        self.adc_values = {f'ADC{ch}': 0 for ch in range(ADC_CHANNELS)}
+        self.di_values = {f'IN{ch}': 0 for ch in range(DI_CHANNELS)}
+        self.out_states = {1: False, 2: False, 3: False} # OUT1: Pompa, OUT3: Lampu Motor
+        self.outputs = {n: 0 for n in range(1, OUTPUT_CHANNELS + 1)} # State OUTn terakhir yang ditulis ke port
+        self.mode = MODE_MANUAL # 0 for Manual, 1 for Auto
+        self.state = PUMP_OFF # PUMP_OFF / PUMP_ON (lihat control.py)
+        self.malformed_lines = 0 # Jumlah baris telemetri yang gagal di-parse
+
+        self.ser = None
+        # ADC_Mask / ADC_Period yang dikirim ulang bersama perintah awal (None = bawaan firmware)
+        self.set_adc_subscription(adc_subscription)
+        self.set_sample_period(sample_period_ms)
+        self.startup_times = {} # Detik per tahap start() ('open', 'ready'), untuk laporan startup
+        self.data_queue = queue.Queue()
+        self._register_metrics()
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def _register_metrics(self):
+        metrics = self.metrics
+        metrics.gauges['data_queue_depth'] = self.data_queue.qsize
+        metrics.gauges['command_queue_depth'] = self.commands.pending
+        if self.alarms:
+            metrics.gauges['alarms_active'] = lambda: len(self.alarms.active())
+            metrics.external_counters['alarms_raised'] = lambda: self.alarms.raised
+        if self.archive is not None:
+            metrics.gauges['archive_queue_depth'] = self.archive.pending
+            metrics.external_counters['archive_dropped_batches'] = lambda: self.archive.dropped_batches
+        commands = self.commands
+        metrics.external_counters['commands_written'] = lambda: commands.written
+        metrics.external_counters['commands_coalesced'] = lambda: commands.coalesced
+        metrics.external_counters['commands_dropped'] = lambda: commands.dropped
+        metrics.external_counters['command_verify_failures'] = lambda: commands.failures
+
+    # --- Subscriber ---
+    def subscribe(self, callback):
+        """
+        Mendaftarkan callback(event) yang dipanggil untuk setiap event engine.
+        Callback dipanggil dari thread engine, jadi klien GUI sebaiknya hanya
+        memasukkan event ke queue miliknya sendiri.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Melepas callback yang sebelumnya didaftarkan."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _emit(self, *event):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Subscriber error: {e}")
+
+    def log(self, message):
+        """Mengirim pesan log aktivitas ke semua subscriber."""
+        self._emit(EVENT_LOG, message)
+
+    # --- Serial ---
+    def start(self):
+        """
+        Membuka port serial, menunggu MCU siap (handshake), menjalankan thread
+        pembaca dan thread kontrol, lalu mengirim perintah awal ke mikrokontroler.
+        Melempar serial.SerialException jika port tidak dapat dibuka.
+        """
+        start = time.monotonic()
+        if self.acquisition == ACQ_PROCESS:
+            self.open_acquisition()
+            read_batch = self.ser.read_batch
+        else:
+            self.open_serial()
+            reader = LineReader(self.ser, tap=self.rx_tap())
+
+            def read_batch(timeout):
+                records = reader.read_records(timeout)
+                return parse_records(records, time.monotonic(), self.metrics) if records else None
+        self.startup_times['open'] = time.monotonic() - start
+        ready = self.wait_until_ready(read_batch)
+        self.startup_times['ready'] = ready
+        if ready is None:
+            print(f"Peringatan: {self.ser.port} belum menjawab setelah {MCU_READY_TIMEOUT:g} detik, tetap dilanjutkan.")
+        else:
+            print(f"Koneksi serial ke {self.ser.port} berhasil dibuka, MCU siap dalam {ready * 1e3:.0f} ms.")
+
+        self._stop_event.clear()
+        if self.acquisition == ACQ_PROCESS:
+            acquisition_thread = threading.Thread(target=acquisition_reader_thread,
+                                                  args=(self.ser, self.data_queue, self._stop_event, self.metrics), daemon=True)
+        else:
+            acquisition_thread = threading.Thread(target=serial_reader_thread,
+                                                  args=(self.ser, self.data_queue, self._stop_event, self.metrics, reader), daemon=True)
+        self._threads = [acquisition_thread, threading.Thread(target=self._control_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        self.send_initial_commands()
+
+    def wait_until_ready(self, read_batch, timeout=MCU_READY_TIMEOUT):
+        """
+        Handshake pengganti sleep(2): Arduino reset saat port dibuka dan
+        perintah yang datang selama bootloader berjalan hilang, jadi ADC_Set +
+        ADC0 dikirim ulang setiap MCU_READY_PROBE_SECONDS sampai MCU menjawab
+        dengan sampel. Data selama handshake tidak dibuang (masuk data_queue).
+        read_batch(timeout): SampleBatch berikutnya atau None.
+        Mengembalikan lama menunggu (detik), atau None jika timeout.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        next_probe = start
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            if now >= next_probe:
+                self.send_command_to_mcu("ADC_Set")
+                self.send_command_to_mcu("ADC0")
+                next_probe = now + MCU_READY_PROBE_SECONDS
+            batch = read_batch(min(next_probe, deadline) - now)
+            if batch is not None:
+                self.data_queue.put(batch)
+                if len(batch):
+                    return time.monotonic() - start
+
+    def open_serial(self, timeout=0.1):
+        """
+        Membuka port serial (atau rekaman "replay:PATH[@SPEED]"), arsip dan
+        rekaman sesi (tanpa thread; dipakai juga oleh stations.py).
+        """
+        self.ser = open_port(self.port, self.baud_rate, timeout=timeout)
+        if self.record_path is not None and self.recorder is None:
+            self.recorder = SessionRecorder(self.record_path, self.port, self.baud_rate)
+        self.commands.start(self.ser)
+        if self.archive is not None:
+            self.archive.start()
+
+    def open_acquisition(self):
+        """Menjalankan proses akuisisi (pemilik port serial) dan arsip; lihat acquisition.py."""
+        if self.record_path is not None:
+            print("Perekaman sesi tidak didukung di mode akuisisi process, --record diabaikan.")
+        self.ser = AcquisitionProcess(self.port, self.baud_rate)
+        self.commands.start(self.ser)
+        if self.archive is not None:
+            self.archive.start()
+        acquisition = self.ser
+        for name in ('acq_dropped_bytes', 'acq_gaps', 'acq_uart_overruns', 'acq_ring_overruns'):
+            self.metrics.external_counters[name] = lambda name=name: acquisition.counters()[name]
+
+    def rx_tap(self):
+        """Callback LineReader untuk merekam byte mentah, atau None jika tidak merekam."""
+        return self.recorder.record_rx if self.recorder is not None else None
+
+    def send_initial_commands(self):
+        """Mengirim perintah awal ke mikrokontroler."""
+        self.send_command_to_mcu("DO_Set") # Aktifkan Digital Output
+        self.send_command_to_mcu("ADC_Set") # Aktifkan ADC secara global
+        if self.adc_subscription is not None:
+            self.send_command_to_mcu(adc_mask_command(self.adc_subscription))
+        if self.sample_period_ms is not None:
+            self.send_command_to_mcu(sample_period_command(self.sample_period_ms))
+        self.send_command_to_mcu("ADC_Loop") # Mulai ADC Loop untuk semua channel
+        print("Initial commands (DO_Set, ADC_Set, ADC_Loop) sent.")
+
+        self.send_command_to_mcu(f"OUT1{1}")
+
+    def set_adc_subscription(self, channels):
+        """
+        Channel ADC yang dikirim ADC_Loop firmware (None = semua). Channel lain
+        tetap bisa diminta sekali lewat ADCn. Mode Auto butuh ADC0 dan ADC1.
+        """
+        command = adc_mask_command(range(ADC_CHANNELS) if channels is None else channels)
+        self.adc_subscription = None if channels is None else tuple(sorted(set(channels)))
+        if self.ser and self.ser.is_open:
+            self.send_command_to_mcu(command)
+
+    def set_sample_period(self, period_ms):
+        """Periode Timer1 firmware dalam ms (None = bawaan 100 ms)."""
+        command = sample_period_command(100 if period_ms is None else period_ms)
+        self.sample_period_ms = period_ms
+        if self.ser and self.ser.is_open:
+            self.send_command_to_mcu(command)
+
+    def stop(self):
+        """Menghentikan thread engine dan menutup port serial."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        self.commands.stop() # Kirim sisa antrian perintah dulu
+        if self.archive is not None:
+            self.archive.stop()
+        if self.ser and self.ser.is_open:
+            print("Menutup port serial...")
+            self.ser.close()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def send_command_to_mcu(self, command, origin=None):
+        """
+        Mengantrikan perintah ke mikrokontroler (tidak menunggu port serial).
+        origin: SampleBatch.t_read batch yang memicu perintah (metrik end_to_end).
+        """
+        if self.ser and self.ser.is_open:
+            if not self.commands.send(command, origin):
+                print(f"Antrian perintah penuh, {command} dibuang.")
+        else:
+            print("Serial port not open. Cannot send command.")
+
+    def _on_command_written(self, command, timestamp):
+        """Dipanggil thread CommandWriter setelah perintah benar-benar ditulis."""
+        if self.recorder is not None:
+            self.recorder.record_tx(f"{command}\r\n".encode('utf-8'))
+        output = parse_output_command(command)
+        if output is None:
+            return
+        if output[0] in self.outputs:
+            # Thread CommandWriter: atomik terhadap set_output() dan snapshot Modbus
+            with self._lock:
+                self.outputs[output[0]] = output[1]
+                self._emit(EVENT_OUTPUT, output[0], output[1])
+        if self.archive is not None:
+            self.archive.submit_command(output[0], output[1], timestamp)
+
+    def _on_command_failed(self, output, state, channel):
+        self.log(f"PERINGATAN: OUT{output}={state} tidak terkonfirmasi di IN{channel}.")
+
+    def _on_alarm(self, alarm):
+        """Dipanggil AlarmEngine dari handle_batch untuk setiap alarm aktif / selesai."""
+        self.log(alarm.message)
+        if self.archive is not None:
+            self.archive.submit_alarm(alarm.rule_id, alarm.active, alarm.timestamp)
+        self._emit(EVENT_ALARM, alarm)
+
+    def pump_running(self):
+        """Relay pompa (OUT1, aktif-low) terakhir ditulis dalam keadaan jalan."""
+        return self.outputs[1] == 0
+
+    # --- Loop kontrol ---
+    def _control_loop(self):
+        """Mengambil batch dari queue, memperbarui status dan menjalankan logika auto."""
+        next_calibration_check = time.monotonic() + CALIBRATION_CHECK_INTERVAL
+        next_loss_check = time.monotonic() + LOSS_CHECK_INTERVAL
+        losses = {}
+        while not self._stop_event.is_set():
+            if time.monotonic() >= next_calibration_check:
+                # Kurva kalibrasi bisa diganti tanpa restart
+                self.calibration.reload_if_changed()
+                next_calibration_check = time.monotonic() + CALIBRATION_CHECK_INTERVAL
+            if self.acquisition == ACQ_PROCESS and time.monotonic() >= next_loss_check:
+                losses = self.report_losses(losses)
+                next_loss_check = time.monotonic() + LOSS_CHECK_INTERVAL
+            try:
+                batch = self.data_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch.t_parsed is not None:
+                self.metrics.observe('queue', time.monotonic() - batch.t_parsed)
+            self.handle_batch(batch)
+
+    def report_losses(self, previous):
+        """Log peringatan ke operator untuk setiap counter kehilangan data akuisisi yang naik."""
+        counters = self.ser.counters() if isinstance(self.ser, AcquisitionProcess) else {}
+        for name, value in counters.items():
+            increase = value - previous.get(name, 0)
+            if increase > 0 and previous:
+                self.log(f"PERINGATAN: {name} +{increase} (total {value}), data serial hilang.")
+        return counters
+
+    def handle_batch(self, batch):
+        """
+        Menyaring batch, menjalankan logika auto untuk setiap sampel, lalu
+        memperbarui status dan subscriber (atomik terhadap perintah klien).
+        Kontrol dijalankan lebih dulu agar perintah OUT tidak menunggu GUI.
+        """
+        with self._lock:
+            start = time.monotonic()
+            filtered = self.filters.apply(batch)
+            self.run_auto_logic(filtered)
+            self.metrics.observe('control', time.monotonic() - start)
+            if self.alarms:
+                self.alarms.feed(filtered, raw=batch, pump_running=self.pump_running())
+            self.process_batch(filtered, raw=batch)
+
+    def process_batch(self, batch, raw=None):
+        """
+        Memperbarui nilai ADC/IN terakhir dari satu batch (terfilter) lalu
+        meneruskannya ke subscriber. raw: batch sebelum filter, untuk arsip
+        dan verifikasi perintah (default: batch itu sendiri).
+        """
+        raw = batch if raw is None else raw
+        for channel, value in batch.latest().items():
+            self.adc_values[f'ADC{channel}'] = value
+        for channel, value in zip(batch.di['channel'].tolist(), batch.di['value'].tolist()):
+            name = f'IN{channel}'
+            if self.di_values.get(name) != value:
+                self.log(f"Digital Input {channel}: {value}") # Hanya perubahan: DI_Loop mengirim setiap tick
+            self.di_values[name] = value
+        if len(raw.di):
+            self.commands.notify_inputs(raw.di['channel'].tolist(), raw.di['value'].tolist())
+        self.malformed_lines += batch.malformed # Dihitung, tidak di-print
+        self.history.extend_batch(batch)
+        if self.archive is not None:
+            self.archive.submit_batch(raw)
+        self._emit(EVENT_BATCH, batch)
+
+    def run_auto_logic(self, batch):
+        """Logika mode otomatis (hanya aktif jika mode Auto), dievaluasi per sampel ADC."""
+        if self.mode != MODE_AUTO:
+            return
+
+        # Level/pressure (satuan fisik) pada setiap sampel ADC0/ADC1 di batch
+        level, pressure = self.controller.series(batch.adc, self.adc_values['ADC0'], self.adc_values['ADC1'])
+        i = self.controller.next_transition(self.state, self.out_states[1], level, pressure)
+        while i is not None:
+            self.state, self.out_states[1], actions = self.controller.step(self.state, self.out_states[1], level[i], pressure[i])
+            for command, pump_event, message in actions:
+                self.send_command_to_mcu(command, batch.t_read)
+                if pump_event is not None:
+                    self._emit(EVENT_PUMP, pump_event)
+                self.log(message)
+            i = self.controller.next_transition(self.state, self.out_states[1], level, pressure, i + 1)
+
+    # --- Perintah dari klien (GUI / operator) ---
+    def set_mode(self, mode):
+        """Mengubah mode sistem. Mengembalikan True jika mode berubah."""
+        with self._lock:
+            if self.mode == mode:
+                return False
+            self.mode = mode
+            if mode == MODE_AUTO:
+                print(f"Mode: Auto (Nilai mode sekarang: {self.mode})")
+                self._emit(EVENT_MODE, mode)
+                self.log("Mode diubah ke Otomatis.")
+            else:
+                print(f"Mode: Manual (Nilai mode sekarang: {self.mode})")
+                self._emit(EVENT_MODE, mode)
+                self.log("Mode diubah ke Manual.")
+                # Jika pompa sedang ON karena auto, matikan dulu saat beralih ke manual
+                if self.state == PUMP_OFF:
+                    self.state = PUMP_ON
+                    self.send_command_to_mcu(f"OUT1{int(self.state)}")
+                    self._emit(EVENT_PUMP, False)
+                    self.log("Pompa dimatikan saat beralih ke Mode Manual.")
+            return True
+
+    def manual_pump_on(self):
+        """Menghidupkan pompa secara manual. Mengembalikan False jika mode Auto."""
+        with self._lock:
+            if self.mode != MODE_MANUAL:
+                return False
+            if self.state == PUMP_OFF:
+                self.state = PUMP_ON
+                self.send_command_to_mcu(f"OUT1{int(self.state)}")
+                self._emit(EVENT_PUMP, False)
+                self.log("Manual: Pompa dihidupkan.")
+            print(f"Nilai state sekarang: {self.state}")
+            return True
+
+    def manual_pump_off(self):
+        """Mematikan pompa secara manual. Mengembalikan False jika mode Auto."""
+        with self._lock:
+            if self.mode != MODE_MANUAL:
+                return False
+            if self.state == PUMP_ON:
+                self.state = PUMP_OFF
+                self.send_command_to_mcu(f"OUT1{int(self.state)}")
+                self._emit(EVENT_PUMP, True)
+                self.log("Manual: Pompa dimatikan.")
+            print(f"Nilai state sekarang: {self.state}")
+            return True
+
+    def set_output(self, output, state):
+        """
+        Perintah OUTn dari klien eksternal (mis. Modbus). Mengembalikan False
+        jika perintah tidak dikirim: output milik logika Auto di mode Auto,
+        port tertutup atau antrian perintah penuh. Untuk OUT1 level yang
+        diminta dibandingkan dengan level yang terakhir ditulis (bukan
+        self.state), lalu state pompa dan event pump disesuaikan.
+        """
+        level = int(bool(state))
+        with self._lock:
+            if self.mode == MODE_AUTO and output in AUTO_OUTPUTS:
+                return False
+            if output != 1:
+                return self._send_output(output, level)
+            queued = self.commands.pending_output(1)
+            if level != (self.outputs[1] if queued is None else queued):
+                if not self._send_output(1, level):
+                    return False
+            elif self.state == level:
+                return True # Relay dan state pompa sudah (atau segera) pada level itu
+            # Sama dengan manual_pump_on/off: state = level OUT1, OUT10 = pompa jalan (aktif-low)
+            self.state = PUMP_ON if level else PUMP_OFF
+            self._emit(EVENT_PUMP, level == 0)
+            self.log(f"Klien eksternal: OUT1={level}, pompa {'mati' if level else 'jalan'}.")
+            return True
+
+    def _send_output(self, output, level):
+        """Mengantrikan OUTn; False jika port tertutup atau antrian penuh."""
+        if not (self.ser and self.ser.is_open):
+            print("Serial port not open. Cannot send command.")
+            return False
+        if not self.commands.send(f"OUT{output}{level}"):
+            print(f"Antrian perintah penuh, OUT{output}{level} dibuang.")
+            return False
+        return True
+
+
+def print_event(event):
+    """Subscriber sederhana untuk mode daemon: tulis log ke stdout."""
+    if event[0] == EVENT_LOG:
+        print(time.strftime("[%H:%M:%S]"), event[1])
+
+
+# === Main Program (headless) ===
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="BAS pump engine (headless)")
+    arg_parser.add_argument("--port", default=SERIAL_PORT)
+    arg_parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    arg_parser.add_argument("--auto", action="store_true", help="Langsung masuk mode Otomatis")
+    arg_parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Port endpoint Prometheus (0 = mati)")
+    arg_parser.add_argument("--record", help="Rekam byte serial mentah + perintah ke file .basrec")
+    arg_parser.add_argument("--modbus-port", type=int, default=MODBUS_PORT or 0, help="Port server Modbus TCP (0 = mati)")
+    arg_parser.add_argument("--acquisition", choices=(ACQ_THREAD, ACQ_PROCESS), default=ACQUISITION_MODE,
+                            help="Pembaca serial di thread atau di proses anak (shared memory)")
+    arg_parser.add_argument("--adc-channels", type=int, nargs="+", default=ADC_SUBSCRIPTION,
+                            help="Channel ADC yang dikirim ADC_Loop, mis. 0 1 (bawaan: semua)")
+    arg_parser.add_argument("--sample-period", type=int, default=ADC_SAMPLE_PERIOD_MS, help="Periode sampling firmware dalam ms (bawaan: 100)")
+    args = arg_parser.parse_args()
+
+    engine = PumpEngine(args.port, args.baud, record_path=args.record, acquisition=args.acquisition,
+                        adc_subscription=args.adc_channels, sample_period_ms=args.sample_period)
+    engine.subscribe(print_event)
+    if args.metrics_port:
+        MetricsServer(lambda: [({}, engine.metrics)], args.metrics_port).start()
+    if args.modbus_port:
+        from modbus import ModbusServer # modbus.py mengimpor engine
+        ModbusServer(lambda: {1: engine}, args.modbus_port).start()
+    engine.start()
+    if args.auto:
+        engine.set_mode(MODE_AUTO)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
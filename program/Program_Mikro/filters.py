@@ -0,0 +1,183 @@
+"""
+Filter sinyal streaming per channel sebelum kontrol Auto dan tampilan.
+
+Setiap channel (mis. "ADC0", "IN0") punya rantai filter sendiri yang
+dijalankan berurutan pada semua sampel channel itu di satu SampleBatch.
+Setiap filter menyimpan state-nya di antara batch, jadi hasilnya sama
+persis dengan memproses sampel satu per satu, tetapi dihitung dengan operasi
+NumPy per batch. Biaya per sampel konstan (tidak bergantung panjang histori):
+
+    median    window            median bergerak kausal (O(window) per sampel)
+    spike     window, max_delta sampel yang menyimpang > max_delta dari median
+                                window diganti median (filter Hampel)
+    ema       alpha             exponential moving average y += alpha * (x - y)
+    debounce  hold_s            nilai baru diteruskan hanya setelah stabil
+                                hold_s detik (untuk DI / sinyal diskrit)
+
+Nilai tetap dalam count ADC mentah (dibulatkan), jadi kalibrasi, histori dan
+kontrol tidak berubah. Arsip menyimpan nilai mentah sebelum filter.
+Konfigurasi: config.SIGNAL_FILTERS atau "filters" per stasiun di stations.json:
+
+    {"ADC0": [{"type": "median", "window": 5}],
+     "IN0": [{"type": "debounce", "hold_s": 0.5}]}
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from samples import SampleBatch, KIND_ADC, KIND_DI
+
+# Batas (1 - alpha) ** -n pada satu blok EMA, agar tidak overflow
+_EMA_MAX_SCALE_LOG = 150 * np.log(10)
+_EMA_MAX_BLOCK = 256
+
+
+class MedianFilter:
+    """Median bergerak kausal atas `window` sampel terakhir."""
+
+    def __init__(self, window=5):
+        self.window = int(window)
+        self._tail = None # window - 1 input terakhir
+
+    def medians(self, x):
+        if self._tail is None:
+            self._tail = np.full(self.window - 1, x[0]) # Awal: anggap sinyal konstan
+        extended = np.concatenate((self._tail, x))
+        self._tail = extended[len(extended) - (self.window - 1):]
+        return np.median(sliding_window_view(extended, self.window), axis=1)
+
+    def apply(self, t, x):
+        return self.medians(x)
+
+
+class SpikeFilter(MedianFilter):
+    """Filter Hampel: sampel yang menyimpang lebih dari max_delta dari median diganti median."""
+
+    def __init__(self, window=5, max_delta=50):
+        super().__init__(window)
+        self.max_delta = max_delta
+
+    def apply(self, t, x):
+        median = self.medians(x)
+        return np.where(np.abs(x - median) > self.max_delta, median, x)
+
+
+class EMAFilter:
+    """Exponential moving average y[n] = y[n-1] + alpha * (x[n] - y[n-1])."""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = float(alpha)
+        self._y = None
+        decay = 1.0 - self.alpha
+        # Blok sepanjang mungkin dengan decay ** -n masih jauh dari overflow
+        limit = int(_EMA_MAX_SCALE_LOG / -np.log(decay)) if 0.0 < decay < 1.0 else _EMA_MAX_BLOCK
+        self._block = max(1, min(_EMA_MAX_BLOCK, limit))
+
+    def apply(self, t, x):
+        alpha = self.alpha
+        if alpha >= 1.0:
+            self._y = x[-1]
+            return x
+        if self._y is None:
+            self._y = x[0]
+        decay = 1.0 - alpha
+        out = np.empty(len(x))
+        for start in range(0, len(x), self._block):
+            # Bentuk tertutup rekursi per blok:
+            # y[k] = decay**(k+1) * y0 + alpha * sum_j decay**(k-j) * x[j]
+            block = x[start:start + self._block]
+            k = np.arange(len(block))
+            powers = decay ** (k + 1)
+            out[start:start + len(block)] = powers * (self._y + alpha * np.cumsum(block / powers))
+            self._y = out[start + len(block) - 1]
+        return out
+
+
+class Debounce:
+    """Nilai baru diteruskan hanya setelah input tetap sama selama hold_s detik."""
+
+    def __init__(self, hold_s=0.5):
+        self.hold_s = hold_s
+        self._out = None # Nilai output sekarang
+        self._value = None # Nilai input terakhir dan sejak kapan nilai itu bertahan
+        self._since = None
+
+    def apply(self, t, x):
+        if self._out is None:
+            self._out, self._value, self._since = x[0], x[0], t[0]
+        n = len(x)
+        positions = np.arange(n)
+        prev = np.concatenate(([self._value], x[:-1]))
+        changed = x != prev
+        # Awal run nilai yang sama untuk setiap sampel (run pertama bisa dimulai di batch sebelumnya)
+        run_start = np.maximum.accumulate(np.where(changed, positions, -1))
+        since = np.where(run_start >= 0, t[np.maximum(run_start, 0)], self._since)
+        stable = (t - since) >= self.hold_s
+        last_stable = np.maximum.accumulate(np.where(stable, positions, -1))
+        out = np.where(last_stable >= 0, x[np.maximum(last_stable, 0)], self._out)
+        self._out, self._value, self._since = out[-1], x[-1], since[-1]
+        return out
+
+
+FILTER_TYPES = {
+    "median": MedianFilter,
+    "spike": SpikeFilter,
+    "ema": EMAFilter,
+    "debounce": Debounce,
+}
+
+
+def make_filter(spec):
+    """Filter dari satu entri konfigurasi {"type": ..., parameter...}."""
+    params = dict(spec)
+    kind = params.pop("type")
+    if kind not in FILTER_TYPES:
+        raise ValueError(f"Tipe filter tidak dikenal: {kind}")
+    return FILTER_TYPES[kind](**params)
+
+
+def parse_channel(name):
+    """("adc" | "di", nomor channel) dari nama "ADCn" / "INn"."""
+    if name.startswith("ADC"):
+        return KIND_ADC, int(name[3:])
+    if name.startswith("IN"):
+        return KIND_DI, int(name[2:])
+    raise ValueError(f"Nama channel tidak dikenal: {name}")
+
+
+class SignalFilters:
+    """Rantai filter untuk setiap channel yang dikonfigurasi."""
+
+    def __init__(self, spec=None):
+        self.chains = {}
+        for name, stages in (spec or {}).items():
+            if stages:
+                self.chains[parse_channel(name)] = [make_filter(stage) for stage in stages]
+
+    def __bool__(self):
+        return bool(self.chains)
+
+    def _filter_records(self, kind, records):
+        chains = [(ch, chain) for (k, ch), chain in self.chains.items() if k == kind]
+        if not chains or not len(records):
+            return records
+        records = records.copy()
+        for ch, chain in chains:
+            mask = records['channel'] == ch
+            if not mask.any():
+                continue
+            t = records['timestamp'][mask]
+            values = records['value'][mask].astype(np.float64)
+            for stage in chain:
+                values = stage.apply(t, values)
+            records['value'][mask] = np.clip(np.rint(values), 0, np.iinfo(records['value'].dtype).max)
+        return records
+
+    def apply(self, batch):
+        """SampleBatch baru berisi nilai terfilter (batch asli tidak diubah)."""
+        if not self.chains:
+            return batch
+        filtered = SampleBatch(self._filter_records(KIND_ADC, batch.adc), self._filter_records(KIND_DI, batch.di),
+                               batch.received, batch.malformed)
+        filtered.t_read = batch.t_read
+        filtered.t_parsed = batch.t_parsed
+        return filtered
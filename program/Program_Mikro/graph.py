@@ -0,0 +1,178 @@
+"""
+Grafik real-time water level + pressure dengan blitting dan decimation.
+
+- Sumbu X memakai waktu relatif (-jendela .. 0 detik), sehingga sumbu, tick
+  dan legend tidak berubah setiap frame. Latar belakang statis disimpan
+  sekali (copy_from_bbox) dan setiap update hanya menggambar ulang dua garis
+  lalu blit ke layar.
+- update() tidak menggambar apa pun jika tidak ada sampel baru, jendela
+  tidak digeser dan kalibrasi tidak berubah.
+- Jika jumlah sampel di jendela melebihi lebar plot dalam piksel, data
+  di-decimate min/max per kolom piksel, jadi biaya gambar bergantung pada
+  lebar layar, bukan pada panjang histori. Jendela panjang diambil dari
+  rollup histori (TimeSeriesStore.envelope), bukan dari data mentah.
+- Ctrl + scroll: zoom jendela waktu (ZOOM_STEPS, 10 detik .. 7 hari);
+  scroll biasa: geser jendela ke data lama / baru.
+"""
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config import WATER_LEVEL_MAX_METER, PRESSURE_MAX_BAR
+
+GRAPH_WINDOW_SECONDS = 20.0 # Lebar jendela waktu grafik (detik)
+# Lebar jendela yang bisa dipilih dengan Ctrl + scroll (detik)
+ZOOM_STEPS = (10, 20, 60, 300, 900, 3600, 4 * 3600, 12 * 3600, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600)
+# Satuan label sumbu X: (lebar jendela minimum, pembagi, nama)
+TIME_UNITS = ((2 * 24 * 3600, 24 * 3600, "days"), (2 * 3600, 3600, "h"), (300, 60, "min"), (0, 1, "s"))
+
+
+def time_unit(window_seconds):
+    """(pembagi, nama satuan) untuk sumbu X dengan lebar jendela ini."""
+    for minimum, divisor, name in TIME_UNITS:
+        if window_seconds >= minimum:
+            return divisor, name
+    return 1, "s"
+
+
+class RealtimeGraph:
+    """
+    Grafik histori engine (ADC0 = water level, ADC1 = pressure) untuk di-embed
+    di Tk. Dengan master=None grafik digambar ke canvas Agg tanpa jendela.
+    """
+
+    def __init__(self, master, engine, water_channel, pressure_channel, window_seconds=GRAPH_WINDOW_SECONDS):
+        self.engine = engine
+        self.channels = (water_channel, pressure_channel)
+        self.window_seconds = window_seconds
+        self.offset_s = 0.0 # Geser ke belakang (detik) saat scroll histori
+
+        self.fig = Figure(figsize=(4, 2.5), dpi=100)
+        self.ax1 = self.fig.add_subplot()
+        self.ax2 = self.ax1.twinx() # Sumbu Y kedua untuk ADC1
+
+        # animated=True: garis tidak ikut tergambar di latar belakang statis
+        self.line1, = self.ax1.plot([], [], 'g-', label='Water Level (m)', animated=True) # Hijau untuk Water Level
+        self.line2, = self.ax2.plot([], [], '-', color='orange', label='Pressure (Bar)', animated=True) # Oranye untuk Pressure
+
+        self.ax1.set_ylabel("Water Level (m)", color='g')
+        self.ax2.set_ylabel("Pressure (Bar)", color='orange')
+
+        self.ax1.tick_params(axis='y', labelcolor='g')
+        self.ax2.tick_params(axis='y', labelcolor='orange')
+
+        self._set_xaxis()
+        # Batas Y untuk Water Level (0-5 meter)
+        self.ax1.set_ylim(0, WATER_LEVEL_MAX_METER * 1.1)
+        # Batas Y untuk Pressure (0-10 Bar)
+        self.ax2.set_ylim(0, PRESSURE_MAX_BAR * 1.1)
+
+        self.fig.legend(loc="upper left", bbox_to_anchor=(0.05, 0.95))
+        self.fig.tight_layout() # Menyesuaikan layout agar label tidak tumpang tindih
+
+        if master is not None:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+            self.widget = self.canvas.get_tk_widget()
+        else:
+            # Tanpa Tk (benchmark / tes headless): render ke buffer Agg saja
+            self.canvas = FigureCanvasAgg(self.fig)
+            self.widget = None
+        self._background = None
+        self._last_key = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll) # Scroll untuk melihat histori
+
+    def _set_xaxis(self):
+        """Sumbu X tetap (waktu relatif terhadap ujung kanan jendela) dalam satuan yang sesuai."""
+        divisor, unit = time_unit(self.window_seconds)
+        self._time_divisor = divisor
+        self.ax1.set_xlim(-self.window_seconds / divisor, 0)
+        if self.offset_s > 0:
+            self.ax1.set_xlabel(f"Time ({unit}), {self.offset_s / divisor:.0f} {unit} yang lalu")
+        else:
+            self.ax1.set_xlabel(f"Time ({unit})")
+
+    def _on_draw(self, event):
+        """Setelah gambar penuh (awal, resize, scroll): simpan latar belakang statis."""
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._blit_lines()
+
+    def _blit_lines(self):
+        self.ax1.draw_artist(self.line1)
+        self.ax2.draw_artist(self.line2)
+        self.canvas.blit(self.fig.bbox)
+
+    def invalidate(self):
+        """Paksa gambar penuh pada update berikutnya."""
+        self._background = None
+        self._last_key = None
+
+    def update(self):
+        """
+        Memperbarui garis dari histori engine. Mengembalikan True jika ada
+        yang digambar, False jika tidak ada perubahan sejak update terakhir.
+        """
+        history = self.engine.history
+        span = history.time_span()
+        calibration = self.engine.calibration
+        key = (None if span is None else span[1], self.offset_s, self.window_seconds, id(calibration.tables))
+        if key == self._last_key:
+            return False
+        self._last_key = key
+        if span is None:
+            return False
+
+        # Jendela waktu yang ditampilkan; offset_s > 0 berarti sedang melihat data lama
+        t_end = span[1] - self.offset_s
+        t_start = t_end - self.window_seconds
+        n_bins = max(1, int(self.ax1.bbox.width))
+        for line, ch in zip((self.line1, self.line2), self.channels):
+            # Rentang pendek dari data mentah, rentang panjang dari rollup
+            t, raw = history.envelope(ch, t_start, t_end, n_bins)
+            line.set_data((t - t_end) / self._time_divisor, calibration.convert_array(ch, raw))
+
+        if self._background is None:
+            self.canvas.draw() # Gambar penuh pertama; _on_draw menyimpan latar belakang
+        else:
+            self.canvas.restore_region(self._background)
+            self._blit_lines()
+        return True
+
+    def set_window(self, seconds):
+        """Mengganti lebar jendela waktu (zoom) lalu menggambar ulang."""
+        self.window_seconds = float(seconds)
+        self._clamp_offset()
+        self._set_xaxis()
+        self.invalidate() # Sumbu berubah: perlu gambar penuh lagi
+        self.update()
+
+    def _clamp_offset(self):
+        # Batasi agar tidak melewati data tertua / terbaru di histori
+        span = self.engine.history.time_span()
+        limit = 0.0 if span is None else max(0.0, span[1] - span[0] - self.window_seconds)
+        self.offset_s = min(max(self.offset_s, 0.0), limit)
+
+    def on_scroll(self, event):
+        """
+        Scroll mouse di grafik: geser jendela waktu ke belakang (up) atau ke
+        depan (down). Dengan Ctrl: zoom out (up) / zoom in (down).
+        """
+        if event.key is not None and 'control' in event.key:
+            smaller = [s for s in ZOOM_STEPS if s < self.window_seconds]
+            larger = [s for s in ZOOM_STEPS if s > self.window_seconds]
+            steps = larger[:1] if event.button == 'up' else smaller[-1:]
+            if steps:
+                self.set_window(steps[0])
+            return
+        if self.engine.history.time_span() is None:
+            return
+        step = self.window_seconds / 2
+        self.offset_s += step if event.button == 'up' else -step
+        self._clamp_offset()
+        self._set_xaxis()
+        self.invalidate() # Label berubah: perlu gambar penuh lagi
+        self.update()
+
+    def close(self):
+        if self.widget is not None:
+            self.widget.destroy()
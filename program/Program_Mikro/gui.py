@@ -1,112 +1,58 @@
+import time
+STARTUP_T0 = time.perf_counter() # Awal impor modul GUI (laporan waktu startup)
+
 import tkinter as tk
-from tkinter import PhotoImage, messagebox, ttk # Import ttk untuk styling
+from tkinter import messagebox, ttk # Import ttk untuk styling
 import os
 import serial
-import threading
 import queue
-import time
-from collections import deque
-from pathlib import Path
 
-# Untuk grafik real-time
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.animation as animation
+# graph.py (matplotlib) baru diimpor saat grafik pertama kali ditampilkan
+from assets import AssetManager
+from logview import LogView
+from render import RenderScheduler, configure
+from statsview import StatsPanel
 
 # === CONFIG ===
-SERIAL_PORT = 'COM23'  # <--- PASTIKAN INI SESUAI DENGAN PORT SERIAL MIKROKONTROLER ANDA
-BAUD_RATE = 115200
-THRESHOLD_ADC0 = 800   # Threshold untuk water level (raw ADC value)
-THRESHOLD_ADC1 = 600   # Threshold untuk pressure (raw ADC value)
-
-# Range konversi ADC ke nilai fisik
-ADC_MAX_VALUE = 1023 # Untuk ADC 10-bit
-
-# Water Level: 0-5 meter
-WATER_LEVEL_MAX_METER = 5.0
-WATER_LEVEL_ON_THRESHOLD_METER = 2.5 # Pompa nyala jika > 3 meter
-WATER_LEVEL_OFF_THRESHOLD_METER = 0.5 # Pompa mati jika <= 0.5 meter
-
-# Pressure: 0-10 Bar (asumsi standar untuk sensor pompa air)
-PRESSURE_MAX_BAR = 10.0 
-PRESSURE_MOTOR_OFF_THRESHOLD_BAR = 1.0 # Motor mati jika pressure <= 1.0 Bar
-
-# Path untuk aset gambar
-OUTPUT_PATH = Path(__file__).parent
-ASSETS_PATH = OUTPUT_PATH / Path(r"C:\Users\ia088\Downloads\projek hendri\assets\frame0")
-
-def relative_to_assets(path: str) -> Path:
-    return ASSETS_PATH / Path(path)
-
-# --- Queue untuk Komunikasi Antar Thread ---
-# Data yang diterima dari serial akan dimasukkan ke queue ini oleh thread serial reader
-# dan dibaca oleh main GUI thread.
-serial_data_queue = queue.Queue()
-
-# --- Fungsi Thread Pembaca Serial ---
-def serial_reader_thread(ser_instance, data_queue):
-    """
-    Fungsi ini berjalan di thread terpisah untuk membaca data dari port serial.
-    Data yang diterima akan dimasukkan ke dalam queue.
-    """
-    print(f"Serial reader thread started for {ser_instance.port}")
-    while True:
-        try:
-            if ser_instance.is_open and ser_instance.in_waiting > 0:
-                # Baca satu baris penuh yang diakhiri dengan newline/carriage return
-                line = ser_instance.readline().decode('utf-8').strip()
-                if line:
-                    data_queue.put(line) # Masukkan data ke queue
-                    # print(f"Received (thread): {line}") # Debugging
-            time.sleep(0.01) # Beri sedikit delay agar tidak terlalu membebani CPU
-        except serial.SerialException as e:
-            print(f"Serial port error in thread: {e}")
-            break # Keluar dari loop jika ada error serial
-        except Exception as e:
-            print(f"An unexpected error occurred in serial thread: {e}")
-            break # Keluar dari loop jika ada error lain
+from config import SERIAL_PORT, BAUD_RATE, ADC_MAX_VALUE, METRICS_PORT, MODBUS_PORT, ACQUISITION_MODE, ADC_SUBSCRIPTION, ADC_SAMPLE_PERIOD_MS
+from metrics import MetricsServer
+from engine import (
+    PumpEngine, MODE_AUTO, MODE_MANUAL, EVENT_BATCH, EVENT_PUMP, EVENT_MODE, EVENT_LOG,
+    CH_WATER_LEVEL, CH_PRESSURE,
+)
+
+GRAPH_INTERVAL_MS = 200 # Periode pengecekan data baru untuk grafik
+RENDER_COUNTERS = ('applied', 'unchanged', 'coalesced', 'deferred') # Statistik RenderScheduler yang diekspor
 
 class App:
-    def __init__(self, master):
+    def __init__(self, master, engine=None, owns_engine=None):
         self.master = master
         self.master.title("BAS Pump Monitoring System")
         self.master.geometry("1280x800")
         self.master.resizable(False, False)
         self.master.configure(bg="#FFFFFF")
 
-        # Variabel status
-        self.adc_values = {'ADC0': 0, 'ADC1': 0}
+        # Variabel status (status kontrol dipegang oleh engine)
         self.monitoring = False
-        self.out_states = {1: False, 2: False, 3: False} # OUT1: Pompa, OUT3: Lampu Motor
-        self.mode = 0 # 0 for Manual, 1 for Auto
-        self.state = 0 # 0 for OFF, 1 for ON (for pump)
         self.log = 0 # Bitmask for logging/grafik (0: None, 1: Log, 2: Grafik, 3: Keduanya)
 
-        # Inisialisasi Serial Port
-        self.ser = None
-        
-        try:
-            self.ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=0.1)
-            time.sleep(2) # Tunggu sebentar agar Arduino siap
-            print(f"Koneksi serial ke {self.ser.port} berhasil dibuka.")
-            
-            # Mulai thread pembaca serial
-            self.serial_thread = threading.Thread(target=serial_reader_thread, args=(self.ser, serial_data_queue), daemon=True)
-            self.serial_thread.start()
-
-            # Kirim perintah awal ke mikrokontroler
-            self.send_command_to_mcu("DO_Set") # Aktifkan Digital Output
-            self.send_command_to_mcu("ADC_Set") # Aktifkan ADC secara global
-            self.send_command_to_mcu("ADC_Loop") # Mulai ADC Loop untuk semua channel
-            print("Initial commands (DO_Set, ADC_Set, ADC_Loop) sent.")
-
-            self.send_command_to_mcu(f"OUT1{1}")
-            
-        except serial.SerialException as e:
-            messagebox.showerror("Serial Port Error", f"Tidak dapat membuka port serial {SERIAL_PORT}:\n{e}\nPastikan mikrokontroler terhubung dan port yang benar dipilih.")
-            print(f"Error: Tidak dapat membuka port serial {SERIAL_PORT} - {e}")
-            self.master.destroy() # Tutup jendela jika gagal membuka serial port
-            return
+        # --- Engine akuisisi & kontrol ---
+        # GUI hanya klien: event engine dimasukkan ke queue ini dan dibaca oleh main GUI thread.
+        self.event_queue = queue.Queue()
+        self.engine = engine if engine is not None else PumpEngine(SERIAL_PORT, BAUD_RATE)
+        # Engine yang belum dijalankan akan dijalankan (dan ditutup) oleh GUI ini,
+        # kecuali engine dikelola pihak lain (mis. StationManager di overview.py)
+        self.owns_engine = self.engine.ser is None if owns_engine is None else owns_engine
+
+        if self.owns_engine:
+            try:
+                self.engine.start()
+            except serial.SerialException as e:
+                messagebox.showerror("Serial Port Error", f"Tidak dapat membuka port serial {self.engine.port}:\n{e}\nPastikan mikrokontroler terhubung dan port yang benar dipilih.")
+                print(f"Error: Tidak dapat membuka port serial {self.engine.port} - {e}")
+                self.master.destroy() # Tutup jendela jika gagal membuka serial port
+                return
+        self.engine.subscribe(self.event_queue.put)
 
         # === GUI Elements ===
         self.canvas = tk.Canvas(
@@ -142,8 +88,9 @@ class App:
         # `borderradius`: Untuk sudut membulat (tidak didukung secara langsung oleh semua tema ttk)
         
         # Kita akan membuat style baru yang spesifik untuk progress bar kita
-        self.style.element_create("progressbar.trough", "from", "clam")
-        self.style.element_create("progressbar.pbar", "from", "clam")
+        if "progressbar.pbar" not in self.style.element_names(): # Sekali per interpreter Tk (drill-down bisa membuka beberapa App)
+            self.style.element_create("progressbar.trough", "from", "clam")
+            self.style.element_create("progressbar.pbar", "from", "clam")
 
         self.style.layout("BabyBlue.Horizontal.TProgressbar",
                           [('progressbar.trough', {'children':
@@ -172,11 +119,23 @@ class App:
         # Inisialisasi status pompa awal
         self.status_pompa(False) # Pompa awalnya OFF
 
+        # Pembaruan widget dikumpulkan per frame (nilai terakhir, dilewati jika tidak berubah)
+        self.render = RenderScheduler(metrics=self.engine.metrics)
+
         # Mulai pembaruan GUI dari Queue
-        self.master.after(100, self.check_serial_queue) # Cek setiap 100ms
+        self.queue_job = self.master.after(100, self.check_serial_queue) # Cek setiap 100ms
 
         # Set protokol penutupan jendela
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+        # Panel statistik pipeline (F2); kedalaman queue GUI ikut diekspor
+        self.stats_panel = None
+        self.engine.metrics.gauges['gui_event_queue_depth'] = self.event_queue.qsize
+        self.engine.metrics.gauges['gui_render_pending'] = self.render.pending
+        render = self.render
+        for name in RENDER_COUNTERS:
+            self.engine.metrics.external_counters[f'gui_render_{name}'] = lambda name=name: getattr(render, name)
+        self.master.bind("<F2>", self.show_stats)
         
         # Inisialisasi gambar image_2 dan logic_log
         self.image_2_id = None # ID untuk image_2 di canvas
@@ -193,100 +152,75 @@ class App:
             height=250, # Tinggi log
             state='hidden' # Sembunyikan secara default
         )
+        self.log_view = LogView(self.log_text) # Log dibatasi MAX_LOG_LINES baris
         self.add_log_entry("Sistem dimulai.")
 
         # --- Inisialisasi Grafik Real-time ---
-        self.data_adc0_graph = deque(maxlen=100)
-        self.data_adc1_graph = deque(maxlen=100)
-        self.time_data_graph = deque(maxlen=100)
-
-        self.fig, self.ax1 = plt.subplots(figsize=(4, 2.5), dpi=100)
-        self.ax2 = self.ax1.twinx() # Sumbu Y kedua untuk ADC1
-        
-        self.line1, = self.ax1.plot([], [], 'g-', label='Water Level (m)') # Hijau untuk Water Level
-        self.line2, = self.ax2.plot([], [], 'o-', color='orange', label='Pressure (Bar)') # Oranye untuk Pressure
-
-        self.ax1.set_xlabel("Time (s)")
-        self.ax1.set_ylabel("Water Level (m)", color='g')
-        self.ax2.set_ylabel("Pressure (Bar)", color='orange')
-        
-        self.ax1.tick_params(axis='y', labelcolor='g')
-        self.ax2.tick_params(axis='y', labelcolor='orange')
-        
-        # Batas Y untuk Water Level (0-5 meter)
-        self.ax1.set_ylim(0, WATER_LEVEL_MAX_METER * 1.1) 
-        # Batas Y untuk Pressure (0-10 Bar)
-        self.ax2.set_ylim(0, PRESSURE_MAX_BAR * 1.1) 
-
-        self.fig.legend(loc="upper left", bbox_to_anchor=(0.05, 0.95))
-        self.fig.tight_layout() # Menyesuaikan layout agar label tidak tumpang tindih
-
-        self.graph_canvas = FigureCanvasTkAgg(self.fig, master=self.canvas)
-        self.graph_widget = self.graph_canvas.get_tk_widget()
-        # Posisi awal (akan diatur ulang oleh logic_log)
+        # Data grafik diambil dari histori engine; hanya digambar ulang (blit) saat ada sampel baru.
+        # Figure dan matplotlib baru dibuat saat grafik pertama kali ditampilkan (ensure_graph).
+        self.graph = None
+        self.graph_job = None # ID after() untuk update grafik, None jika grafik tidak aktif
+        # Posisi awal (akan diatur ulang oleh logic_log); widget dipasang oleh ensure_graph
         self.graph_widget_id = self.canvas.create_window(
             639.0, 299.0, # Posisi default, akan diubah
-            window=self.graph_widget,
             anchor="center",
             width=400, # Lebar grafik
             height=250, # Tinggi grafik
             state='hidden' # Sembunyikan secara default
         )
-        self.ani = animation.FuncAnimation(self.fig, self.animate_graph, interval=200, blit=False) # Update setiap 200ms
 
         self.logic_log(0) # Panggil sekali untuk inisialisasi awal (menampilkan image_2 default)
 
     def load_images(self):
-        """Memuat semua PhotoImage objek."""
-        self.image_image_1 = PhotoImage(file=relative_to_assets("image_1.png"))
-        self.image_image_3 = PhotoImage(file=relative_to_assets("image_3.png"))
-        self.image_image_4 = PhotoImage(file=relative_to_assets("image_4.png"))
-        self.image_image_5 = PhotoImage(file=relative_to_assets("image_5.png"))
-        self.image_image_6 = PhotoImage(file=relative_to_assets("image_6.png"))
-        self.image_image_7 = PhotoImage(file=relative_to_assets("image_7.png"))
-        self.image_image_8 = PhotoImage(file=relative_to_assets("image_8.png"))
-        self.image_image_9 = PhotoImage(file=relative_to_assets("image_9.png"))
-        self.image_image_10 = PhotoImage(file=relative_to_assets("image_10.png"))
-        self.image_image_11 = PhotoImage(file=relative_to_assets("image_11.png"))
-        self.image_image_12 = PhotoImage(file=relative_to_assets("image_12.png"))
+        """
+        Memuat gambar yang tampil saat startup. Gambar lain (panel log/grafik
+        image_2_1..3, status pompa ON) di-decode oleh self.assets saat dipakai.
+        """
+        self.assets = AssetManager(self.master)
+        asset = self.assets.get
+        self.image_image_1 = asset("image_1.png")
+        self.image_image_3 = asset("image_3.png")
+        self.image_image_4 = asset("image_4.png")
+        self.image_image_5 = asset("image_5.png")
+        self.image_image_6 = asset("image_6.png")
+        self.image_image_7 = asset("image_7.png")
+        self.image_image_8 = asset("image_8.png")
+        self.image_image_9 = asset("image_9.png")
+        self.image_image_10 = asset("image_10.png")
+        self.image_image_11 = asset("image_11.png")
+        self.image_image_12 = asset("image_12.png")
         
-        # Gambar untuk status pompa
-        self.image_image_13_1 = PhotoImage(file=relative_to_assets("image_13_1.png")) # OFF
-        self.image_image_13_2 = PhotoImage(file=relative_to_assets("image_13_2.png")) # ON
+        # Gambar untuk status pompa (ON: image_13_2.png, dimuat saat pompa pertama kali jalan)
+        self.image_image_13_1 = asset("image_13_1.png") # OFF
         
-        self.image_image_14 = PhotoImage(file=relative_to_assets("image_14.png"))
-        self.image_image_15 = PhotoImage(file=relative_to_assets("image_15.png"))
+        self.image_image_14 = asset("image_14.png")
+        self.image_image_15 = asset("image_15.png")
         
         # Gambar untuk background nilai ADC (image_16 dan image_17)
         try:
-            self.image_image_16 = PhotoImage(file=relative_to_assets("image_16.png"))
+            self.image_image_16 = asset("image_16.png")
         except tk.TclError:
             print("Warning: image_16.png not found. Using placeholder.")
-            self.image_image_16 = PhotoImage(width=100, height=50)
+            self.image_image_16 = tk.PhotoImage(width=100, height=50)
             self.image_image_16.put("red", to=(0,0,99,49))
 
         try:
-            self.image_image_17 = PhotoImage(file=relative_to_assets("image_17.png"))
+            self.image_image_17 = asset("image_17.png")
         except tk.TclError:
             print("Warning: image_17.png not found. Using placeholder.")
-            self.image_image_17 = PhotoImage(width=100, height=10)
+            self.image_image_17 = tk.PhotoImage(width=100, height=10)
             self.image_image_17.put("blue", to=(0,0,99,49))
         
-        # Gambar tombol
-        self.button_image_1 = PhotoImage(file=relative_to_assets("button_1.png"))
-        self.button_image_3 = PhotoImage(file=relative_to_assets("button_3.png"))
-        self.img_start_default = PhotoImage(file=relative_to_assets("button_2.png"))
-        self.img_stop_default = PhotoImage(file=relative_to_assets("button_4.png"))
-        self.img_start_pressed = PhotoImage(file=relative_to_assets("button_2_1.png"))
-        self.img_stop_pressed = PhotoImage(file=relative_to_assets("button_4_1.png"))
-        self.button_image_5 = PhotoImage(file=relative_to_assets("button_5.png"))
-        self.button_image_6 = PhotoImage(file=relative_to_assets("button_6.png"))
-
-        # Gambar untuk logic_log (image_2)
-        self.image_2_default = PhotoImage(file=relative_to_assets("image_2.png"))
-        self.image_2_log1 = PhotoImage(file=relative_to_assets("image_2_1.png"))
-        self.image_2_log2 = PhotoImage(file=relative_to_assets("image_2_2.png"))
-        self.image_2_log3 = PhotoImage(file=relative_to_assets("image_2_3.png"))
+        # Gambar tombol (varian "pressed" button_2_1 / button_4_1 tidak dipakai tampilan ini)
+        self.button_image_1 = asset("button_1.png")
+        self.button_image_3 = asset("button_3.png")
+        self.img_start_default = asset("button_2.png")
+        self.img_stop_default = asset("button_4.png")
+        self.button_image_5 = asset("button_5.png")
+        self.button_image_6 = asset("button_6.png")
+
+        # Gambar untuk logic_log (image_2); image_2_1..3 dimuat saat panel dibuka
+        self.image_2_default = asset("image_2.png")
 
     def place_images(self):
         """Menempatkan semua gambar di canvas."""
@@ -411,155 +345,110 @@ class App:
         self.btn_grafik.place(x=804.0, y=433.0, width=37.0, height=283.0)
 
     def send_command_to_mcu(self, command):
-        """Mengirim perintah ke mikrokontroler."""
-        if self.ser and self.ser.is_open:
-            self.ser.write(f"{command}\r\n".encode('utf-8'))
-            print(f"Sent: {command}")
-        else:
-            print("Serial port not open. Cannot send command.")
-
-    def add_log_entry(self, message):
-        """Menambahkan entri ke log aktivitas."""
-        timestamp = time.strftime("[%H:%M:%S]")
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, f"{timestamp} {message}\n")
-        self.log_text.see(tk.END) # Auto-scroll ke bawah
-        self.log_text.configure(state='disabled')
-
-    def animate_graph(self, i):
-        """Fungsi untuk memperbarui grafik secara real-time."""
-        # Ambil data terbaru dari adc_values
-        current_time = time.time()
-        
-        # Konversi nilai ADC ke satuan fisik
-        water_level_m = (self.adc_values['ADC0'] / ADC_MAX_VALUE) * WATER_LEVEL_MAX_METER
-        pressure_bar = (self.adc_values['ADC1'] / ADC_MAX_VALUE) * PRESSURE_MAX_BAR
-
-        self.data_adc0_graph.append(water_level_m)
-        self.data_adc1_graph.append(pressure_bar)
-        self.time_data_graph.append(current_time)
-
-        # Hapus data lama jika melebihi batas maxlen
-        if len(self.time_data_graph) > 1:
-            # Atur sumbu X agar menunjukkan waktu relatif atau rentang waktu yang relevan
-            # Misalnya, tampilkan 10 detik terakhir
-            min_time = self.time_data_graph[0]
-            max_time = self.time_data_graph[-1]
-            self.ax1.set_xlim(min_time, max_time)
-            
-            # Perbarui data plot
-            self.line1.set_data(list(self.time_data_graph), list(self.data_adc0_graph))
-            self.line2.set_data(list(self.time_data_graph), list(self.data_adc1_graph))
-
-            # Auto-skala sumbu Y jika diperlukan (opsional, sudah diatur ylim di init)
-            # self.ax1.relim()
-            # self.ax1.autoscale_view(scalex=False) # Hanya skala Y
-            # self.ax2.relim()
-            # self.ax2.autoscale_view(scalex=False) # Hanya skala Y
-
-        return self.line1, self.line2, # Return objek yang diubah untuk blitting (jika blit=True)
+        """Mengirim perintah ke mikrokontroler (lewat engine)."""
+        self.engine.send_command_to_mcu(command)
 
+    def add_log_entry(self, message, key=None):
+        """
+        Menambahkan entri ke log aktivitas. Entri ditulis ke widget sekali per
+        frame oleh check_serial_queue(); entri dengan key yang sama (mis. "ADC0")
+        boleh diringkas saat data masuk terlalu cepat untuk dibaca.
+        """
+        self.log_view.add(message, key)
+
+    def update_graph(self):
+        """Memperbarui grafik setiap GRAPH_INTERVAL_MS selama grafik ditampilkan."""
+        # Digambar pada frame berikutnya, ditunda jika anggaran frame sudah habis
+        # (graph.update tidak menggambar apa pun jika tidak ada sampel baru)
+        self.render.task("graph", self.graph.update)
+        self.graph_job = self.master.after(GRAPH_INTERVAL_MS, self.update_graph)
+
+    def ensure_graph(self):
+        """Membuat grafik (dan mengimpor matplotlib) saat pertama kali dibutuhkan."""
+        if self.graph is None:
+            start = time.perf_counter()
+            from graph import RealtimeGraph
+            self.graph = RealtimeGraph(self.canvas, self.engine, CH_WATER_LEVEL, CH_PRESSURE)
+            self.graph_widget = self.graph.widget
+            self.canvas.itemconfig(self.graph_widget_id, window=self.graph_widget)
+            print(f"Grafik dibuat dalam {(time.perf_counter() - start) * 1e3:.0f} ms.")
+        return self.graph
+
+    def start_graph(self):
+        if self.graph_job is None:
+            self.ensure_graph()
+            self.graph.invalidate() # Widget baru tampil lagi: gambar penuh
+            self.update_graph()
+
+    def stop_graph(self):
+        if self.graph_job is not None:
+            self.master.after_cancel(self.graph_job)
+            self.graph_job = None
+            self.render.discard("graph")
+
+    def update_from_batch(self, batch):
+        """Menjadwalkan progress bar dan label, dan menambahkan log dari satu SampleBatch."""
+        calibration = self.engine.calibration
+        # Widget hanya perlu nilai terakhir per channel; teks diformat saat flush
+        latest = batch.latest()
+        if CH_WATER_LEVEL in latest:
+            value = latest[CH_WATER_LEVEL]
+            # Asumsi ADC 10-bit, nilai max 1023
+            self.render.set("adc0_bar", value, configure(self.adc0_progressbar, 'value'),
+                            fmt=lambda value: (value / ADC_MAX_VALUE) * 100)
+            # Konversi ke meter untuk tampilan
+            self.render.set("adc0_text", value, configure(self.adc0_value_label, 'text'),
+                            fmt=lambda value: f"{calibration.convert(CH_WATER_LEVEL, value):.2f} m")
+        if CH_PRESSURE in latest:
+            value = latest[CH_PRESSURE]
+            self.render.set("adc1_bar", value, configure(self.adc1_progressbar, 'value'),
+                            fmt=lambda value: (value / ADC_MAX_VALUE) * 100)
+            # Konversi ke Bar untuk tampilan
+            self.render.set("adc1_text", value, configure(self.adc1_value_label, 'text'),
+                            fmt=lambda value: f"{calibration.convert(CH_PRESSURE, value):.2f} Bar")
+
+        # Tambahkan ke log jika aktif (setiap sampel, dikonversi sekaligus per batch)
+        if (self.log & 1) != 0:
+            physical = calibration.convert_records(batch.adc).tolist()
+            for channel, value, converted in zip(batch.adc['channel'].tolist(), batch.adc['value'].tolist(), physical):
+                if channel == CH_WATER_LEVEL:
+                    self.add_log_entry(f"Water Level: {converted:.2f} m (ADC: {value})", key="ADC0")
+                elif channel == CH_PRESSURE:
+                    self.add_log_entry(f"Pressure: {converted:.2f} Bar (ADC: {value})", key="ADC1")
+            for channel, state in zip(batch.di['channel'].tolist(), batch.di['value'].tolist()):
+                self.add_log_entry(f"Digital Input {channel}: {'HIGH' if state else 'LOW'}", key=f"IN{channel}")
 
     def check_serial_queue(self):
         """
-        Memeriksa queue data serial dan memperbarui GUI.
+        Memeriksa queue event dari engine dan memperbarui GUI.
         Fungsi ini dipanggil secara berkala oleh window.after().
+        Logika kontrol tidak lagi berjalan di sini, melainkan di engine.
         """
-        while not serial_data_queue.empty():
-            line = serial_data_queue.get()
-            # print(f"Processing from queue: {line}") # Debugging
-
-            # Parsing data yang diterima (misal: "ADC0=512", "IN0=1")
-            if line.startswith("ADC"):
-                try:
-                    parts = line.split('=')
-                    if len(parts) == 2:
-                        channel_str = parts[0].replace("ADC", "")
-                        value_str = parts[1]
-                        channel = int(channel_str)
-                        value = int(value_str)
-                        
-                        # Asumsi ADC 10-bit, nilai max 1023
-                        percentage = (value / ADC_MAX_VALUE) * 100 
-
-                        if channel == 0:
-                            self.adc_values['ADC0'] = value
-                            self.adc0_progressbar['value'] = percentage
-                            # Konversi ke meter untuk tampilan
-                            water_level_m = (value / ADC_MAX_VALUE) * WATER_LEVEL_MAX_METER
-                            self.adc0_value_label.config(text=f"{water_level_m:.2f} m")
-                            # Tambahkan ke log jika aktif
-                            if (self.log & 1) != 0:
-                                self.add_log_entry(f"Water Level: {water_level_m:.2f} m (ADC: {value})")
-
-                        elif channel == 1:
-                            self.adc_values['ADC1'] = value
-                            self.adc1_progressbar['value'] = percentage
-                            # Konversi ke Bar untuk tampilan
-                            pressure_bar = (value / ADC_MAX_VALUE) * PRESSURE_MAX_BAR
-                            self.adc1_value_label.config(text=f"{pressure_bar:.2f} Bar")
-                            # Tambahkan ke log jika aktif
-                            if (self.log & 1) != 0:
-                                self.add_log_entry(f"Pressure: {pressure_bar:.2f} Bar (ADC: {value})")
-                        
-                except ValueError:
-                    print(f"Error parsing ADC data: {line}")
-            elif line.startswith("IN"):
-                try:
-                    parts = line.split('=')
-                    if len(parts) == 2:
-                        channel_str = parts[0].replace("IN", "")
-                        state_str = parts[1]
-                        channel = int(channel_str)
-                        state = int(state_str)
-                        # Contoh: print digital input state
-                        print(f"Digital Input {channel}: {state}")
-                        if (self.log & 1) != 0:
-                            self.add_log_entry(f"Digital Input {channel}: {'HIGH' if state else 'LOW'}")
-                except ValueError:
-                    print(f"Error parsing Digital Input data: {line}")
-        
-        # Logika mode otomatis (jika diaktifkan)
-        # Konversi nilai ADC ke satuan fisik untuk logika kontrol
-        current_water_level_m = (self.adc_values['ADC0'] / ADC_MAX_VALUE) * WATER_LEVEL_MAX_METER
-        current_pressure_bar = (self.adc_values['ADC1'] / ADC_MAX_VALUE) * PRESSURE_MAX_BAR
-
-        if self.mode == 1: # Jika mode Auto
-            # Logika untuk OUT1 (Pompa) berdasarkan Water Level
-            if current_water_level_m > WATER_LEVEL_ON_THRESHOLD_METER and self.state == 0:
-                # Air di bawah 0.5 meter dan pompa nyala -> Matikan pompa
-                self.state = 1
-                self.send_command_to_mcu(f"OUT1{0}")
-                self.status_pompa(True)
-                self.add_log_entry(f"Auto Mode: Water Level LOW ({current_water_level_m:.2f}m <= {WATER_LEVEL_OFF_THRESHOLD_METER}m), turning pump OFF.")
-
-            elif current_water_level_m <= WATER_LEVEL_OFF_THRESHOLD_METER and self.state == 1:
-                
-                # Air di atas 3 meter dan pompa mati -> Nyalakan pompa
-                self.state = 0
-                self.send_command_to_mcu(f"OUT1{1}")
-                self.status_pompa(False)
-                self.add_log_entry(f"Auto Mode: Water Level HIGH ({current_water_level_m:.2f}m > {WATER_LEVEL_ON_THRESHOLD_METER}m), turning pump ON.")
-            # Logika untuk mematikan pompa berdasarkan Pressure, hanya jika pompa sedang menyala
-            if self.state == 1 and current_pressure_bar <= PRESSURE_MOTOR_OFF_THRESHOLD_BAR:
-                # Pompa sedang nyala, tapi pressure rendah (0-1 bar) -> Matikan pompa untuk proteksi
-                self.state = 0
-                self.send_command_to_mcu(f"OUT3{int(self.state)}")
-                self.status_pompa(False)
-                self.add_log_entry(f"Auto Mode: WARNING! Pressure LOW ({current_pressure_bar:.2f} Bar <= {PRESSURE_MOTOR_OFF_THRESHOLD_BAR} Bar), turning pump OFF for protection.")
-            
-            # Logika untuk OUT3 (Lampu Motor) berdasarkan Pressure (ADC1)
-            # Asumsi OUT3 adalah lampu motor, dan aktif jika pressure tinggi
-            current_lamp_motor_state = self.out_states[1]
-            new_lamp_motor_state = current_pressure_bar > THRESHOLD_ADC1 # Menggunakan threshold raw ADC untuk lampu
-            if new_lamp_motor_state != current_lamp_motor_state:
-                self.out_states[1] = new_lamp_motor_state
-                self.send_command_to_mcu(f"OUT1{int(new_lamp_motor_state)}")
-                self.add_log_entry(f"Auto Mode: Pressure ({current_pressure_bar:.2f} Bar), updating Lamp Motor to {new_lamp_motor_state}.")
+        while not self.event_queue.empty():
+            event = self.event_queue.get()
+            kind = event[0]
+
+            if kind == EVENT_BATCH:
+                if event[1].t_read is not None:
+                    self.engine.metrics.observe('gui', time.monotonic() - event[1].t_read)
+                self.update_from_batch(event[1])
+
+            elif kind == EVENT_PUMP:
+                self.render.set("pump", event[1], self.status_pompa)
+
+            elif kind == EVENT_MODE:
+                # Tombol manual hanya aktif di mode Manual
+                self.render.set("manual_buttons", event[1] == MODE_MANUAL, self.toggle_PB)
+
+            elif kind == EVENT_LOG:
+                self.add_log_entry(event[1])
 
+        # Semua entri log frame ini ditulis dalam satu insert (prioritas rendah)
+        self.render.task("log", self.log_view.flush)
+        self.render.flush()
 
         # Jadwalkan pemanggilan fungsi ini lagi setelah 100 ms
-        self.master.after(100, self.check_serial_queue)
+        self.queue_job = self.master.after(100, self.check_serial_queue)
 
     # --- LOGIC FUNCTIONS (Dipindahkan ke dalam kelas) ---
     def tombol_data_log(self):
@@ -586,57 +475,28 @@ class App:
         
     def tombol_mode_auto(self):
         """Mengatur mode sistem ke Otomatis."""
-        if self.mode != 1:
-            self.mode = 1
-            print(f"Mode: Auto (Nilai mode sekarang: {self.mode})")
-            self.add_log_entry("Mode diubah ke Otomatis.")
-            self.toggle_PB(False) # Nonaktifkan tombol manual saat mode auto
+        self.engine.set_mode(MODE_AUTO)
         
     def tombol_mode_manual(self):
         """Mengatur mode sistem ke Manual."""
-        if self.mode != 0:
-            self.mode = 0
-            print(f"Mode: Manual (Nilai mode sekarang: {self.mode})")
-            self.add_log_entry("Mode diubah ke Manual.")
-            self.toggle_PB(True) # Aktifkan tombol manual saat mode manual
-            # Jika pompa sedang ON karena auto, matikan dulu saat beralih ke manual
-            if self.state == 0:
-                self.state = 1
-                self.send_command_to_mcu(f"OUT1{int(self.state)}")
-                self.status_pompa(False)
-                self.add_log_entry("Pompa dimatikan saat beralih ke Mode Manual.")
-
+        self.engine.set_mode(MODE_MANUAL)
 
     def tombol_state_on(self):
         """Menghidupkan pompa secara manual."""
-        if self.mode == 0: # Hanya jika mode Manual
-            if self.state == 0:
-                self.state = 1
-                self.send_command_to_mcu(f"OUT1{int(self.state)}")
-                self.status_pompa(False) # Update visual status pompa
-                self.add_log_entry("Manual: Pompa dihidupkan.")
-            print(f"Nilai state sekarang: {self.state}")
-        else:
+        if not self.engine.manual_pump_on(): # Hanya jika mode Manual
             print("Cannot control manually in Auto Mode.")
             messagebox.showinfo("Mode Error", "Tidak dapat mengontrol secara manual dalam Mode Otomatis.")
 
     def tombol_state_off(self):
         """Mematikan pompa secara manual."""
-        if self.mode == 0: # Hanya jika mode Manual
-            if self.state == 1:
-                self.state = 0
-                self.send_command_to_mcu(f"OUT1{int(self.state)}")
-                self.status_pompa(True) # Update visual status pompa
-                self.add_log_entry("Manual: Pompa dimatikan.")
-            print(f"Nilai state sekarang: {self.state}")
-        else:
+        if not self.engine.manual_pump_off(): # Hanya jika mode Manual
             print("Cannot control manually in Auto Mode.")
             messagebox.showinfo("Mode Error", "Tidak dapat mengontrol secara manual dalam Mode Otomatis.")
             
     def status_pompa(self, is_started):
         """Memperbarui gambar status pompa di GUI."""
         if is_started:
-            self.canvas.itemconfig(self.image_13_id, image=self.image_image_13_2)
+            self.canvas.itemconfig(self.image_13_id, image=self.assets.get("image_13_2.png"))
         else:
             self.canvas.itemconfig(self.image_13_id, image=self.image_image_13_1)
             
@@ -670,7 +530,7 @@ class App:
 
         if (x & 1) != 0 and (x & 2) == 0: # Jika hanya bit 0 (Log) aktif (Log di atas image_2_1)
             print("Menampilkan Log Aktivitas di atas image_2_1.")
-            self.file1 = self.image_2_log1
+            self.file1 = self.assets.get("image_2_1.png")
             
             # Posisi X untuk image_2_1 dan log (berdasarkan gambar, image_2_1 bergeser ke kiri)
             # Koordinat X untuk image_2_1 adalah 639.0 - 100 = 539.0
@@ -691,7 +551,7 @@ class App:
 
         elif (x & 2) != 0 and (x & 1) == 0: # Jika hanya bit 1 (Grafik) aktif (Grafik di atas image_2_2)
             print("Menampilkan Grafik di atas image_2_2.")
-            self.file1 = self.image_2_log2
+            self.file1 = self.assets.get("image_2_2.png")
             
             # Posisi X untuk image_2_2 dan grafik (berdasarkan gambar, image_2_2 bergeser ke kanan)
             # Koordinat X untuk image_2_2 adalah 639.0 + 110 = 749.0
@@ -700,7 +560,7 @@ class App:
             # Posisikan grafik di atas image_2_2
             self.canvas.coords(self.graph_widget_id, base_x + img_x_offset+313, base_y)
             self.canvas.itemconfig(self.graph_widget_id, state='normal', width=graph_width, height=element_height)
-            self.ani.event_source.start()
+            self.start_graph()
             
             # Tampilkan image_2_2 sebagai latar belakang
             if self.image_2_id is None:
@@ -713,7 +573,7 @@ class App:
 
         elif (x & 1) != 0 and (x & 2) != 0: # Jika kedua bit aktif (Log dan Grafik di atas image_2_3)
             print("Menampilkan Log (kiri) dan Grafik (kanan) di atas image_2_3.")
-            self.file1 = self.image_2_log3
+            self.file1 = self.assets.get("image_2_3.png")
             
             # Tampilkan image_2_3 sebagai latar belakang (pusat di base_x, base_y)
             if self.image_2_id is None:
@@ -744,7 +604,7 @@ class App:
 
             self.canvas.coords(self.graph_widget_id, graph_x+263, base_y)
             self.canvas.itemconfig(self.graph_widget_id, state='normal', width=graph_width, height=element_height)
-            self.ani.event_source.start()
+            self.start_graph()
 
         else: # Jika tidak ada bit yang aktif (log = 0)
             print("Menampilkan Gambar Default (image_2_default).")
@@ -758,23 +618,72 @@ class App:
             self.canvas.tag_lower(self.image_2_id, self.image_3_id)
 
         # Jika grafik tidak aktif, hentikan animasinya untuk menghemat sumber daya
-        if (x & 2) == 0 and self.ani.event_source:
-             self.ani.event_source.stop()
-
+        if (x & 2) == 0:
+            self.stop_graph()
+
+
+    def report_startup(self, t0=STARTUP_T0):
+        """Mencatat waktu startup (impor modul GUI -> jendela pertama tampil) ke log dan stdout."""
+        total = time.perf_counter() - t0
+        times = self.engine.startup_times
+        ready = times.get('ready')
+        detail = f"buka port {times.get('open', 0) * 1e3:.0f} ms, "
+        detail += "MCU tidak menjawab" if ready is None else f"MCU siap {ready * 1e3:.0f} ms"
+        message = f"Startup {total * 1e3:.0f} ms ({detail})."
+        print(message)
+        self.add_log_entry(message)
+
+    def show_stats(self, event=None):
+        """Membuka (atau memunculkan) panel statistik pipeline."""
+        if self.stats_panel is not None and self.stats_panel.exists():
+            self.stats_panel.lift()
+        else:
+            self.stats_panel = StatsPanel(self.master, self.engine.metrics)
 
     def on_closing(self):
         """Fungsi ini dipanggil saat jendela GUI ditutup."""
-        if self.ser and self.ser.is_open:
-            print("Menutup port serial...")
-            self.ser.close()
+        # Lepas GUI dari engine; engine hanya dihentikan jika dibuat oleh GUI ini
+        self.engine.unsubscribe(self.event_queue.put)
+        self.engine.metrics.gauges.pop('gui_event_queue_depth', None)
+        self.engine.metrics.gauges.pop('gui_render_pending', None)
+        for name in RENDER_COUNTERS:
+            self.engine.metrics.external_counters.pop(f'gui_render_{name}', None)
+        self.master.after_cancel(self.queue_job)
+        if self.stats_panel is not None and self.stats_panel.exists():
+            self.stats_panel.close()
+        if self.owns_engine:
+            self.engine.stop()
         # Hentikan animasi matplotlib saat menutup aplikasi
-        if hasattr(self, 'ani') and self.ani.event_source:
-            self.ani.event_source.stop()
-        plt.close(self.fig) # Tutup figure matplotlib
+        if getattr(self, 'graph', None) is not None:
+            self.stop_graph()
+            self.graph.close()
         self.master.destroy()
+        self.assets.close() # Setelah widget dihancurkan: gambar tidak dipakai lagi
 
 # === Main Program ===
 if __name__ == "__main__":
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="BAS Pump Monitoring System")
+    arg_parser.add_argument("--port", default=SERIAL_PORT, help="Port serial, pty simulator (mcu_sim.py) atau replay:FILE.basrec[@SPEED]")
+    arg_parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Port endpoint Prometheus (0 = mati)")
+    arg_parser.add_argument("--record", help="Rekam byte serial mentah + perintah ke file .basrec")
+    arg_parser.add_argument("--modbus-port", type=int, default=MODBUS_PORT or 0, help="Port server Modbus TCP (0 = mati)")
+    arg_parser.add_argument("--acquisition", choices=("thread", "process"), default=ACQUISITION_MODE,
+                            help="Pembaca serial di thread atau di proses anak (tahan redraw GUI)")
+    arg_parser.add_argument("--adc-channels", type=int, nargs="+", default=ADC_SUBSCRIPTION,
+                            help="Channel ADC yang dikirim ADC_Loop; GUI hanya memakai 0 1 (bawaan: semua)")
+    arg_parser.add_argument("--sample-period", type=int, default=ADC_SAMPLE_PERIOD_MS, help="Periode sampling firmware dalam ms (bawaan: 100)")
+    args = arg_parser.parse_args()
+
+    engine = PumpEngine(args.port, BAUD_RATE, record_path=args.record, acquisition=args.acquisition,
+                        adc_subscription=args.adc_channels, sample_period_ms=args.sample_period)
+    if args.metrics_port:
+        MetricsServer(lambda: [({}, engine.metrics)], args.metrics_port).start()
+    if args.modbus_port:
+        from modbus import ModbusServer # asyncio hanya diimpor jika dipakai
+        ModbusServer(lambda: {1: engine}, args.modbus_port).start()
     root = tk.Tk()
-    app = App(root)
+    app = App(root, engine)
+    if engine.ser is not None: # Port gagal dibuka: jendela sudah ditutup App
+        root.after_idle(app.report_startup) # Setelah jendela pertama digambar
     root.mainloop()
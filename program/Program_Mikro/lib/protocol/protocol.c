@@ -0,0 +1,154 @@
+#include "protocol.h"
+
+#include <string.h>
+
+void proto_init(proto_state_t *state) {
+  memset(state, 0, sizeof(*state));
+  state->adc_mask = PROTO_ADC_MASK_ALL;
+  state->period_ms = PROTO_PERIOD_DEFAULT_MS;
+  state->adc_request = PROTO_NO_REQUEST;
+  state->di_request = PROTO_NO_REQUEST;
+}
+
+// Angka desimal tanpa tanda setelah prefix; -1 jika bukan angka / terlalu besar
+static int32_t parse_number(const char *text) {
+  int32_t value = 0;
+  if (*text == '\0') return -1;
+  while (*text) {
+    if (*text < '0' || *text > '9') return -1;
+    value = value * 10 + (*text++ - '0');
+    if (value > 65535) return -1;
+  }
+  return value;
+}
+
+void proto_handle_command(proto_state_t *state, const char *command) {
+  uint8_t len = strlen(command);
+  int32_t value;
+
+  if (strcmp(command, "ADC_Set") == 0)
+    state->adc_enabled = 1;
+  else if (strcmp(command, "DI_Set") == 0)
+    state->di_enabled = 1;
+  else if (strcmp(command, "DO_Set") == 0)
+    state->do_enabled = 1;
+  else if (strcmp(command, "ADC_Loop") == 0) {
+    state->adc_loop = 1;
+    state->adc_enabled = 1;
+  } else if (strcmp(command, "ADC_Stop") == 0)
+    state->adc_loop = 0;
+  else if (strcmp(command, "DI_Loop") == 0) {
+    state->di_loop = 1;
+    state->di_enabled = 1;
+  } else if (strcmp(command, "DI_Stop") == 0)
+    state->di_loop = 0;
+  else if (strncmp(command, "ADC_Mask=", 9) == 0) {
+    value = parse_number(command + 9);
+    if (value >= 0) state->adc_mask = value & PROTO_ADC_MASK_ALL;
+  } else if (strncmp(command, "ADC_Period=", 11) == 0) {
+    value = parse_number(command + 11);
+    if (value >= 0) {
+      if (value < PROTO_PERIOD_MIN_MS) value = PROTO_PERIOD_MIN_MS;
+      if (value > PROTO_PERIOD_MAX_MS) value = PROTO_PERIOD_MAX_MS;
+      state->period_ms = value;
+      state->period_changed = 1;
+    }
+  } else if (len == 4 && strncmp(command, "ADC", 3) == 0)
+    state->adc_request = command[3] - '0';
+  else if (len == 3 && strncmp(command, "IN", 2) == 0)
+    state->di_request = command[2] - '0';
+  else if (len == 5 && strncmp(command, "OUT", 3) == 0) {
+    uint8_t out_index = command[3] - '1';  // OUT1 → index 0
+    if (out_index < PROTO_OUTPUTS) {
+      state->output_state[out_index] = command[4] - '0';  // '1' = ON, '0' = OFF
+    }
+  }
+}
+
+uint8_t proto_receive(proto_state_t *state, char c) {
+  if (c == '\n' || c == '\r') {
+    if (state->rx_index == 0) return 0;  // Baris kosong (\n setelah \r)
+    state->rx_buffer[state->rx_index] = '\0';
+    state->rx_index = 0;
+    proto_handle_command(state, state->rx_buffer);
+    return 1;
+  }
+  if (state->rx_index < PROTO_RX_SIZE - 1) {
+    state->rx_buffer[state->rx_index++] = c;
+  }
+  return 0;
+}
+
+uint8_t proto_adc_tick(proto_state_t *state) {
+  uint8_t mask = 0;
+  if (state->adc_enabled) {
+    if (state->adc_loop) mask = state->adc_mask;
+    if (state->adc_request < PROTO_ADC_CHANNELS) mask |= 1 << state->adc_request;
+    state->adc_request = PROTO_NO_REQUEST;
+  }
+  return mask;
+}
+
+uint8_t proto_di_tick(proto_state_t *state) {
+  uint8_t mask = 0;
+  if (state->di_enabled) {
+    if (state->di_loop) mask = (1 << PROTO_DI_CHANNELS) - 1;
+    if (state->di_request < PROTO_DI_CHANNELS) mask |= 1 << state->di_request;
+    state->di_request = PROTO_NO_REQUEST;
+  }
+  return mask;
+}
+
+uint8_t proto_format(char *buf, const char *prefix, uint8_t channel, uint16_t value) {
+  char digits[5];
+  uint8_t n = 0;
+  uint8_t len = 0;
+
+  while (*prefix) buf[len++] = *prefix++;
+  buf[len++] = '0' + channel;
+  buf[len++] = '=';
+  do {
+    digits[n++] = '0' + value % 10;
+    value /= 10;
+  } while (value);
+  while (n) buf[len++] = digits[--n];
+  buf[len++] = '\r';
+  buf[len++] = '\n';
+  return len;
+}
+
+uint16_t proto_timer_top(uint16_t period_ms, uint32_t f_cpu, uint16_t prescaler) {
+  uint32_t ticks = (f_cpu / prescaler) * period_ms / 1000;
+  if (ticks == 0) ticks = 1;
+  if (ticks > 65536UL) ticks = 65536UL;
+  return ticks - 1;
+}
+
+void tx_init(tx_ring_t *ring) {
+  ring->head = 0;
+  ring->tail = 0;
+  ring->dropped = 0;
+}
+
+uint8_t tx_free(const tx_ring_t *ring) {
+  return (uint8_t)(ring->tail - ring->head - 1);
+}
+
+uint8_t tx_write(tx_ring_t *ring, const char *data, uint8_t len) {
+  uint8_t head = ring->head;
+  if (len > tx_free(ring)) {
+    ring->dropped++;
+    return 0;
+  }
+  while (len--) ring->data[head++] = *data++;
+  ring->head = head;  // Baru terlihat konsumen setelah semua byte tertulis
+  return 1;
+}
+
+int16_t tx_read(tx_ring_t *ring) {
+  uint8_t tail = ring->tail;
+  if (tail == ring->head) return -1;
+  uint8_t c = ring->data[tail];
+  ring->tail = tail + 1;
+  return c;
+}
@@ -0,0 +1,77 @@
+// Logika protokol serial BAS tanpa register AVR, agar bisa diuji di host (gcc).
+//
+// Perintah (diakhiri \r atau \n):
+//   ADC_Set, DI_Set, DO_Set        aktifkan ADC / DI / DO
+//   ADC_Loop, ADC_Stop             kirim channel di mask ADC setiap periode
+//   DI_Loop, DI_Stop               kirim IN0..IN2 setiap periode
+//   ADCn, INn                      kirim satu channel sekali
+//   OUTnS                          OUTn (1..4) = S (0/1)
+//   ADC_Mask=M                     channel ADC yang ikut ADC_Loop (bit n = ADCn, default 31)
+//   ADC_Period=T                   periode sampling Timer1 dalam ms (10..1000, default 100)
+//
+// Telemetri: "ADCn=value\r\n" / "INn=value\r\n", dikirim lewat ring buffer
+// TX yang dikuras interrupt USART_UDRE (tidak ada busy-wait di ISR Timer1).
+#ifndef PROTOCOL_H
+#define PROTOCOL_H
+
+#include <stdint.h>
+
+#define PROTO_ADC_CHANNELS 5
+#define PROTO_DI_CHANNELS 3
+#define PROTO_OUTPUTS 4
+#define PROTO_ADC_MASK_ALL ((1 << PROTO_ADC_CHANNELS) - 1)
+#define PROTO_PERIOD_DEFAULT_MS 100
+#define PROTO_PERIOD_MIN_MS 10
+#define PROTO_PERIOD_MAX_MS 1000
+#define PROTO_RX_SIZE 32
+#define PROTO_NO_REQUEST 0xFF
+#define PROTO_LINE_MAX 16  // Panjang maksimal satu baris telemetri
+
+typedef struct {
+  uint8_t adc_enabled;
+  uint8_t di_enabled;
+  uint8_t do_enabled;
+  uint8_t adc_loop;
+  uint8_t di_loop;
+  uint8_t adc_mask;        // Channel yang dikirim ADC_Loop
+  uint16_t period_ms;      // Periode sampling Timer1
+  uint8_t period_changed;  // 1 setelah ADC_Period, dihapus oleh pemanggil setelah OCR1A diubah
+  uint8_t adc_request;     // Channel ADCn sekali kirim, atau PROTO_NO_REQUEST
+  uint8_t di_request;      // Channel INn sekali kirim, atau PROTO_NO_REQUEST
+  uint8_t output_state[PROTO_OUTPUTS];
+  char rx_buffer[PROTO_RX_SIZE];
+  uint8_t rx_index;
+} proto_state_t;
+
+void proto_init(proto_state_t *state);
+// Satu byte dari UART; mengembalikan 1 jika satu baris perintah selesai diproses
+uint8_t proto_receive(proto_state_t *state, char c);
+void proto_handle_command(proto_state_t *state, const char *command);
+// Mask channel yang dikirim pada tick ini; permintaan sekali kirim dihapus
+uint8_t proto_adc_tick(proto_state_t *state);
+uint8_t proto_di_tick(proto_state_t *state);
+// Menulis "<prefix><channel>=<value>\r\n" ke buf (minimal PROTO_LINE_MAX byte), tanpa snprintf
+uint8_t proto_format(char *buf, const char *prefix, uint8_t channel, uint16_t value);
+// Nilai OCR1A (mode CTC) untuk periode period_ms
+uint16_t proto_timer_top(uint16_t period_ms, uint32_t f_cpu, uint16_t prescaler);
+
+// --- Ring buffer TX ---
+// Satu produsen (ISR Timer1) dan satu konsumen (ISR USART_UDRE); ISR AVR tidak
+// saling menyela, jadi indeks 8-bit cukup tanpa critical section tambahan.
+#define TX_RING_SIZE 256  // Harus 256: indeks uint8_t berputar sendiri
+
+typedef struct {
+  uint8_t data[TX_RING_SIZE];
+  volatile uint8_t head;  // Posisi tulis berikutnya
+  volatile uint8_t tail;  // Posisi baca berikutnya
+  uint16_t dropped;       // Baris yang dibuang karena ring penuh
+} tx_ring_t;
+
+void tx_init(tx_ring_t *ring);
+uint8_t tx_free(const tx_ring_t *ring);
+// Antrikan len byte; semua atau tidak sama sekali (baris tidak pernah terpotong)
+uint8_t tx_write(tx_ring_t *ring, const char *data, uint8_t len);
+// Byte berikutnya, atau -1 jika kosong
+int16_t tx_read(tx_ring_t *ring);
+
+#endif
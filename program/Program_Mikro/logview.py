@@ -0,0 +1,74 @@
+"""
+Tampilan log aktivitas dengan jumlah baris terbatas dan insert per frame.
+
+add() hanya menaruh entri di antrian (tanpa menyentuh widget). flush(),
+dipanggil sekali per frame GUI, menulis semua entri dalam SATU insert,
+membuang baris lama di atas MAX_LOG_LINES, lalu satu kali see(END).
+
+Jika dalam satu frame entri yang masuk lebih banyak dari yang bisa dibaca
+operator (MAX_LINES_PER_FLUSH), entri ber-key (mis. update ADC0) diringkas
+menjadi satu baris "ADC0 x42 updates"; entri tanpa key (pesan kontrol,
+peringatan) selalu ditampilkan utuh.
+"""
+import time
+import tkinter as tk
+
+MAX_LOG_LINES = 500 # Baris maksimal yang disimpan widget
+MAX_LINES_PER_FLUSH = 10 # Di atas ini entri ber-key diringkas
+
+
+class LogView:
+    """Pembungkus tk.Text untuk log aktivitas yang dibatasi dan di-batch."""
+
+    def __init__(self, text_widget, max_lines=MAX_LOG_LINES, max_lines_per_flush=MAX_LINES_PER_FLUSH):
+        self.text = text_widget
+        self.max_lines = max_lines
+        self.max_lines_per_flush = max_lines_per_flush
+        self.line_count = 0
+        self._pending = [] # (waktu, key, pesan)
+
+    def add(self, message, key=None):
+        """Menambahkan entri; baru tampil pada flush() berikutnya."""
+        self._pending.append((time.time(), key, message))
+
+    def render_pending(self):
+        """Menyusun baris yang akan ditulis dari entri yang tertunda, lalu mengosongkan antrian."""
+        pending, self._pending = self._pending, []
+        if len(pending) <= self.max_lines_per_flush:
+            return [_format(when, message) for when, _, message in pending]
+
+        lines = []
+        summaries = {} # key -> [jumlah, waktu terakhir, pesan terakhir]
+        for when, key, message in pending:
+            if key is None:
+                lines.append(_format(when, message))
+            elif key in summaries:
+                summary = summaries[key]
+                summary[0] += 1
+                summary[1] = when
+                summary[2] = message
+            else:
+                summaries[key] = [1, when, message]
+        for key, (count, when, message) in summaries.items():
+            lines.append(_format(when, f"{key} x{count} updates, terakhir: {message}"))
+        return lines
+
+    def flush(self):
+        """Menulis semua entri tertunda ke widget dalam satu operasi."""
+        if not self._pending:
+            return
+        lines = self.render_pending()[-self.max_lines:]
+        self.text.configure(state='normal')
+        self.text.insert(tk.END, "".join(lines))
+        self.line_count += len(lines)
+        excess = self.line_count - self.max_lines
+        if excess > 0:
+            # Buang baris tertua
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.line_count = self.max_lines
+        self.text.see(tk.END) # Auto-scroll ke bawah
+        self.text.configure(state='disabled')
+
+
+def _format(when, message):
+    return f"{time.strftime('[%H:%M:%S]', time.localtime(when))} {message}\n"
@@ -0,0 +1,263 @@
+"""
+Simulator mikrokontroler (pengganti firmware src/main.c) di atas pseudo-terminal Linux.
+
+Simulator membuka sebuah pty dan menjalankan protokol serial yang sama dengan
+firmware (lib/protocol): ADC_Set, ADC_Loop, ADC_Stop, DI_Set, DI_Loop, DI_Stop,
+DO_Set, ADCn, INn, OUTnS, ADC_Mask=M dan ADC_Period=T. Data dikirim sebagai
+"ADCn=value\\r\\n" / "INn=value\\r\\n" setiap tick Timer1 (ADC_Period,
+bawaan 100 ms), atau lebih cepat dengan --rate.
+
+Water level dan pressure dimodelkan secara sederhana dan merespons status
+OUT1 (pompa), dengan skenario hujan/badai yang bisa dipilih:
+
+    python mcu_sim.py --scenario storm --rate 100 --link /tmp/ttyBAS
+    python engine.py --port /tmp/ttyBAS --auto
+"""
+import argparse
+import os
+import pty
+import random
+import select
+import time
+import tty
+
+from config import (
+    ADC_MAX_VALUE, ADC_CHANNELS, DI_CHANNELS, WATER_LEVEL_MAX_METER, PRESSURE_MAX_BAR,
+)
+
+# Periode Timer1 di firmware (ADC_Period, lihat lib/protocol/protocol.h)
+PERIOD_DEFAULT_MS = 100
+PERIOD_MIN_MS = 10
+PERIOD_MAX_MS = 1000
+ADC_MASK_ALL = (1 << ADC_CHANNELS) - 1
+OUTPUT_COUNT = 4
+
+# Relay pompa pada OUT1 aktif-low: OUT10 = pompa jalan, OUT11 = pompa mati
+# (sama dengan perilaku gui.py / engine.py).
+PUMP_ACTIVE_LOW = True
+
+# --- Skenario hujan ---
+# Daftar (durasi detik simulasi, debit masuk dalam meter/detik)
+SCENARIOS = {
+    "dry": [(3600, 0.0)],
+    "rain": [(600, 0.002), (1200, 0.004), (600, 0.001)],
+    "storm": [(120, 0.001), (300, 0.012), (600, 0.025), (300, 0.010), (600, 0.002)],
+    "flash_flood": [(60, 0.0), (180, 0.060), (600, 0.004)],
+}
+
+
+class PitModel:
+    """Model fisik sederhana untuk lubang pompa (water level + pressure pompa)."""
+
+    def __init__(self, scenario="storm", level_m=0.3, pump_rate=0.02, noise=0.01, seed=None):
+        self.scenario = SCENARIOS[scenario] if isinstance(scenario, str) else scenario
+        self.level_m = level_m
+        self.pressure_bar = 0.0
+        self.pump_rate = pump_rate # Debit keluar pompa (meter/detik)
+        self.noise = noise
+        self.sim_time = 0.0
+        self.pump_running = False
+        self.random = random.Random(seed)
+
+    def inflow(self):
+        """Debit masuk pada waktu simulasi sekarang (skenario diulang terus)."""
+        total = sum(duration for duration, _ in self.scenario)
+        t = self.sim_time % total if total > 0 else 0.0
+        for duration, rate in self.scenario:
+            if t < duration:
+                return rate
+            t -= duration
+        return 0.0
+
+    def step(self, dt, pump_running):
+        """Memajukan model sebesar dt detik simulasi."""
+        self.sim_time += dt
+        self.pump_running = pump_running
+        self.level_m += self.inflow() * dt
+        if pump_running:
+            self.level_m -= self.pump_rate * dt
+        self.level_m = min(max(self.level_m, 0.0), WATER_LEVEL_MAX_METER)
+
+        # Pompa hanya menghasilkan tekanan jika inlet masih terendam air
+        if pump_running and self.level_m > 0.2:
+            target = 4.0
+        elif pump_running:
+            target = 0.5 # Pompa jalan kering
+        else:
+            target = 0.0
+        self.pressure_bar += (target - self.pressure_bar) * min(1.0, dt / 0.5)
+
+    def read_adc(self, channel):
+        """Nilai ADC 10-bit untuk channel tertentu (dengan noise sensor)."""
+        if channel == 0:
+            physical, full_scale = self.level_m, WATER_LEVEL_MAX_METER
+        elif channel == 1:
+            physical, full_scale = self.pressure_bar, PRESSURE_MAX_BAR
+        else:
+            return self.random.randint(0, 3) # Channel tidak terhubung
+        value = (physical / full_scale + self.random.gauss(0.0, self.noise)) * ADC_MAX_VALUE
+        return min(max(int(round(value)), 0), ADC_MAX_VALUE)
+
+    def read_di(self, channel):
+        """Digital input: IN0 = float switch level tinggi, IN2 = kontak bantu kontaktor pompa."""
+        if channel == 0:
+            return int(self.level_m > 0.8 * WATER_LEVEL_MAX_METER)
+        if channel == 2:
+            return int(self.pump_running)
+        return 0
+
+
+class SimulatedMCU:
+    """Meniru state machine protokol di src/main.c."""
+
+    def __init__(self, model):
+        self.model = model
+        self.adc_enabled = False
+        self.di_enabled = False
+        self.do_enabled = False
+        self.adc_loop = False
+        self.di_loop = False
+        self.adc_mask = ADC_MASK_ALL
+        self.period_ms = PERIOD_DEFAULT_MS
+        self.adc_request_channel = None
+        self.di_request_channel = None
+        self.output_state = [0] * OUTPUT_COUNT
+        self.rx_buffer = b""
+
+    def pump_running(self):
+        if not self.do_enabled:
+            return False
+        return (self.output_state[0] == 0) if PUMP_ACTIVE_LOW else bool(self.output_state[0])
+
+    def receive(self, data):
+        """Menerima byte dari host; perintah diproses per baris (\\r atau \\n)."""
+        for byte in data:
+            if byte in (0x0A, 0x0D):
+                if self.rx_buffer:
+                    self.handle_command(self.rx_buffer.decode('ascii', 'replace'))
+                self.rx_buffer = b""
+            elif len(self.rx_buffer) < 31:
+                self.rx_buffer += bytes((byte,))
+
+    def handle_command(self, command):
+        if command == "ADC_Set":
+            self.adc_enabled = True
+        elif command == "DI_Set":
+            self.di_enabled = True
+        elif command == "DO_Set":
+            self.do_enabled = True
+        elif command == "ADC_Loop":
+            self.adc_loop = True
+            self.adc_enabled = True
+        elif command == "ADC_Stop":
+            self.adc_loop = False
+        elif command == "DI_Loop":
+            self.di_loop = True
+            self.di_enabled = True
+        elif command == "DI_Stop":
+            self.di_loop = False
+        elif command.startswith("ADC_Mask=") and command[9:].isdigit() and int(command[9:]) <= 65535:
+            self.adc_mask = int(command[9:]) & ADC_MASK_ALL
+        elif command.startswith("ADC_Period=") and command[11:].isdigit() and int(command[11:]) <= 65535:
+            self.period_ms = min(max(int(command[11:]), PERIOD_MIN_MS), PERIOD_MAX_MS)
+        elif command.startswith("ADC") and len(command) == 4 and command[3].isdigit():
+            self.adc_request_channel = int(command[3])
+        elif command.startswith("IN") and len(command) == 3 and command[2].isdigit():
+            self.di_request_channel = int(command[2])
+        elif command.startswith("OUT") and len(command) == 5 and command[3:].isdigit():
+            index = int(command[3]) - 1 # OUT1 -> index 0
+            if 0 <= index < OUTPUT_COUNT:
+                self.output_state[index] = int(command[4])
+
+    def tick(self):
+        """Satu interrupt Timer1: majukan model lalu kembalikan byte yang dikirim."""
+        self.model.step(self.period_ms / 1000, self.pump_running())
+        out = []
+        if self.adc_enabled and (self.adc_loop or self.adc_request_channel is not None):
+            for ch in range(ADC_CHANNELS):
+                if (self.adc_loop and self.adc_mask & (1 << ch)) or self.adc_request_channel == ch:
+                    out.append(f"ADC{ch}={self.model.read_adc(ch)}\r\n")
+            self.adc_request_channel = None
+        if self.di_enabled and (self.di_loop or self.di_request_channel is not None):
+            for ch in range(DI_CHANNELS):
+                if self.di_loop or self.di_request_channel == ch:
+                    out.append(f"IN{ch}={self.model.read_di(ch)}\r\n")
+            self.di_request_channel = None
+        return "".join(out).encode('ascii')
+
+
+def run_pty(mcu, rate=1.0, link=None, duration=None, boot_delay=0.0):
+    """
+    Menjalankan simulator di pty. rate = kelipatan kecepatan tick (1.0 = ADC_Period).
+    Jika tick tertinggal (rate tinggi), beberapa tick dikirim dalam satu write.
+    boot_delay meniru reset Arduino saat port dibuka: perintah yang diterima
+    selama boot_delay detik sejak byte pertama dari host diabaikan.
+    """
+    master_fd, slave_fd = pty.openpty()
+    tty.setraw(slave_fd)
+    os.set_blocking(master_fd, False)
+    slave_name = os.ttyname(slave_fd)
+    if link:
+        if os.path.islink(link):
+            os.unlink(link)
+        os.symlink(slave_name, link)
+    print(f"Simulator MCU siap di {link or slave_name} (rate x{rate:g})")
+
+    period_ms = mcu.period_ms
+    period = period_ms / 1000 / rate
+    start = time.monotonic()
+    next_tick = start
+    ticks = 0
+    boot_until = None
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            timeout = max(0.0, next_tick - time.monotonic())
+            readable, _, _ = select.select([master_fd], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(master_fd, 4096)
+                except OSError:
+                    data = b""
+                if boot_until is None and data:
+                    boot_until = time.monotonic() + boot_delay
+                if data and time.monotonic() >= boot_until:
+                    mcu.receive(data)
+                if mcu.period_ms != period_ms:
+                    # ADC_Period: firmware mengubah OCR1A dan mereset TCNT1
+                    period_ms = mcu.period_ms
+                    period = period_ms / 1000 / rate
+                    next_tick = time.monotonic() + period
+            now = time.monotonic()
+            if now >= next_tick:
+                due = int((now - next_tick) / period) + 1
+                chunk = b"".join(mcu.tick() for _ in range(due))
+                next_tick += due * period
+                ticks += due
+                if chunk:
+                    try:
+                        os.write(master_fd, chunk)
+                    except BlockingIOError:
+                        pass # Host tidak membaca, data dibuang seperti UART overrun
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if link and os.path.islink(link):
+            os.unlink(link)
+        os.close(master_fd)
+        os.close(slave_fd)
+    return ticks
+
+
+# === Main Program ===
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Simulator MCU BAS di atas pty")
+    arg_parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="storm")
+    arg_parser.add_argument("--rate", type=float, default=1.0, help="Kelipatan kecepatan tick (1 = ADC_Period, bawaan 100 ms)")
+    arg_parser.add_argument("--link", help="Buat symlink ke pty, mis. /tmp/ttyBAS")
+    arg_parser.add_argument("--duration", type=float, help="Berhenti setelah N detik")
+    arg_parser.add_argument("--seed", type=int)
+    arg_parser.add_argument("--boot-delay", type=float, default=0.0, help="Tiru bootloader Arduino: abaikan perintah N detik setelah host terhubung")
+    args = arg_parser.parse_args()
+
+    sim = SimulatedMCU(PitModel(args.scenario, seed=args.seed))
+    run_pty(sim, rate=args.rate, link=args.link, duration=args.duration, boot_delay=args.boot_delay)
@@ -0,0 +1,182 @@
+"""
+Instrumentasi pipeline: latency per tahap, counter dan gauge kedalaman queue.
+
+Setiap batch membawa waktu monotonic saat byte-nya selesai dibaca dari port
+(SampleBatch.t_read). Dari situ setiap tahap mencatat latency ke histogram:
+
+    parse        read selesai -> batch selesai di-parse       (thread reader)
+    queue        parse selesai -> diambil thread kontrol      (thread kontrol)
+    control      durasi filter + logika auto satu batch       (thread kontrol)
+    command      perintah diantrikan -> ditulis ke port       (thread penulis)
+    end_to_end   byte dibaca -> perintah OUT hasilnya ditulis (thread penulis)
+    gui          byte dibaca -> batch diproses GUI            (thread Tk)
+    render       durasi pembaruan widget satu frame GUI       (thread Tk)
+
+Setiap tahap hanya di-observe oleh satu thread, jadi histogram tidak perlu
+lock. Metrik diekspor dalam format teks Prometheus oleh MetricsServer
+(http.server, hanya 127.0.0.1) dan ditampilkan di panel statistik GUI.
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Batas atas bucket histogram latency (detik)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+STAGES = ("parse", "queue", "control", "command", "end_to_end", "gui", "render")
+
+
+class Histogram:
+    """Histogram bucket tetap (kumulatif saat diekspor) + jumlah, total dan maksimum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Bucket terakhir = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Perkiraan kuantil (batas atas bucket), None jika belum ada data."""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class PipelineMetrics:
+    """Metrik satu engine (satu stasiun)."""
+
+    def __init__(self):
+        self.latency = {stage: Histogram() for stage in STAGES}
+        self.counters = {
+            'bytes': 0, # Byte telemetri yang dibaca
+            'lines': 0, # Baris telemetri (termasuk yang gagal di-parse)
+            'parse_errors': 0,
+            'batches': 0,
+        }
+        self.gauges = {} # nama -> fungsi tanpa argumen, dibaca saat ekspor
+        self.external_counters = {} # nama -> fungsi tanpa argumen (counter milik objek lain)
+
+    def observe(self, stage, seconds):
+        self.latency[stage].observe(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def counter_values(self):
+        values = dict(self.counters)
+        values.update(_read_all(self.external_counters))
+        return values
+
+    def gauge_values(self):
+        return _read_all(self.gauges)
+
+
+def _read_all(functions):
+    values = {}
+    for name, read in list(functions.items()):
+        try:
+            values[name] = read()
+        except Exception:
+            continue
+    return values
+
+
+def _labels(labels, extra=None):
+    items = dict(labels)
+    if extra:
+        items.update(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items.items()) + "}"
+
+
+def render_prometheus(sources):
+    """
+    Teks format Prometheus untuk daftar (labels, PipelineMetrics), mis.
+    [({}, engine.metrics)] atau [({'station': 'P01'}, ...), ...].
+    """
+    lines = []
+    lines.append("# HELP bas_stage_latency_seconds Latency per tahap pipeline serial -> kontrol -> perintah.")
+    lines.append("# TYPE bas_stage_latency_seconds histogram")
+    for labels, metrics in sources:
+        for stage, histogram in metrics.latency.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"bas_stage_latency_seconds_bucket{_labels(labels, {'stage': stage, 'le': bound})} {cumulative}")
+            lines.append(f"bas_stage_latency_seconds_sum{_labels(labels, {'stage': stage})} {histogram.sum:.9f}")
+            lines.append(f"bas_stage_latency_seconds_count{_labels(labels, {'stage': stage})} {histogram.count}")
+
+    counters = [(labels, metrics.counter_values()) for labels, metrics in sources]
+    for name in sorted({name for _, values in counters for name in values}):
+        lines.append(f"# TYPE bas_{name}_total counter")
+        for labels, values in counters:
+            if name in values:
+                lines.append(f"bas_{name}_total{_labels(labels)} {values[name]}")
+
+    gauges = [(labels, metrics.gauge_values()) for labels, metrics in sources]
+    for name in sorted({name for _, values in gauges for name in values}):
+        lines.append(f"# TYPE bas_{name} gauge")
+        for labels, values in gauges:
+            if name in values:
+                lines.append(f"bas_{name}{_labels(labels)} {values[name]}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Endpoint HTTP /metrics lokal (127.0.0.1) di thread sendiri."""
+
+    def __init__(self, sources, port, host="127.0.0.1"):
+        self.sources = sources # Fungsi tanpa argumen -> daftar (labels, PipelineMetrics)
+        self.port = port
+        self.host = host
+        self._server = None
+
+    def start(self):
+        """Menjalankan server. Mengembalikan False (dengan pesan) jika port tidak bisa dipakai."""
+        sources = self.sources
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = render_prometheus(sources()).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Jangan tulis setiap scrape ke stdout
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"Metrics endpoint tidak aktif (port {self.port}): {e}")
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"Metrics tersedia di http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,455 @@
+"""
+Server Modbus TCP untuk SCADA / historian, tanpa menyentuh port serial.
+
+Setiap engine punya ModbusImage: salinan register yang dibangun ulang oleh
+thread engine setiap ada event (batch, mode, pompa, output ditulis). Request
+Modbus hanya membaca salinan terakhir itu (satu tuple immutable, ditukar
+atomik), jadi berapa pun klien yang polling tidak menambah traffic serial
+dan tidak menunggu lock engine. Penulisan coil/register diteruskan ke
+engine (PumpEngine.set_output / set_mode) dan lewat antrian perintah yang
+sama dengan send_command_to_mcu.
+
+Peta alamat (basis 0), sama untuk holding register (FC3) dan input
+register (FC4):
+
+    0..4    ADC0..ADC4 (count ADC terfilter)
+    5..7    IN0..IN2
+    8..11   OUT1..OUT4 (state terakhir yang ditulis ke port)
+    12      mode (0 = Manual, 1 = Auto)       dapat ditulis (FC6 / FC16)
+    13      state pompa (PumpEngine.state)
+    14      water level (mm)
+    15      pressure (mbar)
+    16..17  nomor update snapshot (uint32, word tinggi dulu)
+
+    Coil (FC1, FC5, FC15)   0..3 = OUT1..OUT4
+    Discrete input (FC2)    0..2 = IN0..IN2
+
+Di mode Auto, coil OUT1/OUT3 (milik logika Auto) ditolak dengan exception 04.
+Unit id memilih stasiun (lihat StationManager.modbus_units); dengan satu
+engine, unit id apa pun dilayani. Aktifkan dengan --modbus-port pada
+engine.py, gui.py atau stations.py, lalu uji dengan klien bawaan:
+
+    python modbus.py read --port 5020
+    python modbus.py coil 2 1 --port 5020
+    python modbus.py bench --port 5020 --clients 8
+"""
+import argparse
+import asyncio
+import socket
+import struct
+import threading
+import time
+
+from config import ADC_CHANNELS, DI_CHANNELS, MODBUS_HOST
+from engine import EVENT_BATCH, EVENT_MODE, EVENT_PUMP, EVENT_OUTPUT, MODE_AUTO, MODE_MANUAL, OUTPUT_CHANNELS
+from control import CH_WATER_LEVEL, CH_PRESSURE
+
+# Kode fungsi
+READ_COILS = 1
+READ_DISCRETE_INPUTS = 2
+READ_HOLDING_REGISTERS = 3
+READ_INPUT_REGISTERS = 4
+WRITE_SINGLE_COIL = 5
+WRITE_SINGLE_REGISTER = 6
+WRITE_MULTIPLE_COILS = 15
+WRITE_MULTIPLE_REGISTERS = 16
+
+# Kode exception
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+ILLEGAL_DATA_VALUE = 3
+SERVER_DEVICE_FAILURE = 4
+GATEWAY_TARGET_FAILED = 11
+
+# Alamat register
+REG_ADC = 0
+REG_DI = REG_ADC + ADC_CHANNELS
+REG_OUT = REG_DI + DI_CHANNELS
+REG_MODE = REG_OUT + OUTPUT_CHANNELS
+REG_STATE = REG_MODE + 1
+REG_LEVEL_MM = REG_STATE + 1
+REG_PRESSURE_MBAR = REG_LEVEL_MM + 1
+REG_SEQUENCE = REG_PRESSURE_MBAR + 1
+REGISTER_COUNT = REG_SEQUENCE + 2
+
+REGISTER_NAMES = (
+    [f"ADC{ch}" for ch in range(ADC_CHANNELS)] + [f"IN{ch}" for ch in range(DI_CHANNELS)]
+    + [f"OUT{n}" for n in range(1, OUTPUT_CHANNELS + 1)] + ["mode", "state", "level_mm", "pressure_mbar", "seq_hi", "seq_lo"]
+)
+
+MBAP = struct.Struct(">HHHB") # transaction, protocol, panjang, unit
+MAX_READ_REGISTERS = 125
+MAX_READ_BITS = 2000
+REFRESH_EVENTS = (EVENT_BATCH, EVENT_MODE, EVENT_PUMP, EVENT_OUTPUT)
+
+
+class ModbusError(Exception):
+    """Jawaban exception dari server (dipakai klien)."""
+
+    def __init__(self, function, code):
+        super().__init__(f"Modbus exception {code} untuk fungsi {function}")
+        self.function = function
+        self.code = code
+
+
+def _clamp_u16(value):
+    return min(max(int(round(value)), 0), 0xFFFF)
+
+
+class ModbusImage:
+    """Snapshot register satu engine, diperbarui dari event engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.sequence = 0
+        self.snapshot = None # (byte register big-endian, bitmask discrete input, bitmask coil)
+        self._lock = threading.Lock() # Event datang dari thread kontrol dan thread penulis perintah
+        self.refresh()
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        if event[0] in REFRESH_EVENTS:
+            self.refresh()
+
+    def refresh(self):
+        with self._lock:
+            self._build()
+
+    def _build(self):
+        engine = self.engine
+        calibration = engine.calibration
+        adc = [engine.adc_values[f'ADC{ch}'] for ch in range(ADC_CHANNELS)]
+        di = [engine.di_values[f'IN{ch}'] for ch in range(DI_CHANNELS)]
+        outputs = [engine.outputs[n] for n in range(1, OUTPUT_CHANNELS + 1)]
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        registers = adc + di + outputs + [
+            engine.mode,
+            int(engine.state),
+            _clamp_u16(calibration.convert(CH_WATER_LEVEL, adc[CH_WATER_LEVEL]) * 1000),
+            _clamp_u16(calibration.convert(CH_PRESSURE, adc[CH_PRESSURE]) * 1000),
+            self.sequence >> 16,
+            self.sequence & 0xFFFF,
+        ]
+        inputs = sum(1 << i for i, value in enumerate(di) if value)
+        coils = sum(1 << i for i, value in enumerate(outputs) if value)
+        self.snapshot = (struct.pack(f">{REGISTER_COUNT}H", *registers), inputs, coils)
+
+    def close(self):
+        self.engine.unsubscribe(self._on_event)
+
+
+def _bits(mask, start, count):
+    """Byte bit-packed (LSB dulu) untuk bit start..start+count dari mask."""
+    return ((mask >> start) & ((1 << count) - 1)).to_bytes((count + 7) // 8, 'little')
+
+
+def _exception(function, code):
+    return bytes((function | 0x80, code))
+
+
+def handle_pdu(image, pdu):
+    """PDU jawaban untuk satu PDU request terhadap satu ModbusImage."""
+    function = pdu[0]
+    try:
+        if function in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS, READ_COILS, READ_DISCRETE_INPUTS):
+            start, count = struct.unpack_from(">HH", pdu, 1)
+            registers, inputs, coils = image.snapshot
+            if function in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+                if not 1 <= count <= MAX_READ_REGISTERS:
+                    return _exception(function, ILLEGAL_DATA_VALUE)
+                if start + count > REGISTER_COUNT:
+                    return _exception(function, ILLEGAL_DATA_ADDRESS)
+                return bytes((function, 2 * count)) + registers[2 * start:2 * (start + count)]
+            limit = OUTPUT_CHANNELS if function == READ_COILS else DI_CHANNELS
+            if not 1 <= count <= MAX_READ_BITS:
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            if start + count > limit:
+                return _exception(function, ILLEGAL_DATA_ADDRESS)
+            data = _bits(coils if function == READ_COILS else inputs, start, count)
+            return bytes((function, len(data))) + data
+
+        engine = image.engine
+        if function == WRITE_SINGLE_COIL:
+            address, value = struct.unpack_from(">HH", pdu, 1)
+            if value not in (0x0000, 0xFF00):
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            if address >= OUTPUT_CHANNELS:
+                return _exception(function, ILLEGAL_DATA_ADDRESS)
+            if not engine.set_output(address + 1, value == 0xFF00):
+                return _exception(function, SERVER_DEVICE_FAILURE)
+            return pdu[:5]
+        if function == WRITE_MULTIPLE_COILS:
+            start, count, size = struct.unpack_from(">HHB", pdu, 1)
+            if not 1 <= count <= MAX_READ_BITS or size != (count + 7) // 8 or len(pdu) < 6 + size:
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            if start + count > OUTPUT_CHANNELS:
+                return _exception(function, ILLEGAL_DATA_ADDRESS)
+            mask = int.from_bytes(pdu[6:6 + size], 'little')
+            results = [engine.set_output(start + i + 1, (mask >> i) & 1) for i in range(count)]
+            if not all(results):
+                return _exception(function, SERVER_DEVICE_FAILURE)
+            return pdu[:5]
+        if function in (WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_REGISTERS):
+            if function == WRITE_SINGLE_REGISTER:
+                address, value = struct.unpack_from(">HH", pdu, 1)
+                count = 1
+            else:
+                address, count, size = struct.unpack_from(">HHB", pdu, 1)
+                if count != 1 or size != 2 or len(pdu) < 8:
+                    return _exception(function, ILLEGAL_DATA_VALUE)
+                (value,) = struct.unpack_from(">H", pdu, 6)
+            if address != REG_MODE:
+                return _exception(function, ILLEGAL_DATA_ADDRESS) # Hanya mode yang dapat ditulis
+            if value not in (MODE_MANUAL, MODE_AUTO):
+                return _exception(function, ILLEGAL_DATA_VALUE)
+            engine.set_mode(value)
+            return pdu[:5] if function == WRITE_SINGLE_REGISTER else pdu[:1] + struct.pack(">HH", address, count)
+    except struct.error:
+        return _exception(function, ILLEGAL_DATA_VALUE) # PDU terpotong
+    return _exception(function, ILLEGAL_FUNCTION)
+
+
+class _ModbusProtocol(asyncio.Protocol):
+    """Satu koneksi klien; request boleh dikirim beruntun (pipelined)."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+
+    def connection_lost(self, exc):
+        self.server.connections -= 1
+
+    def data_received(self, data):
+        self._buffer += data
+        buffer = self._buffer
+        replies = []
+        while len(buffer) >= MBAP.size:
+            transaction, protocol, length, unit = MBAP.unpack_from(buffer)
+            if protocol != 0 or not 2 <= length <= 254:
+                self.transport.close() # Bukan Modbus TCP
+                return
+            end = MBAP.size - 1 + length
+            if len(buffer) < end:
+                break
+            pdu = bytes(buffer[MBAP.size:end])
+            del buffer[:end]
+            reply = self.server.handle(unit, pdu)
+            replies.append(MBAP.pack(transaction, 0, len(reply) + 1, unit) + reply)
+        if replies:
+            self.transport.write(b"".join(replies))
+
+
+class ModbusServer:
+    """Server Modbus TCP di thread + event loop asyncio sendiri."""
+
+    def __init__(self, units, port, host=MODBUS_HOST):
+        self.units = units # Fungsi tanpa argumen -> {unit id: PumpEngine}
+        self.port = port
+        self.host = host
+        self.images = {}
+        self.requests = 0
+        self.connections = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def image(self, unit):
+        """ModbusImage untuk unit id, atau None jika tidak ada stasiun dengan id itu."""
+        image = self.images.get(unit)
+        if image is None and len(self.images) == 1:
+            image = next(iter(self.images.values())) # Satu engine: unit id apa pun
+        return image
+
+    def handle(self, unit, pdu):
+        self.requests += 1
+        image = self.image(unit)
+        if image is None:
+            return _exception(pdu[0], GATEWAY_TARGET_FAILED)
+        return handle_pdu(image, pdu)
+
+    def start(self):
+        """Menjalankan server. Mengembalikan False (dengan pesan) jika port tidak bisa dipakai."""
+        self.images = {unit: ModbusImage(engine) for unit, engine in self.units().items()}
+        ready = threading.Event()
+        error = []
+
+        def main():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(
+                    self._loop.create_server(lambda: _ModbusProtocol(self), self.host, self.port, reuse_address=True))
+            except OSError as e:
+                error.append(e)
+                ready.set()
+                self._loop.close()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=main, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if error:
+            print(f"Modbus TCP tidak aktif (port {self.port}): {error[0]}")
+            self._close_images()
+            return False
+        print(f"Modbus TCP tersedia di {self.host}:{self.port} (unit {', '.join(str(u) for u in sorted(self.images))})")
+        return True
+
+    def _close_images(self):
+        for image in self.images.values():
+            image.close()
+        self.images = {}
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self._close_images()
+
+
+class ModbusClient:
+    """Klien Modbus TCP sinkron minimal untuk pengujian dan skrip."""
+
+    def __init__(self, host="127.0.0.1", port=502, unit=1, timeout=2.0):
+        self.unit = unit
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._transaction = 0
+
+    def _recv_exact(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("Koneksi Modbus ditutup server")
+            data += chunk
+        return data
+
+    def request(self, pdu):
+        """Mengirim satu PDU dan mengembalikan PDU jawaban (ModbusError untuk exception)."""
+        self._transaction = (self._transaction + 1) & 0xFFFF
+        self.sock.sendall(MBAP.pack(self._transaction, 0, len(pdu) + 1, self.unit) + pdu)
+        transaction, _, length, _ = MBAP.unpack(self._recv_exact(MBAP.size))
+        reply = self._recv_exact(length - 1)
+        if transaction != self._transaction:
+            raise ConnectionError(f"Transaction id {transaction} tidak cocok ({self._transaction})")
+        if reply[0] & 0x80:
+            raise ModbusError(reply[0] & 0x7F, reply[1])
+        return reply
+
+    def _read_registers(self, function, start, count):
+        reply = self.request(struct.pack(">BHH", function, start, count))
+        return list(struct.unpack_from(f">{count}H", reply, 2))
+
+    def _read_bits(self, function, start, count):
+        reply = self.request(struct.pack(">BHH", function, start, count))
+        mask = int.from_bytes(reply[2:2 + reply[1]], 'little')
+        return [(mask >> i) & 1 for i in range(count)]
+
+    def read_holding_registers(self, start, count):
+        return self._read_registers(READ_HOLDING_REGISTERS, start, count)
+
+    def read_input_registers(self, start, count):
+        return self._read_registers(READ_INPUT_REGISTERS, start, count)
+
+    def read_coils(self, start, count):
+        return self._read_bits(READ_COILS, start, count)
+
+    def read_discrete_inputs(self, start, count):
+        return self._read_bits(READ_DISCRETE_INPUTS, start, count)
+
+    def write_coil(self, address, value):
+        self.request(struct.pack(">BHH", WRITE_SINGLE_COIL, address, 0xFF00 if value else 0))
+
+    def write_coils(self, start, values):
+        mask = sum(1 << i for i, value in enumerate(values) if value)
+        data = mask.to_bytes((len(values) + 7) // 8, 'little')
+        self.request(struct.pack(">BHHB", WRITE_MULTIPLE_COILS, start, len(values), len(data)) + data)
+
+    def write_register(self, address, value):
+        self.request(struct.pack(">BHH", WRITE_SINGLE_REGISTER, address, value))
+
+    def close(self):
+        self.sock.close()
+
+
+def print_registers(client):
+    values = client.read_input_registers(0, REGISTER_COUNT)
+    for name, value in zip(REGISTER_NAMES, values):
+        print(f"{name:<14}{value}")
+    print(f"{'coils':<14}{client.read_coils(0, OUTPUT_CHANNELS)}")
+    print(f"{'inputs':<14}{client.read_discrete_inputs(0, DI_CHANNELS)}")
+
+
+def bench(host, port, unit, clients, seconds):
+    """Polling input register dari banyak klien sekaligus; mencetak request/detik."""
+    counts = [0] * clients
+    latencies = [[] for _ in range(clients)]
+    deadline = time.monotonic() + seconds
+
+    def worker(i):
+        client = ModbusClient(host, port, unit)
+        try:
+            while time.monotonic() < deadline:
+                t0 = time.perf_counter()
+                client.read_input_registers(0, REGISTER_COUNT)
+                latencies[i].append(time.perf_counter() - t0)
+                counts[i] += 1
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    merged = sorted(t for per_client in latencies for t in per_client)
+    total = sum(counts)
+    print(f"{clients} klien, {seconds:g} s: {total / seconds:,.0f} request/s")
+    if merged:
+        print(f"latency p50 {merged[len(merged) // 2] * 1e3:.3f} ms, p99 {merged[int(len(merged) * 0.99)] * 1e3:.3f} ms")
+
+
+# === Main Program (klien) ===
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Klien Modbus TCP untuk server BAS")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=502)
+    arg_parser.add_argument("--unit", type=int, default=1)
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("read", help="Tampilkan semua register, coil dan discrete input")
+    coil_parser = commands.add_parser("coil", help="Tulis coil OUTn (1..4)")
+    coil_parser.add_argument("output", type=int)
+    coil_parser.add_argument("state", type=int, choices=(0, 1))
+    mode_parser = commands.add_parser("mode", help="Ubah mode")
+    mode_parser.add_argument("mode", choices=("manual", "auto"))
+    bench_parser = commands.add_parser("bench", help="Uji laju request dari banyak klien")
+    bench_parser.add_argument("--clients", type=int, default=8)
+    bench_parser.add_argument("--seconds", type=float, default=5.0)
+    args = arg_parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.host, args.port, args.unit, args.clients, args.seconds)
+    else:
+        client = ModbusClient(args.host, args.port, args.unit)
+        try:
+            if args.command == "read":
+                print_registers(client)
+            elif args.command == "coil":
+                client.write_coil(args.output - 1, args.state)
+            else:
+                client.write_register(REG_MODE, MODE_AUTO if args.mode == "auto" else MODE_MANUAL)
+        except ModbusError as e:
+            print(e)
+        finally:
+            client.close()
@@ -0,0 +1,113 @@
+"""
+Overview Tk untuk banyak stasiun pompa (lihat stations.py).
+
+Satu tabel berisi status semua stasiun, diperbarui setiap OVERVIEW_INTERVAL_MS
+dari StationManager.overview(). Double-click (atau Enter) pada satu baris
+membuka tampilan detail gui.App untuk stasiun itu di jendela Toplevel; App
+hanya berlangganan event engine stasiun, engine tetap dikelola manager.
+
+    python overview.py --config stations.json
+    python overview.py --station P01=/tmp/ttyP01 --station P02=/tmp/ttyP02
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from engine import MODE_AUTO
+from metrics import MetricsServer
+from stations import build_arg_parser, manager_from_args
+
+OVERVIEW_INTERVAL_MS = 500
+
+COLUMNS = (
+    ('port', "Port", 140),
+    ('link', "Link", 50),
+    ('mode', "Mode", 60),
+    ('pump', "Pompa", 60),
+    ('level', "Level (m)", 80),
+    ('pressure', "Pressure (Bar)", 100),
+    ('di', "IN0-2", 60),
+    ('age', "Data terakhir", 100),
+    ('error', "Error", 260),
+)
+
+
+class OverviewWindow:
+    """Tabel status semua stasiun dengan drill-down ke gui.App."""
+
+    def __init__(self, master, manager):
+        self.master = master
+        self.manager = manager
+        self.details = {} # nama stasiun -> App yang sedang terbuka
+        self.master.title("BAS Pump Overview")
+
+        self.tree = ttk.Treeview(master, columns=[c[0] for c in COLUMNS], height=16)
+        self.tree.heading('#0', text="Stasiun")
+        self.tree.column('#0', width=100)
+        for key, title, width in COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor='center' if key != 'error' else 'w')
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.tag_configure('offline', foreground="#B00020")
+        self.tree.bind('<Double-1>', self.open_detail)
+        self.tree.bind('<Return>', self.open_detail)
+
+        for name in sorted(manager.stations):
+            self.tree.insert('', tk.END, iid=name, text=name)
+
+        self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.refresh()
+
+    def refresh(self):
+        """Memperbarui semua baris tabel dari ringkasan manager."""
+        for row in self.manager.overview():
+            age = "-" if row['age_s'] is None else f"{row['age_s']:.1f} s"
+            values = (
+                row['port'],
+                "OK" if row['connected'] else "--",
+                "Auto" if row['mode'] == MODE_AUTO else "Manual",
+                row['state'],
+                f"{row['level_m']:.2f}",
+                f"{row['pressure_bar']:.2f}",
+                "".join(str(v) for v in row['di']),
+                age,
+                row['error'] or "",
+            )
+            self.tree.item(row['name'], values=values, tags=() if row['connected'] else ('offline',))
+        self.refresh_job = self.master.after(OVERVIEW_INTERVAL_MS, self.refresh)
+
+    def open_detail(self, event=None):
+        """Membuka (atau memunculkan) tampilan detail stasiun yang dipilih."""
+        from gui import App # Impor saat dibutuhkan: gui memuat matplotlib
+
+        for name in self.tree.selection():
+            app = self.details.get(name)
+            if app is not None and app.master.winfo_exists():
+                app.master.lift()
+                continue
+            window = tk.Toplevel(self.master)
+            app = App(window, self.manager.station(name).engine, owns_engine=False)
+            window.title(f"BAS Pump Monitoring System - {name}")
+            self.details[name] = app
+
+    def on_closing(self):
+        self.master.after_cancel(self.refresh_job)
+        for app in self.details.values():
+            if app.master.winfo_exists():
+                app.on_closing()
+        self.manager.stop()
+        self.master.destroy()
+
+
+# === Main Program ===
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    manager = manager_from_args(args)
+    if args.metrics_port:
+        MetricsServer(manager.metrics_sources, args.metrics_port).start()
+    if args.modbus_port:
+        from modbus import ModbusServer
+        ModbusServer(manager.modbus_units, args.modbus_port).start()
+    manager.start_in_thread()
+    root = tk.Tk()
+    OverviewWindow(root, manager)
+    root.mainloop()
@@ -0,0 +1,282 @@
+"""
+Rekaman sesi serial mentah dan replay-nya sebagai pengganti serial.Serial.
+
+SessionRecorder menyimpan SEMUA byte yang diterima dari MCU (sebelum dipecah
+menjadi baris) dan semua perintah yang ditulis host, masing-masing dengan
+waktu monotonic relatif terhadap awal rekaman. Format file (.basrec):
+
+    MAGIC (8 byte) | panjang header (uint32) | header JSON
+    record: arah (uint8, 0 = RX, 1 = TX) | t detik (float64) | panjang (uint32) | byte
+
+Header berisi port, baud dan waktu wall-clock awal rekaman. Rekam dengan:
+
+    python engine.py --port /dev/ttyUSB0 --auto --record badai.basrec
+
+ReplaySerial membaca rekaman dan menyuapkan byte RX ke sebuah pipe dengan
+jeda aslinya (speed 1), N kali lebih cepat, atau secepat mungkin (speed 0 /
+"max"). Pipe punya fileno(), jadi LineReader, engine dan stations.py bekerja
+tanpa perubahan. Port dengan format "replay:PATH[@SPEED]" dibuka sebagai
+ReplaySerial oleh open_port(), mis.
+
+    python gui.py --port replay:badai.basrec@10
+
+Replay dimulai saat host menulis perintah pertama (seperti firmware yang baru
+mengirim data setelah ADC_Loop). Perintah yang ditulis host saat replay
+dicatat di ReplaySerial.written sehingga bisa dibandingkan dengan perintah
+yang direkam (lihat `python recording.py replay`).
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+
+import serial
+
+MAGIC = b"BASREC1\n"
+RECORD = struct.Struct("<BdI") # arah, t, panjang
+RX = 0
+TX = 1
+REPLAY_PREFIX = "replay:"
+FLUSH_INTERVAL = 1.0 # Detik maksimal data rekaman tertahan di buffer file
+
+
+class SessionRecorder:
+    """Menulis byte RX/TX dengan timestamp monotonic ke file .basrec."""
+
+    def __init__(self, path, port=None, baud_rate=None):
+        self.path = path
+        self._file = open(path, "wb")
+        self._start = time.monotonic()
+        self._next_flush = self._start + FLUSH_INTERVAL
+        self._lock = threading.Lock() # RX dari thread pembaca, TX dari thread penulis
+        header = json.dumps({'port': port, 'baud': baud_rate, 'started': time.time()}).encode('utf-8')
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self.records = 0
+
+    def _write(self, direction, data):
+        now = time.monotonic()
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD.pack(direction, now - self._start, len(data)))
+            self._file.write(data)
+            self.records += 1
+            if now >= self._next_flush:
+                self._file.flush() # Rekaman tetap terbaca walaupun proses mati
+                self._next_flush = now + FLUSH_INTERVAL
+
+    def record_rx(self, data):
+        """Byte mentah dari MCU (tap LineReader)."""
+        self._write(RX, data)
+
+    def record_tx(self, data):
+        """Byte perintah yang sudah ditulis ke port."""
+        self._write(TX, data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path):
+    """(header, [(arah, t, bytes), ...]) dari file .basrec."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} bukan file rekaman serial")
+    pos = len(MAGIC)
+    (header_size,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    header = json.loads(data[pos:pos + header_size])
+    pos += header_size
+    records = []
+    while pos + RECORD.size <= len(data):
+        direction, t, size = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if pos + size > len(data):
+            break # Record terakhir terpotong (proses mati saat merekam)
+        records.append((direction, t, data[pos:pos + size]))
+        pos += size
+    return header, records
+
+
+def parse_replay_port(port):
+    """(path, speed) dari "replay:PATH[@SPEED]"; speed 0 = secepat mungkin."""
+    spec = port[len(REPLAY_PREFIX):]
+    path, _, speed = spec.rpartition("@")
+    if not path:
+        return spec, 1.0
+    try:
+        return path, 0.0 if speed == "max" else float(speed)
+    except ValueError:
+        return spec, 1.0 # '@' bagian dari nama file
+
+
+def open_port(port, baud_rate, timeout=0.1):
+    """serial.Serial untuk port biasa, ReplaySerial untuk "replay:PATH[@SPEED]"."""
+    if isinstance(port, str) and port.startswith(REPLAY_PREFIX):
+        path, speed = parse_replay_port(port)
+        try:
+            return ReplaySerial(path, speed, timeout=timeout)
+        except (OSError, ValueError) as e:
+            raise serial.SerialException(f"could not open replay {path}: {e}")
+    return serial.Serial(port, baud_rate, timeout=timeout)
+
+
+class ReplaySerial:
+    """
+    Pengganti serial.Serial yang memutar ulang byte RX rekaman lewat pipe.
+    speed: 1 = waktu asli, N = N kali lebih cepat, 0 = secepat mungkin.
+    """
+
+    def __init__(self, path, speed=1.0, timeout=0.1, loop=False):
+        header, records = read_recording(path)
+        self.port = f"{REPLAY_PREFIX}{path}"
+        self.baudrate = header.get('baud')
+        self.header = header
+        self.speed = speed
+        self.timeout = timeout
+        self.loop = loop
+        self.rx = [(t, data) for direction, t, data in records if direction == RX]
+        self.recorded_tx = [(t, data) for direction, t, data in records if direction == TX]
+        self.written = [] # (t replay, bytes) yang ditulis host selama replay
+        self.finished = threading.Event() # Semua byte RX sudah masuk pipe
+        self.is_open = True
+        self._read_fd, self._write_fd = os.pipe()
+        self._start = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def fileno(self):
+        return self._read_fd
+
+    @property
+    def eof(self):
+        """True setelah byte RX terakhir masuk pipe: read kosong berarti akhir rekaman, bukan MCU terputus."""
+        return self.finished.is_set()
+
+    @property
+    def in_waiting(self):
+        import fcntl
+        import termios
+        size = struct.unpack("I", fcntl.ioctl(self._read_fd, termios.FIONREAD, b"\0\0\0\0"))[0]
+        return size
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        return os.read(self._read_fd, size)
+
+    def write(self, data):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        with self._lock:
+            if self._thread is None:
+                # Replay dimulai oleh perintah pertama host (mis. DO_Set / ADC_Loop)
+                self._start = time.monotonic()
+                self._thread = threading.Thread(target=self._feed, daemon=True)
+                self._thread.start()
+            self.written.append((time.monotonic() - self._start, bytes(data)))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def _feed(self):
+        first = self.rx[0][0] if self.rx else 0.0 # Lewati jeda sebelum data pertama
+        try:
+            while True:
+                base = time.monotonic()
+                for t, data in self.rx:
+                    if self.speed > 0:
+                        delay = base + (t - first) / self.speed - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                    if not self.is_open:
+                        return
+                    os.write(self._write_fd, data)
+                if not self.loop:
+                    break
+        except (OSError, TypeError):
+            return # Pipe ditutup saat replay berjalan
+        self.finished.set()
+        with self._lock:
+            if self.is_open:
+                # Akhir rekaman: read berikutnya kosong (EOF) dan LineReader melempar EOFError
+                os.close(self._write_fd)
+                self._write_fd = None
+
+    def close(self):
+        with self._lock:
+            if not self.is_open:
+                return
+            self.is_open = False
+            os.close(self._read_fd)
+            if self._write_fd is not None:
+                os.close(self._write_fd)
+                self._write_fd = None
+
+
+def summarize(path):
+    header, records = read_recording(path)
+    rx = [r for r in records if r[0] == RX]
+    tx = [r for r in records if r[0] == TX]
+    duration = records[-1][1] if records else 0.0
+    print(f"File    : {path}")
+    print(f"Port    : {header.get('port')} @ {header.get('baud')}")
+    print(f"Mulai   : {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header.get('started', 0)))}")
+    print(f"Durasi  : {duration:.1f} s")
+    print(f"RX      : {len(rx)} burst, {sum(len(r[2]) for r in rx)} byte")
+    print(f"TX      : {len(tx)} perintah")
+
+
+def replay_headless(path, speed, auto):
+    """Memutar rekaman lewat PumpEngine tanpa GUI lalu membandingkan perintah OUT."""
+    from engine import PumpEngine, MODE_AUTO, print_event
+
+    engine = PumpEngine(f"{REPLAY_PREFIX}{path}@{speed if speed else 'max'}", archive_dir=None)
+    engine.subscribe(print_event)
+    if auto:
+        engine.set_mode(MODE_AUTO) # Sebelum start: sampel pertama sudah dievaluasi mode Auto
+    start = time.monotonic()
+    engine.start()
+    ser = engine.ser
+    ser.finished.wait()
+    while not engine.data_queue.empty():
+        time.sleep(0.05)
+    elapsed = time.monotonic() - start
+    engine.stop()
+
+    def outputs(commands):
+        return [data.strip().decode('ascii', 'replace') for _, data in commands if data.startswith(b"OUT")]
+
+    recorded, produced = outputs(ser.recorded_tx), outputs(ser.written)
+    print(f"Replay {len(ser.rx)} burst dalam {elapsed:.2f} s")
+    print(f"Perintah OUT direkam : {len(recorded)}  {' '.join(recorded[:20])}")
+    print(f"Perintah OUT replay  : {len(produced)}  {' '.join(produced[:20])}")
+    print("Sama dengan rekaman." if recorded == produced else "BERBEDA dari rekaman.")
+
+
+# === Main Program ===
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Rekaman sesi serial BAS (.basrec)")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    info_parser = commands.add_parser("info", help="Ringkasan isi rekaman")
+    info_parser.add_argument("path")
+    replay_parser = commands.add_parser("replay", help="Putar rekaman lewat engine headless")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--speed", default="max", help="1 = waktu asli, N = N kali lebih cepat, max = secepatnya")
+    replay_parser.add_argument("--auto", action="store_true", help="Jalankan logika mode Otomatis")
+    args = arg_parser.parse_args()
+
+    if args.command == "info":
+        summarize(args.path)
+    else:
+        replay_headless(args.path, 0.0 if args.speed == "max" else float(args.speed), args.auto)
@@ -0,0 +1,97 @@
+"""
+Penjadwal pembaruan widget Tk: paling banyak satu panggilan Tk per widget per frame.
+
+Event engine bisa datang jauh lebih cepat dari frame GUI (burst setelah
+redraw grafik, laju sampling tinggi), padahal yang terlihat hanya nilai
+terakhir. set() hanya mencatat nilai terbaru per key (tanpa menyentuh
+widget); flush(), dipanggil sekali per frame oleh check_serial_queue():
+
+    - memformat nilai terakhir per key (mis. konversi kalibrasi ke teks),
+      sekali per frame, bukan per sampel,
+    - melewati panggilan Tk jika teks/nilai yang tampil tidak berubah,
+    - menjalankan PRIORITY_HIGH (status pompa, level, pressure) selalu, lalu
+      PRIORITY_LOW (log, grafik) selama anggaran frame (RENDER_BUDGET_MS)
+      belum habis; sisanya ditunda ke frame berikutnya.
+
+Durasi flush dicatat di tahap latency 'render' (lihat metrics.py).
+"""
+import time
+
+RENDER_BUDGET_MS = 15 # Anggaran waktu Tk per frame (frame GUI 100 ms)
+
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+_UNSET = object()
+_TASK = object() # Nilai untuk task(): selalu dijalankan, tidak dibandingkan
+
+
+class RenderScheduler:
+    """Nilai terakhir per key, dirty check, dan anggaran waktu per frame."""
+
+    def __init__(self, budget_ms=RENDER_BUDGET_MS, metrics=None):
+        self.budget = budget_ms / 1000
+        self.metrics = metrics # PipelineMetrics (opsional): tahap 'render'
+        self._pending = {} # key -> (prioritas, nilai, format, apply)
+        self._shown = {} # key -> nilai yang sedang tampil
+
+        # Statistik
+        self.applied = 0 # Panggilan Tk yang dijalankan
+        self.unchanged = 0 # Dilewati karena tampilan sama
+        self.coalesced = 0 # Nilai yang diganti nilai lebih baru sebelum tampil
+        self.deferred = 0 # Pembaruan prioritas rendah yang ditunda ke frame berikutnya
+
+    def set(self, key, value, apply, fmt=None, priority=PRIORITY_HIGH):
+        """
+        Menjadwalkan apply(tampilan) untuk frame berikutnya, dengan tampilan =
+        fmt(value) (atau value). Nilai lama untuk key yang sama diganti.
+        """
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = (priority, value, fmt, apply)
+
+    def task(self, key, func, priority=PRIORITY_LOW):
+        """Pekerjaan tanpa nilai (mis. flush log, redraw grafik), paling banyak sekali per frame."""
+        self.set(key, _TASK, lambda _: func(), priority=priority)
+
+    def discard(self, key):
+        """Membatalkan pembaruan key yang belum dijalankan."""
+        self._pending.pop(key, None)
+
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Menjalankan pembaruan tertunda; dipanggil sekali per frame di thread Tk."""
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        deadline = start + self.budget
+        # Prioritas tinggi dulu; di dalam satu prioritas urutan set() dipertahankan
+        items = sorted(self._pending.items(), key=lambda item: item[1][0])
+        self._pending = {}
+        for key, entry in items:
+            priority, value, fmt, apply = entry
+            if priority != PRIORITY_HIGH and time.perf_counter() >= deadline:
+                # Anggaran habis: tunda, kecuali sudah ada nilai lebih baru dari apply() di atas
+                self._pending.setdefault(key, entry)
+                self.deferred += 1
+                continue
+            if value is _TASK:
+                apply(None)
+                self.applied += 1
+                continue
+            shown = value if fmt is None else fmt(value)
+            if self._shown.get(key, _UNSET) == shown:
+                self.unchanged += 1
+                continue
+            apply(shown)
+            self._shown[key] = shown
+            self.applied += 1
+        if self.metrics is not None:
+            self.metrics.observe('render', time.perf_counter() - start)
+
+
+def configure(widget, option):
+    """Fungsi apply untuk set(): widget.configure(option=tampilan)."""
+    return lambda value: widget.configure({option: value})
@@ -0,0 +1,55 @@
+"""
+Batch sampel telemetri yang diserahkan dari thread pembaca ke konsumen.
+
+Satu burst read dari port serial menjadi SATU SampleBatch (satu item queue),
+berisi array NumPy terstruktur (timestamp, channel, value) untuk ADC dan DI.
+Konsumen (kontrol, GUI) memproses ribuan sampel per tick dengan biaya tetap
+per item queue, bukan satu lock + satu string per baris.
+"""
+import time
+
+import numpy as np
+
+# Record satu sampel: waktu terima (epoch detik), nomor channel, nilai mentah
+SAMPLE_DTYPE = np.dtype([('timestamp', 'f8'), ('channel', 'u1'), ('value', 'u2')])
+
+KIND_ADC = "adc"
+KIND_DI = "di"
+
+_EMPTY = np.zeros(0, dtype=SAMPLE_DTYPE)
+
+
+class SampleBatch:
+    """Sampel ADC dan DI dari satu burst, urut sesuai kedatangan."""
+
+    __slots__ = ('adc', 'di', 'received', 'malformed', 't_read', 't_parsed')
+
+    def __init__(self, adc=_EMPTY, di=_EMPTY, received=None, malformed=0):
+        self.adc = adc
+        self.di = di
+        self.received = time.time() if received is None else received
+        self.malformed = malformed # Jumlah baris yang gagal di-parse
+        # Waktu monotonic byte selesai dibaca / batch selesai di-parse (lihat metrics.py)
+        self.t_read = None
+        self.t_parsed = None
+
+    def __len__(self):
+        return len(self.adc) + len(self.di)
+
+    def records(self, kind):
+        return self.adc if kind == KIND_ADC else self.di
+
+    def channel(self, ch, kind=KIND_ADC):
+        """Array sampel untuk satu channel saja."""
+        records = self.records(kind)
+        return records[records['channel'] == ch]
+
+    def channels(self, kind=KIND_ADC):
+        """Dict channel -> array sampel channel tersebut."""
+        records = self.records(kind)
+        return {int(ch): records[records['channel'] == ch] for ch in np.unique(records['channel'])}
+
+    def latest(self, kind=KIND_ADC):
+        """Dict channel -> nilai terakhir di batch ini."""
+        records = self.records(kind)
+        return dict(zip(records['channel'].tolist(), records['value'].tolist()))
@@ -0,0 +1,113 @@
+"""
+Pembaca serial berbasis event (tanpa polling in_waiting + sleep).
+
+LineReader menunggu file descriptor port serial dengan select() sampai ada
+data, lalu mengambil SEMUA byte yang tersedia dalam satu read ke buffer yang
+dipakai ulang. Semua baris lengkap dikembalikan sebagai satu buffer untuk
+di-parse sekaligus; sisa baris yang belum lengkap disimpan untuk read
+berikutnya.
+
+Jika port tidak punya file descriptor (mis. pyserial di Windows), reader
+memakai read blocking dengan timeout port sebagai gantinya.
+
+tap (opsional) dipanggil dengan setiap chunk mentah sebelum dipecah menjadi
+baris, mis. SessionRecorder.record_rx untuk merekam sesi (recording.py).
+"""
+import os
+import select
+
+import serial
+
+READ_CHUNK_SIZE = 65536 # Ukuran buffer read yang dipakai ulang
+MAX_PENDING_BYTES = 65536 # Batas sisa baris tanpa newline sebelum dibuang
+
+
+def serial_fileno(ser_instance):
+    """File descriptor port serial, atau None jika tidak tersedia."""
+    try:
+        return ser_instance.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class LineReader:
+    """Membaca burst byte dari port serial dan memecahnya menjadi baris."""
+
+    def __init__(self, ser_instance, chunk_size=READ_CHUNK_SIZE, tap=None):
+        self.ser = ser_instance
+        self.tap = tap # callback(chunk) untuk setiap byte yang dibaca
+        self.fd = serial_fileno(ser_instance)
+        self._buffer = bytearray(chunk_size)
+        self._view = memoryview(self._buffer)
+        self._pending = bytearray()
+        self.bytes_read = 0
+        self.dropped_bytes = 0 # Byte yang dibuang karena baris terlalu panjang
+
+    def read_chunk(self, timeout):
+        """
+        Menunggu sampai ada data (maksimal timeout detik) lalu membaca semua
+        byte yang tersedia. Mengembalikan memoryview ke buffer internal yang
+        hanya valid sampai pemanggilan berikutnya (kosong jika timeout).
+        Melempar EOFError jika port melaporkan akhir data (port.eof, replay).
+        """
+        if self.fd is not None:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                return self._view[:0]
+            n = os.readv(self.fd, [self._buffer])
+            if n == 0:
+                if getattr(self.ser, 'eof', False):
+                    raise EOFError("end of stream") # Sumber yang bisa habis (ReplaySerial): selesai, bukan error
+                # Sama seperti pyserial: siap dibaca tapi tidak ada data = perangkat terputus
+                raise serial.SerialException("device reports readiness to read but returned no data")
+        else:
+            n = 0
+            waiting = self.ser.in_waiting
+            if not waiting:
+                # Tunggu byte pertama dengan read blocking (timeout port = timeout), lalu ambil sisanya
+                if self.ser.timeout != timeout:
+                    self.ser.timeout = timeout
+                data = self.ser.read(1)
+                if not data:
+                    return self._view[:0]
+                self._buffer[0] = data[0]
+                n = 1
+                waiting = self.ser.in_waiting
+            if waiting:
+                # Buffer tidak boleh diperbesar (ada memoryview): sisa byte dibaca pada panggilan berikutnya
+                data = self.ser.read(min(waiting, len(self._buffer) - n))
+                self._buffer[n:n + len(data)] = data
+                n += len(data)
+        self.bytes_read += n
+        if self.tap is not None:
+            self.tap(self._view[:n])
+        return self._view[:n]
+
+    def read_records(self, timeout=0.1):
+        """
+        Mengembalikan semua baris LENGKAP dari satu burst sebagai satu buffer
+        (termasuk \r\n), siap untuk telemetry.parse_buffer(). Jika tidak ada
+        sisa baris dari read sebelumnya, yang dikembalikan adalah memoryview
+        ke buffer internal tanpa salinan. Sisa baris yang belum lengkap
+        disimpan untuk read berikutnya.
+        """
+        chunk = self.read_chunk(timeout)
+        n = len(chunk)
+        if n == 0:
+            return chunk
+        pending = self._pending
+        end = self._buffer.rfind(b'\n', 0, n)
+        if end < 0:
+            pending += chunk
+            if len(pending) > MAX_PENDING_BYTES:
+                self.dropped_bytes += len(pending)
+                pending.clear()
+            return chunk[:0]
+        if pending:
+            pending += chunk[:end + 1]
+            records = bytes(pending)
+            pending.clear()
+        else:
+            records = chunk[:end + 1]
+        pending += chunk[end + 1:]
+        return records
@@ -1,10 +1,10 @@
 #include <avr/interrupt.h>
 #include <avr/io.h>
-#include <stdio.h>
-#include <stdlib.h>
-#include <string.h>
+#include <stdint.h>
 #include <util/delay.h>
 
+#include "protocol.h"
+
 #define BAUD 115200
 #define USE_DOUBLE_SPEED 1
 
@@ -14,27 +14,15 @@
 #define UBRR_VALUE ((F_CPU / (16UL * BAUD)) - 1)
 #endif
 
-volatile uint8_t adc_enabled = 0;
-volatile uint8_t do_enabled = 0;
-volatile uint8_t di_enabled = 0;
-volatile uint8_t adc_looping = 0;
-volatile uint8_t di_looping = 0;
-volatile uint8_t adc_loop = 0;
-volatile uint8_t di_loop = 0;
+#define TIMER1_PRESCALER 256
 
-volatile uint16_t adc_values[5] = {0};
-volatile uint8_t adc_channel = 0;
+// State perintah (diubah di ISR RX, dibaca di ISR Timer1; ISR AVR tidak saling menyela)
+proto_state_t proto;
+// Telemetri keluar: diisi ISR Timer1, dikuras ISR USART_UDRE
+tx_ring_t tx_ring;
 
-volatile uint8_t output_state[4] = {0};
 volatile uint8_t digital_inputs[3] = {0};
 
-char rx_buffer[32];
-volatile uint8_t rx_index = 0;
-uint8_t adc_request_channel = 0xFF;
-uint8_t di_request_channel = 0xFF;
-uint8_t do_request_channel = 0xFF;
-uint8_t do_request_state = 0;
-
 // USART Functions
 void USART_Init(void) {
 #if USE_DOUBLE_SPEED
@@ -48,15 +36,20 @@ void USART_Init(void) {
   UCSR0C = (1 << UCSZ01) | (1 << UCSZ00);
 }
 
-void USART_Transmit(unsigned char data) {
-  while (!(UCSR0A & (1 << UDRE0)));
-  UDR0 = data;
+// Antrikan satu baris lalu aktifkan interrupt UDRE; tidak menunggu UART.
+// Jika ring penuh baris dibuang utuh (tx_ring.dropped), bukan terpotong.
+void USART_Send(const char* data, uint8_t len) {
+  if (tx_write(&tx_ring, data, len)) {
+    UCSR0B |= (1 << UDRIE0);
+  }
 }
 
-void USART_SendString(const char* str) {
-  while (*str) {
-    USART_Transmit(*str++);
-  }
+ISR(USART0_UDRE_vect) {
+  int16_t c = tx_read(&tx_ring);
+  if (c < 0)
+    UCSR0B &= ~(1 << UDRIE0);  // Ring kosong
+  else
+    UDR0 = (uint8_t)c;
 }
 
 // ADC
@@ -73,116 +66,79 @@ uint16_t ADC_Read(uint8_t channel) {
 }
 
 // Timer
-void Timer1_Init_100ms() {
+void Timer1_Set_Period(uint16_t period_ms) {
+  OCR1A = proto_timer_top(period_ms, F_CPU, TIMER1_PRESCALER);
+  TCNT1 = 0;
+}
+
+void Timer1_Init() {
   TCCR1A = 0;
   TCCR1B = (1 << WGM12) | (1 << CS12);
-  OCR1A = 6250 - 1;
+  Timer1_Set_Period(proto.period_ms);
   TIMSK1 = (1 << OCIE1A);
 }
 
 ISR(TIMER1_COMPA_vect) {
-  if (adc_enabled && (adc_loop || adc_request_channel < 5)) {
-    for (uint8_t ch = 0; ch < 5; ch++) {
-      if (adc_loop || adc_request_channel == ch) {
-        uint16_t val = ADC_Read(ch);
-        char buf[32];
-        snprintf(buf, sizeof(buf), "ADC%d=%u\r\n", ch, val);
-        USART_SendString(buf);
-      }
+  char buf[PROTO_LINE_MAX];
+  uint8_t len;
+  uint8_t mask = proto_adc_tick(&proto);
+
+  for (uint8_t ch = 0; ch < PROTO_ADC_CHANNELS; ch++) {
+    if (mask & (1 << ch)) {
+      len = proto_format(buf, "ADC", ch, ADC_Read(ch));
+      USART_Send(buf, len);
     }
-    adc_request_channel = 0xFF;
   }
 
-  if (di_enabled && (di_loop || di_request_channel < 3)) {
+  mask = proto_di_tick(&proto);
+  if (mask) {
     digital_inputs[0] = (PINB >> 1) & 1;
     digital_inputs[1] = (PINB >> 2) & 1;
     digital_inputs[2] = (PINB >> 3) & 1;
 
-    for (uint8_t i = 0; i < 3; i++) {
-      if (di_loop || di_request_channel == i) {
-        char buf[16];
-        snprintf(buf, sizeof(buf), "IN%d=%d\r\n", i, digital_inputs[i]);
-        USART_SendString(buf);
+    for (uint8_t i = 0; i < PROTO_DI_CHANNELS; i++) {
+      if (mask & (1 << i)) {
+        len = proto_format(buf, "IN", i, digital_inputs[i]);
+        USART_Send(buf, len);
       }
     }
-    di_request_channel = 0xFF;
   }
 
-  if (do_enabled) {
+  if (proto.do_enabled) {
     // Terapkan status output berdasarkan output_state[]
-    if (output_state[0])
+    if (proto.output_state[0])
       PORTD |= (1 << PD5);
     else
       PORTD &= ~(1 << PD5);  // OUT1
-    if (output_state[1])
+    if (proto.output_state[1])
       PORTD |= (1 << PD6);
     else
       PORTD &= ~(1 << PD6);  // OUT2
-    if (output_state[2])
+    if (proto.output_state[2])
       PORTD |= (1 << PD7);
     else
       PORTD &= ~(1 << PD7);  // OUT3
-    if (output_state[3])
+    if (proto.output_state[3])
       PORTB |= (1 << PB0);
     else
       PORTB &= ~(1 << PB0);  // OUT4
   }
 }
 
-ISR(USART_RX_vect) {
-  char c = UDR0;
-  if (c == '\n' || c == '\r') {
-    rx_buffer[rx_index] = '\0';
-
-    if (strcmp(rx_buffer, "ADC_Set") == 0)
-      adc_enabled = 1;
-    else if (strcmp(rx_buffer, "DI_Set") == 0)
-      di_enabled = 1;
-    else if (strcmp(rx_buffer, "DO_Set") == 0)
-      do_enabled = 1;
-    else if (strncmp(rx_buffer, "ADC", 3) == 0 && rx_buffer[4] == '\0')
-      adc_request_channel = rx_buffer[3] - '0';
-    else if (strncmp(rx_buffer, "IN", 2) == 0 && rx_buffer[3] == '\0')
-      di_request_channel = rx_buffer[2] - '0';
-
-    else if (strncmp(rx_buffer, "OUT", 3) == 0 && rx_buffer[5] == '\0') {
-      uint8_t out_index = rx_buffer[3] - '1';  // OUT1 → index 0
-      if (out_index < 4) {
-        output_state[out_index] = rx_buffer[4] - '0';  // '1' = ON, '0' = OFF
-      }
-    }
-
-    rx_index = 0;
-  } else {
-    if (rx_index < sizeof(rx_buffer) - 1) {
-      rx_buffer[rx_index++] = c;
-    }
-  }
-  if (strcmp(rx_buffer, "ADC_Loop") == 0) {
-    adc_looping = 1;
-    adc_enabled = 1;
-  } else if (strcmp(rx_buffer, "DI_Loop") == 0) {
-    di_looping = 1;
-    di_enabled = 1;
-  } else if (strcmp(rx_buffer, "ADC_Stop") == 0) {
-    adc_looping = 0;
-  } else if (strcmp(rx_buffer, "DI_Stop") == 0) {
-    di_looping = 0;
+ISR(USART0_RX_vect) {
+  proto_receive(&proto, UDR0);
+  if (proto.period_changed) {
+    proto.period_changed = 0;
+    Timer1_Set_Period(proto.period_ms);
   }
-  if (strcmp(rx_buffer, "ADC_Loop") == 0)
-    adc_loop = 1;
-  else if (strcmp(rx_buffer, "ADC_Stop") == 0)
-    adc_loop = 0;
-  else if (strcmp(rx_buffer, "DI_Loop") == 0)
-    di_loop = 1;
-  else if (strcmp(rx_buffer, "DI_Stop") == 0)
-    di_loop = 0;
 }
 
 int main(void) {
+  proto_init(&proto);
+  tx_init(&tx_ring);
   USART_Init();
   ADC_Init();
-  Timer1_Init_100ms();
+  Timer1_Init();
 
   DDRC = 0x00;                                      // ADC input PC0-PC4
   DDRB |= (1 << PB0);                               // output PB0
@@ -0,0 +1,333 @@
+"""
+Manager multi-stasiun berbasis asyncio: satu proses mengawasi banyak pit pompa.
+
+Setiap Station membungkus satu PumpEngine (mode Auto/Manual, threshold,
+kalibrasi dan histori sendiri) tetapi TIDAK menjalankan thread pembaca dan
+thread kontrol milik engine. Semua port serial dipantau oleh satu event loop:
+file descriptor port didaftarkan dengan loop.add_reader(), dan saat ada data
+burst dibaca, di-parse dan langsung diproses oleh engine stasiun tersebut.
+Biaya per stasiun hanya satu fd di event loop, satu buffer baca, histori
+STATION_HISTORY_SECONDS dan (opsional) satu thread penulis arsip.
+
+Port yang gagal dibuka atau terputus dicoba ulang setiap
+STATION_RECONNECT_SECONDS tanpa mengganggu stasiun lain.
+
+Daftar stasiun dibaca dari file JSON (lihat stations.example.json):
+
+    python stations.py --config stations.json
+    python stations.py --station P01=/tmp/ttyP01 --station P02=/tmp/ttyP02 --auto
+
+Tampilan Tk (overview semua stasiun + drill-down) ada di overview.py.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import serial
+
+from config import (
+    BAUD_RATE, CALIBRATION_PATH, ARCHIVE_DIR, STATIONS_PATH, STATION_HISTORY_SECONDS, STATION_RECONNECT_SECONDS,
+    METRICS_PORT, MODBUS_PORT, MCU_READY_TIMEOUT, MCU_READY_PROBE_SECONDS,
+)
+from engine import PumpEngine, MODE_AUTO, CH_WATER_LEVEL, CH_PRESSURE, CALIBRATION_CHECK_INTERVAL, print_event, parse_records
+from metrics import MetricsServer
+from serial_reader import LineReader
+
+POLL_INTERVAL = 0.02 # Detik antar read jika port tidak punya fd (Windows)
+
+
+class Station:
+    """Satu pit pompa: engine + koneksi serial yang dikelola event loop."""
+
+    def __init__(self, name, port, baud_rate=BAUD_RATE, thresholds=None, auto=False,
+                 calibration_path=CALIBRATION_PATH, archive_dir=None, record_path=None, filters=None, modbus_unit=None,
+                 alarms=None):
+        self.name = name
+        self.auto = auto # Masuk mode Auto setelah terhubung pertama kali
+        self.modbus_unit = modbus_unit # Unit id Modbus TCP (None = nomor urut, lihat modbus_units)
+        self.engine = PumpEngine(port, baud_rate, calibration_path, archive_dir, thresholds, STATION_HISTORY_SECONDS,
+                                 record_path=record_path, filters=filters, alarms=alarms)
+        self.connected = False
+        self.last_rx = None # time.time() burst terakhir
+        self.reconnects = 0
+        self.error = None # Pesan error koneksi terakhir
+        self._reader = None
+        self._ready = None # asyncio.Event: sampel pertama sudah diterima sejak port dibuka
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Membuat Station dari satu entri stations.json."""
+        name = spec['name']
+        archive = spec.get('archive', True)
+        return cls(
+            name,
+            spec['port'],
+            spec.get('baud', BAUD_RATE),
+            thresholds=spec.get('thresholds'),
+            auto=spec.get('auto', False),
+            calibration_path=spec.get('calibration', CALIBRATION_PATH),
+            archive_dir=(ARCHIVE_DIR / name) if archive else None,
+            record_path=spec.get('record'),
+            filters=spec.get('filters'),
+            modbus_unit=spec.get('modbus_unit'),
+            alarms=spec.get('alarms'),
+        )
+
+    async def run(self):
+        """Loop koneksi: buka port, proses data sampai terputus, lalu coba lagi."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    self.engine.open_serial(timeout=0) # Read non-blocking
+                except serial.SerialException as e:
+                    self.error = str(e)
+                    await asyncio.sleep(STATION_RECONNECT_SECONDS)
+                    continue
+                try:
+                    self.error = await self._serve(loop)
+                finally:
+                    self.connected = False
+                    self.engine.ser.close()
+                self.reconnects += 1
+                self.engine.log(f"Koneksi {self.engine.port} terputus: {self.error}")
+                await asyncio.sleep(STATION_RECONNECT_SECONDS)
+        finally:
+            self.engine.stop()
+
+    async def _serve(self, loop):
+        """Memproses data port yang sudah terbuka; kembali dengan error saat port terputus."""
+        self._reader = LineReader(self.engine.ser, tap=self.engine.rx_tap())
+        self._ready = asyncio.Event()
+        lost = loop.create_future()
+        fd = self._reader.fd
+        poller = None
+        if fd is not None:
+            loop.add_reader(fd, self._on_readable, lost)
+        else:
+            poller = asyncio.ensure_future(self._poll(lost))
+
+        await self._wait_ready(lost)
+        self.engine.send_initial_commands()
+        if self.auto:
+            self.engine.set_mode(MODE_AUTO)
+            self.auto = False # Setelah reconnect, mode terakhir dipertahankan
+        self.connected = True
+        self.error = None
+        try:
+            return await lost
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+            if poller is not None:
+                poller.cancel()
+
+    async def _wait_ready(self, lost):
+        """Handshake setelah port dibuka (lihat PumpEngine.wait_until_ready)."""
+        deadline = time.monotonic() + MCU_READY_TIMEOUT
+        while not self._ready.is_set() and not lost.done():
+            if time.monotonic() >= deadline:
+                self.engine.log(f"MCU di {self.engine.port} belum menjawab setelah {MCU_READY_TIMEOUT:g} detik.")
+                return
+            self.engine.send_command_to_mcu("ADC_Set")
+            self.engine.send_command_to_mcu("ADC0")
+            try:
+                await asyncio.wait_for(self._ready.wait(), MCU_READY_PROBE_SECONDS)
+            except asyncio.TimeoutError:
+                continue
+
+    def _on_readable(self, lost):
+        """Callback event loop: port siap dibaca."""
+        try:
+            records = self._reader.read_records(timeout=0)
+        except (serial.SerialException, OSError, EOFError) as e:
+            if not lost.done():
+                lost.set_result(str(e))
+            return
+        if records:
+            batch = parse_records(records, time.monotonic(), self.engine.metrics)
+            self.last_rx = batch.received
+            if len(batch):
+                self._ready.set()
+            self.engine.handle_batch(batch)
+
+    async def _poll(self, lost):
+        while not lost.done():
+            self._on_readable(lost)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def summary(self):
+        """Ringkasan status untuk tampilan overview."""
+        engine = self.engine
+        return {
+            'name': self.name,
+            'port': engine.port,
+            'connected': self.connected,
+            'mode': engine.mode,
+            'state': engine.state,
+            'level_m': engine.calibration.convert(CH_WATER_LEVEL, engine.adc_values['ADC0']),
+            'pressure_bar': engine.calibration.convert(CH_PRESSURE, engine.adc_values['ADC1']),
+            'di': [engine.di_values[key] for key in sorted(engine.di_values)],
+            'malformed': engine.malformed_lines,
+            'age_s': None if self.last_rx is None else time.time() - self.last_rx,
+            'reconnects': self.reconnects,
+            'error': self.error,
+        }
+
+
+class StationManager:
+    """Menjalankan semua Station dalam satu event loop asyncio."""
+
+    def __init__(self, stations):
+        self.stations = {station.name: station for station in stations}
+        self.loop = None
+        self._main_task = None
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path=STATIONS_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            specs = json.load(f)
+        return cls([Station.from_spec(spec) for spec in specs['stations']])
+
+    def station(self, name):
+        return self.stations[name]
+
+    def metrics_sources(self):
+        """Sumber untuk MetricsServer: metrik setiap stasiun dengan label station."""
+        return [({'station': name}, self.stations[name].engine.metrics) for name in sorted(self.stations)]
+
+    def modbus_units(self):
+        """Sumber untuk ModbusServer: {unit id: engine}; stasiun tanpa modbus_unit diberi nomor urut nama."""
+        units = {station.modbus_unit: station.engine for station in self.stations.values() if station.modbus_unit is not None}
+        unit = 1
+        for name in sorted(self.stations):
+            station = self.stations[name]
+            if station.modbus_unit is None:
+                while unit in units:
+                    unit += 1
+                units[unit] = station.engine
+        return units
+
+    def overview(self):
+        """Ringkasan semua stasiun, urut nama."""
+        return [self.stations[name].summary() for name in sorted(self.stations)]
+
+    async def run(self):
+        """Menjalankan semua stasiun sampai di-cancel."""
+        self.loop = asyncio.get_running_loop()
+        tasks = [asyncio.ensure_future(station.run()) for station in self.stations.values()]
+        tasks.append(asyncio.ensure_future(self._reload_calibration()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _reload_calibration(self):
+        while True:
+            await asyncio.sleep(CALIBRATION_CHECK_INTERVAL)
+            for station in self.stations.values():
+                station.engine.calibration.reload_if_changed()
+
+    # --- Menjalankan event loop di thread latar (untuk GUI Tk) ---
+    def start_in_thread(self):
+        """Menjalankan run() di thread sendiri; main thread tetap bebas untuk Tk."""
+        ready = threading.Event()
+
+        def main():
+            async def runner():
+                self._main_task = asyncio.current_task()
+                ready.set()
+                await self.run()
+            try:
+                asyncio.run(runner())
+            except asyncio.CancelledError:
+                pass
+
+        self._thread = threading.Thread(target=main, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        """Menghentikan event loop yang dijalankan oleh start_in_thread()."""
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+
+def format_overview(rows):
+    """Tabel teks overview untuk mode headless."""
+    lines = [f"{'Stasiun':<10}{'Port':<16}{'Link':<6}{'Mode':<7}{'Pompa':<7}{'Level':>8}{'Press.':>8}  IN   {'Umur':>6}"]
+    for row in rows:
+        age = "-" if row['age_s'] is None else f"{row['age_s']:.1f}s"
+        lines.append(
+            f"{row['name']:<10}{row['port']:<16}{'OK' if row['connected'] else '--':<6}"
+            f"{'Auto' if row['mode'] == MODE_AUTO else 'Man':<7}{row['state']:<7}"
+            f"{row['level_m']:>7.2f}m{row['pressure_bar']:>7.2f}b  {''.join(str(v) for v in row['di']):<5}{age:>6}"
+        )
+    return "\n".join(lines)
+
+
+async def print_overview(manager, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(format_overview(manager.overview()))
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="BAS multi-station manager (headless)")
+    arg_parser.add_argument("--config", default=None, help="File JSON daftar stasiun (default: stations.json)")
+    arg_parser.add_argument("--station", action="append", default=[], metavar="NAMA=PORT",
+                            help="Tambah stasiun tanpa file config (boleh berulang)")
+    arg_parser.add_argument("--auto", action="store_true", help="Stasiun dari --station langsung mode Otomatis")
+    arg_parser.add_argument("--no-archive", action="store_true", help="Jangan arsipkan stasiun dari --station")
+    arg_parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Port endpoint Prometheus (0 = mati)")
+    arg_parser.add_argument("--modbus-port", type=int, default=MODBUS_PORT or 0, help="Port server Modbus TCP (0 = mati)")
+    return arg_parser
+
+
+def manager_from_args(args):
+    """StationManager dari argumen CLI (dipakai juga oleh overview.py)."""
+    if args.station:
+        stations = []
+        for item in args.station:
+            name, port = item.split("=", 1)
+            archive_dir = None if args.no_archive else ARCHIVE_DIR / name
+            stations.append(Station(name, port, auto=args.auto, archive_dir=archive_dir))
+        return StationManager(stations)
+    return StationManager.from_file(args.config or STATIONS_PATH)
+
+
+# === Main Program (headless) ===
+if __name__ == "__main__":
+    arg_parser = build_arg_parser()
+    arg_parser.add_argument("--interval", type=float, default=5.0, help="Detik antar cetak overview")
+    arg_parser.add_argument("--verbose", action="store_true", help="Cetak log aktivitas semua stasiun")
+    args = arg_parser.parse_args()
+
+    manager = manager_from_args(args)
+    if args.metrics_port:
+        MetricsServer(manager.metrics_sources, args.metrics_port).start()
+    if args.modbus_port:
+        from modbus import ModbusServer
+        ModbusServer(manager.modbus_units, args.modbus_port).start()
+    if args.verbose:
+        for station in manager.stations.values():
+            station.engine.subscribe(print_event)
+
+    async def main():
+        overview_task = asyncio.ensure_future(print_overview(manager, args.interval))
+        try:
+            await manager.run()
+        finally:
+            overview_task.cancel()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
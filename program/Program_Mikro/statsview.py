@@ -0,0 +1,81 @@
+"""
+Panel statistik pipeline di dalam aplikasi (Toplevel Tk, dibuka dengan F2).
+
+Menampilkan isi PipelineMetrics engine yang sama dengan endpoint
+Prometheus: laju baris/byte per detik (selisih counter antar refresh),
+error parse, kedalaman queue dan latency per tahap (p50 / p99 / maks).
+"""
+import time
+import tkinter as tk
+
+STATS_INTERVAL_MS = 1000
+
+
+class StatsPanel:
+    """Jendela statistik yang diperbarui setiap STATS_INTERVAL_MS."""
+
+    def __init__(self, master, metrics, title="Statistik Pipeline"):
+        self.metrics = metrics
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        self.text = tk.Text(self.window, width=72, height=24, font=("Consolas", 10), state='disabled')
+        self.text.pack(fill=tk.BOTH, expand=True)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._last = (time.monotonic(), metrics.counter_values())
+        self._job = None
+        self.refresh()
+
+    def render(self):
+        """Teks panel dari metrik saat ini."""
+        now = time.monotonic()
+        counters = self.metrics.counter_values()
+        last_time, last_counters = self._last
+        self._last = (now, counters)
+        elapsed = max(now - last_time, 1e-9)
+
+        def rate(name):
+            return (counters.get(name, 0) - last_counters.get(name, 0)) / elapsed
+
+        lines = [
+            f"Baris/detik  : {rate('lines'):10.1f}    Byte/detik: {rate('bytes'):10.1f}",
+            f"Error parse  : {counters.get('parse_errors', 0):10d}    Batch     : {counters.get('batches', 0):10d}",
+            "",
+            "Counter:",
+        ]
+        for name, value in sorted(counters.items()):
+            lines.append(f"  {name:<28}{value:>12}")
+        lines.append("")
+        lines.append("Queue:")
+        for name, value in sorted(self.metrics.gauge_values().items()):
+            lines.append(f"  {name:<28}{value:>12}")
+        lines.append("")
+        lines.append(f"{'Latency (ms)':<14}{'n':>10}{'p50':>10}{'p99':>10}{'maks':>10}")
+        for stage, histogram in self.metrics.latency.items():
+            if histogram.count == 0:
+                lines.append(f"{stage:<14}{0:>10}{'-':>10}{'-':>10}{'-':>10}")
+                continue
+            lines.append(
+                f"{stage:<14}{histogram.count:>10}{histogram.quantile(0.5) * 1e3:>10.2f}"
+                f"{histogram.quantile(0.99) * 1e3:>10.2f}{histogram.max * 1e3:>10.2f}"
+            )
+        return "\n".join(lines)
+
+    def refresh(self):
+        text = self.render()
+        self.text.configure(state='normal')
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, text)
+        self.text.configure(state='disabled')
+        self._job = self.window.after(STATS_INTERVAL_MS, self.refresh)
+
+    def lift(self):
+        self.window.lift()
+
+    def exists(self):
+        return self._job is not None
+
+    def close(self):
+        if self._job is not None:
+            self.window.after_cancel(self._job)
+            self._job = None
+        self.window.destroy()
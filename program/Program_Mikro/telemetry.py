@@ -0,0 +1,176 @@
+"""
+Parser telemetri ADC/IN di level bytes.
+
+parse_buffer() menerjemahkan satu buffer berisi banyak record
+"ADCn=value\r\n" / "INn=value\r\n" sekaligus. Buffer besar dibaca langsung
+(bytes / bytearray / memoryview) sebagai array uint8 NumPy, lalu posisi
+newline, prefix, channel, '=' dan digit nilai divalidasi secara vektor:
+tidak ada objek str, split() atau int() per baris. Baris rusak hanya
+dihitung (SampleBatch.malformed), tidak di-print.
+
+Untuk burst kecil (beberapa baris per tick Timer1) overhead pemanggilan
+NumPy lebih mahal dari parsingnya sendiri. Buffer di bawah
+SMALL_BUFFER_BYTES dipecah dengan split() (satu objek bytes per baris),
+lalu setiap baris dicari di tabel baris valid -> 3 byte (channel, value)
+dan semuanya digabung dengan satu join memakai timestamp 8 byte sebagai
+pemisah, sehingga hasilnya langsung berlayout SAMPLE_DTYPE dan menjadi
+array lewat satu np.frombuffer (read-only). Tidak ada str, int(), tuple
+atau match object per baris. Baris yang belum ada di tabel (nilai baru,
+baris kosong atau rusak) membuat seluruh buffer diparse regex per baris,
+yang sekaligus mengisi tabel (paling banyak LINE_CACHE_SIZE baris; ADC
+10-bit 10 channel + DI muat semua).
+
+Micro-benchmark terhadap parsing lama ada di bench_parser.py.
+"""
+import operator
+import re
+import struct
+import time
+
+import numpy as np
+
+from samples import SAMPLE_DTYPE, SampleBatch
+
+_NL = ord('\n')
+_CR = ord('\r')
+_EQ = ord('=')
+_ZERO = ord('0')
+
+MAX_VALUE_DIGITS = 5 # Nilai maksimal 65535 (field 'value' bertipe u2)
+SMALL_BUFFER_BYTES = 1024 # Di bawah ini jalur regex lebih cepat dari jalur vektor
+
+LINE_CACHE_SIZE = 16384 # Baris berbeda yang diingat jalur kecil (10 channel x ADC 10-bit + DI)
+
+# Setiap baris cocok dengan tepat satu alternatif: record valid, baris kosong, atau baris rusak
+_LINE_PATTERN = re.compile(rb'(?:(ADC|IN)([0-9])=([0-9]{1,5})\r?\n)|(\r?\n)|[^\n]*\n')
+# Layout SAMPLE_DTYPE: timestamp f8 lalu (channel u1, value u2)
+_TIMESTAMP = struct.Struct('<d')
+_CHANNEL_VALUE = struct.Struct('<BH')
+# Baris valid (tanpa '\n') -> 3 byte channel + value; diisi _parse_lines()
+_line_records = {}
+
+def parse_buffer(buf, timestamp=None):
+    """
+    Parsing semua baris lengkap di buf.
+    Mengembalikan (SampleBatch, consumed) dengan consumed = jumlah byte sampai
+    newline terakhir; sisa baris yang belum lengkap menjadi tanggung jawab
+    pemanggil.
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    if len(buf) < SMALL_BUFFER_BYTES:
+        return _parse_small(buf if isinstance(buf, bytes) else bytes(buf), timestamp)
+    data = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(data == _NL)
+    if len(ends) == 0:
+        return SampleBatch(received=timestamp), 0
+    consumed = int(ends[-1]) + 1
+    last = consumed - 1
+
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # Buang '\r' sebelum '\n' dan abaikan baris kosong
+    stops = ends - ((data[np.maximum(ends - 1, 0)] == _CR) & (ends > starts))
+    nonempty = stops > starts
+    starts = starts[nonempty]
+    stops = stops[nonempty]
+
+    def byte_at(offset):
+        # Indeks di-clip agar tidak keluar buffer; validitas dicek lewat jumlah digit
+        return data[np.minimum(starts + offset, last)]
+
+    first = byte_at(0)
+    second = byte_at(1)
+    is_adc = (first == ord('A')) & (second == ord('D')) & (byte_at(2) == ord('C'))
+    is_in = (first == ord('I')) & (second == ord('N'))
+    prefix_len = np.where(is_adc, 3, 2)
+
+    channel_pos = starts + prefix_len
+    channel = data[np.minimum(channel_pos, last)].astype(np.int16) - _ZERO
+    has_eq = data[np.minimum(channel_pos + 1, last)] == _EQ
+    value_start = channel_pos + 2
+    digits = stops - value_start
+
+    valid = (is_adc | is_in) & (channel >= 0) & (channel <= 9) & has_eq
+    valid &= (digits >= 1) & (digits <= MAX_VALUE_DIGITS)
+
+    value = np.zeros(len(starts), dtype=np.int32)
+    for k in range(MAX_VALUE_DIGITS):
+        in_value = k < digits
+        digit = data[np.minimum(value_start + k, last)].astype(np.int32) - _ZERO
+        valid &= ~in_value | ((digit >= 0) & (digit <= 9))
+        value = np.where(in_value, value * 10 + digit, value)
+    valid &= value <= 0xFFFF
+
+    malformed = int(len(starts) - np.count_nonzero(valid))
+    return SampleBatch(
+        _records(is_adc & valid, channel, value, timestamp),
+        _records(is_in & valid, channel, value, timestamp),
+        timestamp,
+        malformed,
+    ), consumed
+
+
+def _records(mask, channel, value, timestamp):
+    records = np.empty(np.count_nonzero(mask), dtype=SAMPLE_DTYPE)
+    records['timestamp'] = timestamp
+    records['channel'] = channel[mask]
+    records['value'] = value[mask]
+    return records
+
+
+_record_of = _line_records.__getitem__
+_NO_RECORDS = np.zeros(0, dtype=SAMPLE_DTYPE)
+_first_byte = operator.itemgetter(0)
+
+
+def _parse_small(data, timestamp):
+    consumed = data.rfind(b'\n') + 1
+    lines = (data if consumed == len(data) else data[:consumed]).split(b'\n')
+    del lines[-1]
+    if not lines:
+        return SampleBatch(received=timestamp), consumed
+    # Timestamp 8 byte sebagai pemisah join: ts + ts.join(record) = n record SAMPLE_DTYPE utuh
+    stamp = _TIMESTAMP.pack(timestamp)
+    try:
+        if b'IN' not in data:
+            return SampleBatch(_join_records(stamp, lines), _NO_RECORDS, timestamp), consumed
+        # Sort stabil per byte pertama: baris ADC ('A') sebelum IN ('I'), urutan kedatangan tetap
+        lines.sort(key=_first_byte)
+        n_adc = data.count(b'A', 0, consumed)
+        return SampleBatch(_join_records(stamp, lines[:n_adc]), _join_records(stamp, lines[n_adc:]), timestamp), consumed
+    except (KeyError, IndexError):
+        # Baris belum dikenal (nilai baru, baris kosong atau rusak): parser per baris, sekaligus mengisi tabel
+        return _parse_lines(data, timestamp)
+
+
+def _join_records(stamp, lines):
+    if not lines:
+        return _NO_RECORDS
+    return np.frombuffer(stamp + stamp.join(map(_record_of, lines)), SAMPLE_DTYPE)
+
+
+def _parse_lines(data, timestamp):
+    """Parser regex per baris; baris valid dicatat di tabel _parse_small()."""
+    adc, di = [], []
+    malformed = 0
+    for match in _LINE_PATTERN.finditer(data):
+        prefix, channel, value = match.group(1, 2, 3)
+        if prefix is None:
+            if match.group(4) is None:
+                malformed += 1
+            continue
+        value = int(value)
+        if value > 0xFFFF:
+            malformed += 1
+            continue
+        channel = channel[0] - _ZERO
+        (adc if prefix == b"ADC" else di).append((timestamp, channel, value))
+        if len(_line_records) < LINE_CACHE_SIZE:
+            _line_records[match.group(0)[:-1]] = _CHANNEL_VALUE.pack(channel, value)
+    return SampleBatch(
+        np.array(adc, dtype=SAMPLE_DTYPE),
+        np.array(di, dtype=SAMPLE_DTYPE),
+        timestamp,
+        malformed,
+    ), data.rfind(b'\n') + 1
@@ -0,0 +1,174 @@
+// Unit test host untuk lib/protocol: pio test -e native
+#include <string.h>
+#include <unity.h>
+
+#include "protocol.h"
+
+static proto_state_t state;
+
+static void send_line(const char *line) {
+  while (*line) proto_receive(&state, *line++);
+  proto_receive(&state, '\r');
+  proto_receive(&state, '\n');
+}
+
+void setUp(void) { proto_init(&state); }
+
+void tearDown(void) {}
+
+void test_default_state(void) {
+  TEST_ASSERT_EQUAL_UINT8(PROTO_ADC_MASK_ALL, state.adc_mask);
+  TEST_ASSERT_EQUAL_UINT16(PROTO_PERIOD_DEFAULT_MS, state.period_ms);
+  TEST_ASSERT_EQUAL_UINT8(0, proto_adc_tick(&state));
+  TEST_ASSERT_EQUAL_UINT8(0, proto_di_tick(&state));
+}
+
+void test_adc_loop_sends_all_channels(void) {
+  send_line("ADC_Loop");
+  TEST_ASSERT_EQUAL_UINT8(1, state.adc_enabled);
+  TEST_ASSERT_EQUAL_UINT8(0x1F, proto_adc_tick(&state));
+  TEST_ASSERT_EQUAL_UINT8(0x1F, proto_adc_tick(&state));
+  send_line("ADC_Stop");
+  TEST_ASSERT_EQUAL_UINT8(0, proto_adc_tick(&state));
+}
+
+void test_adc_mask_limits_loop(void) {
+  send_line("ADC_Loop");
+  send_line("ADC_Mask=3");
+  TEST_ASSERT_EQUAL_UINT8(0x03, proto_adc_tick(&state));
+  send_line("ADC_Mask=255");
+  TEST_ASSERT_EQUAL_UINT8(0x1F, proto_adc_tick(&state));
+  send_line("ADC_Mask=x");  // Tidak valid: mask tidak berubah
+  TEST_ASSERT_EQUAL_UINT8(0x1F, state.adc_mask);
+}
+
+void test_single_request_is_one_shot(void) {
+  send_line("ADC_Set");
+  send_line("ADC3");
+  TEST_ASSERT_EQUAL_UINT8(1 << 3, proto_adc_tick(&state));
+  TEST_ASSERT_EQUAL_UINT8(0, proto_adc_tick(&state));
+}
+
+void test_single_request_ignores_mask(void) {
+  send_line("ADC_Loop");
+  send_line("ADC_Mask=1");
+  send_line("ADC4");
+  TEST_ASSERT_EQUAL_UINT8(0x11, proto_adc_tick(&state));
+  TEST_ASSERT_EQUAL_UINT8(0x01, proto_adc_tick(&state));
+}
+
+void test_request_needs_enable(void) {
+  send_line("ADC2");
+  send_line("IN1");
+  TEST_ASSERT_EQUAL_UINT8(0, proto_adc_tick(&state));
+  TEST_ASSERT_EQUAL_UINT8(0, proto_di_tick(&state));
+}
+
+void test_di_loop_and_request(void) {
+  send_line("DI_Set");
+  send_line("IN2");
+  TEST_ASSERT_EQUAL_UINT8(1 << 2, proto_di_tick(&state));
+  send_line("DI_Loop");
+  TEST_ASSERT_EQUAL_UINT8(0x07, proto_di_tick(&state));
+  send_line("DI_Stop");
+  TEST_ASSERT_EQUAL_UINT8(0, proto_di_tick(&state));
+}
+
+void test_outputs(void) {
+  send_line("DO_Set");
+  send_line("OUT11");
+  send_line("OUT41");
+  send_line("OUT50");  // Di luar OUT1..OUT4: diabaikan
+  TEST_ASSERT_EQUAL_UINT8(1, state.do_enabled);
+  TEST_ASSERT_EQUAL_UINT8(1, state.output_state[0]);
+  TEST_ASSERT_EQUAL_UINT8(0, state.output_state[1]);
+  TEST_ASSERT_EQUAL_UINT8(1, state.output_state[3]);
+  send_line("OUT10");
+  TEST_ASSERT_EQUAL_UINT8(0, state.output_state[0]);
+}
+
+void test_period_is_clamped(void) {
+  send_line("ADC_Period=50");
+  TEST_ASSERT_EQUAL_UINT8(1, state.period_changed);
+  TEST_ASSERT_EQUAL_UINT16(50, state.period_ms);
+  send_line("ADC_Period=1");
+  TEST_ASSERT_EQUAL_UINT16(PROTO_PERIOD_MIN_MS, state.period_ms);
+  send_line("ADC_Period=60000");
+  TEST_ASSERT_EQUAL_UINT16(PROTO_PERIOD_MAX_MS, state.period_ms);
+  state.period_changed = 0;
+  send_line("ADC_Period=99999");  // Terlalu besar untuk dibaca: diabaikan
+  TEST_ASSERT_EQUAL_UINT8(0, state.period_changed);
+}
+
+void test_long_line_is_truncated(void) {
+  send_line("ADC_Loop_dengan_baris_yang_terlalu_panjang_sekali");
+  TEST_ASSERT_EQUAL_UINT8(0, state.adc_loop);
+  send_line("ADC_Loop");  // Buffer pulih setelah baris panjang
+  TEST_ASSERT_EQUAL_UINT8(1, state.adc_loop);
+}
+
+void test_timer_top(void) {
+  TEST_ASSERT_EQUAL_UINT16(6250 - 1, proto_timer_top(100, 16000000UL, 256));
+  TEST_ASSERT_EQUAL_UINT16(625 - 1, proto_timer_top(10, 16000000UL, 256));
+  TEST_ASSERT_EQUAL_UINT16(62500 - 1, proto_timer_top(1000, 16000000UL, 256));
+}
+
+void test_format(void) {
+  char buf[PROTO_LINE_MAX];
+  uint8_t len = proto_format(buf, "ADC", 4, 1023);
+  TEST_ASSERT_EQUAL_UINT8(11, len);
+  TEST_ASSERT_EQUAL_MEMORY("ADC4=1023\r\n", buf, len);
+  len = proto_format(buf, "IN", 0, 0);
+  TEST_ASSERT_EQUAL_MEMORY("IN0=0\r\n", buf, len);
+  len = proto_format(buf, "ADC", 0, 65535);
+  TEST_ASSERT_EQUAL_UINT8(12, len);
+  TEST_ASSERT_EQUAL_MEMORY("ADC0=65535\r\n", buf, len);
+}
+
+void test_tx_ring_fifo(void) {
+  tx_ring_t ring;
+  tx_init(&ring);
+  TEST_ASSERT_EQUAL_INT16(-1, tx_read(&ring));
+  TEST_ASSERT_TRUE(tx_write(&ring, "AB", 2));
+  TEST_ASSERT_EQUAL_INT16('A', tx_read(&ring));
+  TEST_ASSERT_EQUAL_INT16('B', tx_read(&ring));
+  TEST_ASSERT_EQUAL_INT16(-1, tx_read(&ring));
+}
+
+void test_tx_ring_full_drops_whole_line(void) {
+  tx_ring_t ring;
+  char line[PROTO_LINE_MAX];
+  uint8_t len = proto_format(line, "ADC", 1, 512);  // 10 byte
+  tx_init(&ring);
+  TEST_ASSERT_EQUAL_UINT8(TX_RING_SIZE - 1, tx_free(&ring));
+  for (uint8_t i = 0; i < 25; i++) TEST_ASSERT_TRUE(tx_write(&ring, line, len));
+  TEST_ASSERT_EQUAL_UINT8(5, tx_free(&ring));
+  TEST_ASSERT_FALSE(tx_write(&ring, line, len));
+  TEST_ASSERT_EQUAL_UINT16(1, ring.dropped);
+  // Setelah sebagian terkirim baris berikutnya muat lagi, melewati batas ring
+  for (uint8_t i = 0; i < len; i++) tx_read(&ring);
+  TEST_ASSERT_TRUE(tx_write(&ring, line, len));
+  for (uint16_t i = 0; i < 25 * len; i++) {
+    TEST_ASSERT_EQUAL_INT16(line[i % len], tx_read(&ring));
+  }
+  TEST_ASSERT_EQUAL_INT16(-1, tx_read(&ring));
+}
+
+int main(void) {
+  UNITY_BEGIN();
+  RUN_TEST(test_default_state);
+  RUN_TEST(test_adc_loop_sends_all_channels);
+  RUN_TEST(test_adc_mask_limits_loop);
+  RUN_TEST(test_single_request_is_one_shot);
+  RUN_TEST(test_single_request_ignores_mask);
+  RUN_TEST(test_request_needs_enable);
+  RUN_TEST(test_di_loop_and_request);
+  RUN_TEST(test_outputs);
+  RUN_TEST(test_period_is_clamped);
+  RUN_TEST(test_long_line_is_truncated);
+  RUN_TEST(test_timer_top);
+  RUN_TEST(test_format);
+  RUN_TEST(test_tx_ring_fifo);
+  RUN_TEST(test_tx_ring_full_drops_whole_line);
+  return UNITY_END();
+}
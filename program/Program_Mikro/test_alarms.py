@@ -0,0 +1,96 @@
+"""Tes transisi aturan alarm: aktif saat kondisi terpenuhi, selesai saat hilang, satu event per perubahan."""
+import numpy as np
+import pytest
+
+from alarms import AlarmEngine, ChatterRule, RateRule, StuckRule, ThresholdRule, make_rule
+from samples import SAMPLE_DTYPE, SampleBatch
+
+
+def batch(samples, channel=0, kind="adc"):
+    records = np.zeros(len(samples), dtype=SAMPLE_DTYPE)
+    records['timestamp'] = [t for t, _ in samples]
+    records['channel'] = channel
+    records['value'] = [v for _, v in samples]
+    return SampleBatch(records, received=0.0) if kind == "adc" else SampleBatch(di=records, received=0.0)
+
+
+def feed(engine, samples, channel=0, kind="adc", pump_running=False, raw=None):
+    engine.feed(batch(samples, channel, kind), raw, pump_running)
+
+
+def transitions(specs):
+    alarms = []
+    engine = AlarmEngine(specs, on_alarm=alarms.append)
+    return engine, alarms
+
+
+def test_above_rule_needs_hold_and_clears():
+    engine, alarms = transitions([{"name": "tinggi", "type": "above", "channel": "ADC0", "threshold": 100, "hold_s": 2}])
+    feed(engine, [(0, 150), (1, 150), (1.5, 90), (2, 150), (3, 150)])
+    assert alarms == [] # Kondisi putus di t=1.5, hold mulai lagi dari t=2
+    feed(engine, [(4, 150), (5, 150)])
+    assert [(a.active, a.timestamp) for a in alarms] == [(True, 4)]
+    assert engine.active() == engine.rules
+    feed(engine, [(6, 50), (7, 40)])
+    assert [(a.active, a.timestamp, a.value) for a in alarms] == [(True, 4, 150), (False, 6, 50)]
+    assert alarms[0].name == "tinggi" and alarms[0].channel == "ADC0" and alarms[0].rule_id == 1
+    assert engine.raised == 1 and engine.active() == []
+
+
+def test_below_rule():
+    engine, alarms = transitions([{"type": "below", "channel": "ADC1", "threshold": 10}])
+    feed(engine, [(0, 20), (1, 5), (2, 6), (3, 30)], channel=1)
+    assert [(a.active, a.timestamp) for a in alarms] == [(True, 1), (False, 3)]
+    feed(engine, [(4, 1)], channel=0) # Channel lain tidak dievaluasi
+    assert len(alarms) == 2
+
+
+def test_rate_rule_slope_over_window():
+    rule = RateRule(1, "naik", "ADC0", rate_per_min=30, window_s=10)
+    # Naik 1 per detik = 60 per menit, tapi jendela baru penuh setengah setelah 5 s
+    results = [rule.update(t, float(t), False) for t in range(0, 20)]
+    assert results[:5] == [False] * 5
+    assert all(results[5:])
+    assert rule.slope == pytest.approx(1.0)
+    # Datar: kemiringan turun ke nol setelah jendela terisi nilai konstan
+    results = [rule.update(t, 19.0, False) for t in range(20, 40)]
+    assert results[-1] is False
+    assert rule.slope == pytest.approx(0.0, abs=1e-6)
+
+
+def test_rate_rule_stays_accurate_over_long_runs():
+    rule = RateRule(1, "naik", "ADC0", rate_per_min=1000, window_s=5)
+    t0 = 1.7e9 # Timestamp epoch: jumlah bergulir harus tetap presisi
+    for k in range(20000):
+        rule.update(t0 + k * 0.1, 2.0 * k * 0.1, False)
+    assert rule.slope == pytest.approx(2.0, rel=1e-6)
+
+
+def test_stuck_rule_only_while_pump_running():
+    rule = StuckRule(1, "macet", "ADC1", tolerance=0.5, window_s=3)
+    assert not any(rule.update(t, 5.0, False) for t in range(10))
+    assert [rule.update(t, 5.0, True) for t in range(10, 15)] == [False, False, False, True, True]
+    assert rule.update(15, 7.0, True) is False # Bergerak lebih dari tolerance di jendela
+    assert rule.update(16, 5.0, False) is False # Pompa mati: jendela direset
+    assert rule.update(17, 5.0, True) is False
+
+
+def test_chatter_rule_uses_raw_samples():
+    engine, alarms = transitions([{"type": "chatter", "channel": "IN0", "changes": 3, "window_s": 5}])
+    raw = batch([(0, 0), (1, 1), (2, 0), (3, 1), (4, 1)], kind="di")
+    filtered = batch([(0, 0), (1, 0), (2, 0), (3, 0), (4, 0)], kind="di")
+    engine.feed(filtered, raw)
+    assert [(a.active, a.timestamp) for a in alarms] == [(True, 3)]
+    engine.feed(batch([(9, 1)], kind="di"))
+    assert [(a.active, a.timestamp) for a in alarms] == [(True, 3), (False, 9)]
+    assert isinstance(engine.rules[0], ChatterRule)
+
+
+def test_make_rule_defaults_and_errors():
+    rule = make_rule({"type": "above", "channel": "ADC2", "threshold": 1}, 7)
+    assert isinstance(rule, ThresholdRule)
+    assert (rule.id, rule.name, rule.kind, rule.ch) == (7, "above_ADC2", "adc", 2)
+    with pytest.raises(ValueError):
+        make_rule({"type": "unknown", "channel": "ADC0"}, 1)
+    with pytest.raises(ValueError):
+        make_rule({"type": "above", "channel": "OUT1", "threshold": 1}, 1)
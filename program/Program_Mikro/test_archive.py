@@ -0,0 +1,119 @@
+"""Tes arsip: tulis lewat ArchiveWriter, baca kembali lewat ArchiveReader (dengan rotasi segmen)."""
+import numpy as np
+
+from archive import CODE_ALARM, CODE_DI, CODE_OUT, HEADER, ArchiveReader, ArchiveWriter, Segment, record_code
+from samples import KIND_ADC, KIND_DI, SAMPLE_DTYPE, SampleBatch
+
+T0 = 1.7e9
+
+
+def make_batch(start, n, dt=0.01):
+    """n tick: ADC0 dan ADC1 per tick, IN0 setiap tick ke-5."""
+    t = T0 + start + np.arange(n) * dt
+    adc = np.zeros(2 * n, dtype=SAMPLE_DTYPE)
+    adc['timestamp'] = np.repeat(t, 2)
+    adc['channel'] = np.tile([0, 1], n)
+    adc['value'] = np.arange(2 * n) % 1024
+    di = np.zeros(len(t[::5]), dtype=SAMPLE_DTYPE)
+    di['timestamp'] = t[::5]
+    di['value'] = np.arange(len(di)) % 2
+    return SampleBatch(adc, di, received=t[-1])
+
+
+def write_archive(directory, batches, extra=(), **kwargs):
+    writer = ArchiveWriter(str(directory), **kwargs)
+    writer.start()
+    for batch in batches:
+        writer.submit_batch(batch)
+    for submit, args in extra:
+        getattr(writer, submit)(*args)
+    writer.stop()
+    return writer
+
+
+def expected_records(batches, extra_records=()):
+    rows = []
+    for batch in batches:
+        rows += [(t, ch, v) for t, ch, v in batch.adc.tolist()]
+        rows += [(t, CODE_DI + ch, v) for t, ch, v in batch.di.tolist()]
+    rows += list(extra_records)
+    rows.sort(key=lambda row: row[0]) # Stabil: urutan tulis untuk timestamp yang sama
+    return rows
+
+
+def as_rows(columns):
+    timestamps, codes, values = columns
+    return list(zip(timestamps.tolist(), codes.tolist(), values.tolist()))
+
+
+def test_round_trip_with_rotation(tmp_path):
+    batches = [make_batch(k * 1.0, 100) for k in range(6)]
+    writer = write_archive(tmp_path, batches, segment_records=160, segment_seconds=3600)
+    reader = ArchiveReader(str(tmp_path))
+    total = sum(len(b) for b in batches)
+    assert writer.records_written == total
+    assert len(reader.segment_paths()) == -(-total // 160) # Rotasi karena penuh
+    rows = as_rows(reader.read())
+    assert sorted(rows, key=lambda row: row[0]) == rows
+    assert sorted(rows) == sorted(expected_records(batches))
+    for segment in reader.segments():
+        assert segment.count <= 160 and segment.ordered
+
+
+def test_rotation_by_age(tmp_path):
+    batches = [make_batch(k * 1.0, 100) for k in range(5)]
+    write_archive(tmp_path, batches, segment_records=100000, segment_seconds=2.0)
+    reader = ArchiveReader(str(tmp_path))
+    paths = reader.segment_paths()
+    assert len(paths) == 3 # 0-2 s, 2-4 s, 4-5 s
+    for segment in reader.segments():
+        timestamps = segment.columns()[0]
+        assert timestamps[-1] - segment.created < 2.0
+    assert len(reader.read()[0]) == sum(len(b) for b in batches)
+
+
+def test_range_and_code_queries_match_brute_force(tmp_path):
+    batches = [make_batch(k * 1.0, 100) for k in range(6)]
+    # Perintah dan alarm dari thread lain bisa datang setelah batch yang lebih baru
+    extra = [("submit_command", (1, 1, T0 + 0.505)), ("submit_alarm", (3, True, T0 + 2.2)), ("submit_command", (1, 0, T0 + 5.995))]
+    write_archive(tmp_path, batches, extra, segment_records=250, segment_seconds=3600)
+    extra_rows = [(T0 + 0.505, CODE_OUT + 1, 1), (T0 + 2.2, CODE_ALARM + 1, 3), (T0 + 5.995, CODE_OUT + 1, 0)]
+    rows = expected_records(batches, extra_rows)
+    reader = ArchiveReader(str(tmp_path))
+    assert not all(segment.ordered for segment in reader.segments())
+    code_adc1 = record_code(KIND_ADC, 1)
+    for t_start, t_end, code in [
+        (None, None, None),
+        (T0 + 0.5, T0 + 2.5, None),
+        (T0 + 1.234, T0 + 1.3, code_adc1),
+        (T0 + 4.0, None, record_code(KIND_DI, 0)),
+        (None, T0 + 0.2, CODE_OUT + 1),
+        (T0 + 100, None, None),
+    ]:
+        expected = [row for row in rows if (t_start is None or row[0] >= t_start)
+                    and (t_end is None or row[0] < t_end) and (code is None or row[1] == code)]
+        result = reader.read(t_start, t_end, code)
+        assert as_rows(result) == expected
+        assert result[1].dtype == np.uint8 and result[2].dtype == np.uint16
+
+
+def test_ordered_single_segment_read_is_a_view(tmp_path):
+    write_archive(tmp_path, [make_batch(0.0, 50)])
+    timestamps, _, _ = ArchiveReader(str(tmp_path)).read(T0 + 0.1, T0 + 0.2)
+    assert not timestamps.flags.owndata
+    assert timestamps[0] >= T0 + 0.1 and timestamps[-1] < T0 + 0.2
+
+
+def test_segment_header_tracks_bounds(tmp_path):
+    path = str(tmp_path / "seg.basarc")
+    segment = Segment(path, capacity=12, created=T0) # Dibulatkan ke kelipatan 8
+    segment.append(np.array([T0 + 2, T0 + 3]), np.array([0, 1], dtype=np.uint8), np.array([5, 6], dtype=np.uint16))
+    segment.append(np.array([T0 + 1]), np.array([0], dtype=np.uint8), np.array([7], dtype=np.uint16))
+    segment.close()
+    with open(path, "rb") as f:
+        _, capacity, count, created, t_min, t_max, ordered = HEADER.unpack(f.read(HEADER.size))
+    assert (capacity, count, created, t_min, t_max, ordered) == (16, 3, T0, T0 + 1, T0 + 3, 0)
+    reopened = Segment(path)
+    assert reopened.count == 3 and reopened.free == 13
+    assert reopened.columns()[2].tolist() == [5, 6, 7]
+    reopened.close()
@@ -0,0 +1,167 @@
+"""Tes CommandWriter dengan port palsu: penggabungan OUTn / INm, verifikasi DI dan berhenti."""
+import threading
+import time
+
+import pytest
+
+from commands import CommandWriter, adc_mask_command, parse_adc_mask_command, parse_output_command, sample_period_command
+
+
+class FakeSerial:
+    """Mencatat perintah yang ditulis; write() menunggu gate agar writer bisa ditahan."""
+
+    def __init__(self):
+        self.lines = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event() # write() sedang berjalan
+
+    def write(self, data):
+        self.entered.set()
+        self.gate.wait(5.0)
+        self.lines.append(data.decode().strip())
+        return len(data)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def stalled():
+    """Writer yang sedang tertahan di write("ADC_Set")."""
+    ser = FakeSerial()
+    ser.gate.clear()
+    writer = CommandWriter()
+    writer.start(ser)
+    writer.send("ADC_Set")
+    assert ser.entered.wait(2.0)
+    yield writer, ser
+    ser.gate.set()
+    writer.stop()
+
+
+def test_output_commands_are_coalesced(stalled):
+    writer, ser = stalled
+    for command in ("OUT11", "OUT10", "OUT21", "OUT11"):
+        assert writer.send(command)
+    assert writer.pending() == 2
+    assert writer.pending_output(1) == 1
+    assert writer.coalesced == 2
+    ser.gate.set()
+    wait_for(lambda: len(ser.lines) == 3)
+    assert ser.lines == ["ADC_Set", "OUT11", "OUT21"]
+    assert writer.pending_output(1) is None
+
+
+def test_queue_is_bounded_for_plain_commands():
+    ser = FakeSerial()
+    ser.gate.clear()
+    writer = CommandWriter(max_pending=3)
+    writer.start(ser)
+    writer.send("ADC_Set")
+    assert ser.entered.wait(2.0)
+    assert [writer.send("ADC0") for _ in range(4)] == [True, True, True, False]
+    assert writer.send("OUT11") # OUTn tidak dihitung di batas antrian
+    assert writer.dropped == 1
+    ser.gate.set()
+    writer.stop()
+    assert ser.lines == ["ADC_Set", "ADC0", "ADC0", "ADC0", "OUT11"]
+
+
+def test_on_write_reports_the_write_time():
+    ser = FakeSerial()
+    written = []
+    writer = CommandWriter(on_write=lambda command, t: written.append((command, t)))
+    writer.start(ser)
+    before = time.time()
+    writer.send("OUT31")
+    wait_for(lambda: written)
+    writer.stop()
+    assert written[0][0] == "OUT31"
+    assert before <= written[0][1] <= time.time()
+
+
+def test_output_is_verified_through_feedback_input():
+    ser = FakeSerial()
+    writer = CommandWriter(feedback={1: (2, False)}, verify_timeout=5.0)
+    writer.start(ser)
+    writer.send("OUT11")
+    wait_for(lambda: ser.lines[-1:] == ["IN2"])
+    assert ser.lines == ["DI_Set", "OUT11", "IN2"]
+    writer.notify_inputs([2], [1])
+    assert writer.verified == 1 and writer.failures == 0
+    writer.stop()
+
+
+def test_inverted_feedback():
+    ser = FakeSerial()
+    writer = CommandWriter(feedback={1: (0, True)}, verify_timeout=5.0)
+    writer.start(ser)
+    writer.send("OUT11")
+    wait_for(lambda: "IN0" in ser.lines)
+    writer.notify_inputs([0], [1]) # Kontak terbalik: OUT1=1 -> IN0=0
+    assert writer.verified == 0
+    writer.notify_inputs([0], [0])
+    assert writer.verified == 1
+    writer.stop()
+
+
+def test_unverified_output_is_resent_then_reported():
+    ser = FakeSerial()
+    failures = []
+    writer = CommandWriter(feedback={1: (2, False)}, on_failure=lambda *args: failures.append(args),
+                           verify_timeout=0.05, verify_retries=1)
+    writer.start(ser)
+    writer.send("OUT10")
+    wait_for(lambda: failures)
+    writer.stop()
+    assert failures == [(1, 0, 2)]
+    assert ser.lines.count("OUT10") == 2 # Kirim awal + satu kirim ulang
+    assert writer.retries == 1 and writer.failures == 1 and writer.verified == 0
+
+
+def test_input_polls_are_coalesced(stalled):
+    writer, ser = stalled
+    writer.feedback = {1: (2, False), 2: (1, False)}
+    writer.verify_timeout = 30.0
+    ser.gate.set()
+    writer.send("OUT11")
+    writer.send("OUT21")
+    wait_for(lambda: ser.lines.count("IN2") and ser.lines.count("IN1"))
+    ser.entered.clear()
+    ser.gate.clear()
+    writer.send("ADC0") # Tahan writer lagi
+    assert ser.entered.wait(2.0)
+    for _ in range(1000):
+        writer.notify_inputs([1, 2], [0, 0])
+    assert writer.pending() == 2 # Satu INm per channel, bukan satu per batch
+    ser.gate.set()
+    wait_for(lambda: writer.pending() == 0)
+    assert ser.lines[-2:] in (["IN1", "IN2"], ["IN2", "IN1"])
+
+
+def test_stop_writes_the_popped_command(stalled):
+    writer, ser = stalled
+    writer.send("OUT21")
+    stopper = threading.Thread(target=writer.stop, kwargs={"flush_timeout": 0})
+    stopper.start()
+    wait_for(lambda: writer._stop)
+    ser.gate.set()
+    stopper.join(2.0)
+    assert ser.lines == ["ADC_Set", "OUT21"]
+
+
+def test_command_helpers():
+    assert parse_output_command("OUT31") == (3, 1)
+    assert parse_output_command("ADC_Set") is None
+    assert adc_mask_command([0, 2]) == "ADC_Mask=5"
+    assert parse_adc_mask_command("ADC_Mask=5") == [0, 2]
+    assert sample_period_command(100) == "ADC_Period=100"
+    with pytest.raises(ValueError):
+        adc_mask_command([7])
+    with pytest.raises(ValueError):
+        sample_period_command(5)
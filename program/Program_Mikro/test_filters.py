@@ -0,0 +1,107 @@
+"""Tes filter sinyal: hasil per batch harus sama dengan pemrosesan sampel satu per satu."""
+import numpy as np
+import pytest
+
+from filters import Debounce, EMAFilter, MedianFilter, SignalFilters, SpikeFilter, make_filter
+from samples import SAMPLE_DTYPE, SampleBatch
+
+
+def reference_median(x, window):
+    history = [x[0]] * (window - 1)
+    out = []
+    for value in x:
+        history.append(value)
+        out.append(float(np.median(history[-window:])))
+    return np.array(out)
+
+
+def reference_spike(x, window, max_delta):
+    median = reference_median(x, window)
+    return np.array([m if abs(v - m) > max_delta else v for v, m in zip(x, median)])
+
+
+def reference_ema(x, alpha):
+    y = x[0]
+    out = []
+    for value in x:
+        y = y + alpha * (value - y)
+        out.append(y)
+    return np.array(out)
+
+
+def reference_debounce(t, x, hold_s):
+    out_value, value, since = x[0], x[0], t[0]
+    out = []
+    for ti, xi in zip(t, x):
+        if xi != value:
+            value, since = xi, ti
+        if ti - since >= hold_s:
+            out_value = value
+        out.append(out_value)
+    return np.array(out)
+
+
+def signal(n=1500, seed=0):
+    rnd = np.random.default_rng(seed)
+    t = np.cumsum(rnd.uniform(0.01, 0.2, n))
+    x = np.round(500 + 200 * np.sin(t / 3) + rnd.normal(0, 10, n))
+    x[rnd.integers(0, n, 20)] += 400 # Spike
+    return t, x
+
+
+def in_chunks(make, t, x, seed=1):
+    """Hasil filter baru yang diberi sampel dalam potongan acak (termasuk potongan 1 sampel)."""
+    stage = make()
+    rnd = np.random.default_rng(seed)
+    out, start = [], 0
+    while start < len(x):
+        size = int(rnd.choice([1, 2, 7, 64, 300]))
+        out.append(stage.apply(t[start:start + size], x[start:start + size]))
+        start += size
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("make, reference", [
+    (lambda: MedianFilter(5), lambda t, x: reference_median(x, 5)),
+    (lambda: MedianFilter(1), lambda t, x: x),
+    (lambda: SpikeFilter(7, 50), lambda t, x: reference_spike(x, 7, 50)),
+    (lambda: EMAFilter(0.2), lambda t, x: reference_ema(x, 0.2)),
+    (lambda: EMAFilter(0.01), lambda t, x: reference_ema(x, 0.01)),
+    (lambda: EMAFilter(1.0), lambda t, x: x),
+])
+def test_chunked_matches_reference(make, reference):
+    t, x = signal()
+    expected = reference(t, x)
+    np.testing.assert_allclose(make().apply(t, x), expected, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(in_chunks(make, t, x), expected, rtol=1e-9, atol=1e-6)
+
+
+def test_debounce_chunked_matches_reference():
+    rnd = np.random.default_rng(2)
+    t = np.cumsum(rnd.uniform(0.05, 0.3, 2000))
+    x = (rnd.random(2000) < 0.3).astype(float)
+    x[500:700] = 1.0 # Run panjang yang harus lolos
+    expected = reference_debounce(t, x, 0.5)
+    assert expected[650] == 1.0
+    np.testing.assert_array_equal(Debounce(0.5).apply(t, x), expected)
+    np.testing.assert_array_equal(in_chunks(lambda: Debounce(0.5), t, x), expected)
+
+
+def test_make_filter_rejects_unknown_type():
+    assert isinstance(make_filter({"type": "ema", "alpha": 0.5}), EMAFilter)
+    with pytest.raises(ValueError):
+        make_filter({"type": "kalman"})
+
+
+def test_signal_filters_only_touch_configured_channels():
+    records = np.zeros(6, dtype=SAMPLE_DTYPE)
+    records['timestamp'] = np.arange(6)
+    records['channel'] = [0, 1, 0, 1, 0, 1]
+    records['value'] = [100, 7, 100, 7, 700, 7]
+    batch = SampleBatch(records, received=1.0)
+    filters = SignalFilters({"ADC0": [{"type": "median", "window": 3}], "IN0": [{"type": "debounce", "hold_s": 1}]})
+    filtered = filters.apply(batch)
+    assert filtered.channel(0)['value'].tolist() == [100, 100, 100]
+    assert filtered.channel(1)['value'].tolist() == [7, 7, 7]
+    assert batch.adc['value'].tolist() == [100, 7, 100, 7, 700, 7] # Batch asli tidak diubah
+    assert SignalFilters().apply(batch) is batch
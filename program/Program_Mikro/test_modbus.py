@@ -0,0 +1,124 @@
+"""Tes handle_pdu terhadap ModbusImage dari engine palsu (tanpa port serial dan tanpa socket)."""
+import struct
+
+import pytest
+
+import modbus
+from modbus import ModbusImage, handle_pdu
+
+
+class FakeCalibration:
+    def convert(self, ch, value):
+        return value / 1000 # count -> m / Bar, agar register mm / mbar = count
+
+
+class FakeEngine:
+    """Atribut yang dibaca ModbusImage dan API tulis yang dipanggil handle_pdu."""
+
+    def __init__(self):
+        self.calibration = FakeCalibration()
+        self.adc_values = {f"ADC{ch}": 100 + ch for ch in range(5)}
+        self.di_values = {"IN0": 1, "IN1": 0, "IN2": 1}
+        self.outputs = {1: 1, 2: 0, 3: 1, 4: 0}
+        self.mode = modbus.MODE_MANUAL
+        self.state = 0
+        self.accept = True
+        self.calls = []
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def set_output(self, output, state):
+        self.calls.append(("output", output, bool(state)))
+        return self.accept
+
+    def set_mode(self, mode):
+        self.calls.append(("mode", mode))
+
+
+@pytest.fixture
+def image():
+    return ModbusImage(FakeEngine())
+
+
+def registers(response):
+    assert response[1] == len(response) - 2
+    return list(struct.unpack(f">{(len(response) - 2) // 2}H", response[2:]))
+
+
+@pytest.mark.parametrize("function", [modbus.READ_HOLDING_REGISTERS, modbus.READ_INPUT_REGISTERS])
+def test_read_registers(image, function):
+    response = handle_pdu(image, struct.pack(">BHH", function, 0, modbus.REGISTER_COUNT))
+    assert response[0] == function
+    values = registers(response)
+    assert values[:12] == [100, 101, 102, 103, 104, 1, 0, 1, 1, 0, 1, 0]
+    assert values[modbus.REG_MODE] == modbus.MODE_MANUAL
+    assert values[modbus.REG_LEVEL_MM] == 100 + modbus.CH_WATER_LEVEL
+    assert values[modbus.REG_PRESSURE_MBAR] == 100 + modbus.CH_PRESSURE
+    assert (values[modbus.REG_SEQUENCE] << 16) | values[modbus.REG_SEQUENCE + 1] == image.sequence
+    assert registers(handle_pdu(image, struct.pack(">BHH", function, 3, 2))) == [103, 104]
+
+
+def test_snapshot_refreshes_on_engine_events(image):
+    engine = image.engine
+    engine.adc_values["ADC0"] = 555
+    assert registers(handle_pdu(image, struct.pack(">BHH", 3, 0, 1))) == [100] # Snapshot lama
+    for callback in engine.callbacks:
+        callback((modbus.EVENT_BATCH, None))
+    assert registers(handle_pdu(image, struct.pack(">BHH", 3, 0, 1))) == [555]
+    image.close()
+    assert engine.callbacks == []
+
+
+def test_read_bits(image):
+    assert handle_pdu(image, struct.pack(">BHH", modbus.READ_COILS, 0, 4)) == bytes((1, 1, 0b0101))
+    assert handle_pdu(image, struct.pack(">BHH", modbus.READ_COILS, 1, 3)) == bytes((1, 1, 0b010))
+    assert handle_pdu(image, struct.pack(">BHH", modbus.READ_DISCRETE_INPUTS, 0, 3)) == bytes((2, 1, 0b101))
+
+
+@pytest.mark.parametrize("pdu, code", [
+    (struct.pack(">BHH", 3, 0, 0), modbus.ILLEGAL_DATA_VALUE),
+    (struct.pack(">BHH", 3, 0, 126), modbus.ILLEGAL_DATA_VALUE),
+    (struct.pack(">BHH", 4, modbus.REGISTER_COUNT - 1, 2), modbus.ILLEGAL_DATA_ADDRESS),
+    (struct.pack(">BHH", 1, 2, 3), modbus.ILLEGAL_DATA_ADDRESS),
+    (struct.pack(">BHH", 2, 0, 4), modbus.ILLEGAL_DATA_ADDRESS),
+    (struct.pack(">BHH", 5, 0, 0x1234), modbus.ILLEGAL_DATA_VALUE),
+    (struct.pack(">BHH", 5, 4, 0xFF00), modbus.ILLEGAL_DATA_ADDRESS),
+    (struct.pack(">BHHB", 15, 0, 4, 2) + b"\x0f\x00", modbus.ILLEGAL_DATA_VALUE),
+    (struct.pack(">BHH", 6, 0, 1), modbus.ILLEGAL_DATA_ADDRESS),
+    (struct.pack(">BHH", 6, modbus.REG_MODE, 2), modbus.ILLEGAL_DATA_VALUE),
+    (struct.pack(">BHHBH", 16, modbus.REG_MODE, 2, 4, 1), modbus.ILLEGAL_DATA_VALUE),
+    (bytes((3, 0)), modbus.ILLEGAL_DATA_VALUE), # PDU terpotong
+    (bytes((7,)), modbus.ILLEGAL_FUNCTION),
+    (struct.pack(">BHH", 43, 0, 1), modbus.ILLEGAL_FUNCTION),
+])
+def test_exceptions(image, pdu, code):
+    assert handle_pdu(image, pdu) == bytes((pdu[0] | 0x80, code))
+    assert image.engine.calls == []
+
+
+def test_write_single_coil(image):
+    pdu = struct.pack(">BHH", modbus.WRITE_SINGLE_COIL, 2, 0xFF00)
+    assert handle_pdu(image, pdu) == pdu
+    assert handle_pdu(image, struct.pack(">BHH", modbus.WRITE_SINGLE_COIL, 0, 0x0000))[0] == modbus.WRITE_SINGLE_COIL
+    assert image.engine.calls == [("output", 3, True), ("output", 1, False)]
+    image.engine.accept = False # Mis. coil milik logika Auto
+    assert handle_pdu(image, pdu) == bytes((0x85, modbus.SERVER_DEVICE_FAILURE))
+
+
+def test_write_multiple_coils(image):
+    pdu = struct.pack(">BHHB", modbus.WRITE_MULTIPLE_COILS, 1, 3, 1) + bytes((0b101,))
+    assert handle_pdu(image, pdu) == pdu[:5]
+    assert image.engine.calls == [("output", 2, True), ("output", 3, False), ("output", 4, True)]
+
+
+def test_write_mode_register(image):
+    pdu = struct.pack(">BHH", modbus.WRITE_SINGLE_REGISTER, modbus.REG_MODE, modbus.MODE_AUTO)
+    assert handle_pdu(image, pdu) == pdu
+    pdu = struct.pack(">BHHBH", modbus.WRITE_MULTIPLE_REGISTERS, modbus.REG_MODE, 1, 2, modbus.MODE_MANUAL)
+    assert handle_pdu(image, pdu) == struct.pack(">BHH", modbus.WRITE_MULTIPLE_REGISTERS, modbus.REG_MODE, 1)
+    assert image.engine.calls == [("mode", modbus.MODE_AUTO), ("mode", modbus.MODE_MANUAL)]
@@ -0,0 +1,121 @@
+"""Tes parser telemetri: jalur burst kecil, jalur vektor dan parser regex harus sama persis."""
+import random
+
+import numpy as np
+import pytest
+
+import telemetry
+from telemetry import SMALL_BUFFER_BYTES, parse_buffer
+
+
+def assert_same(a, b):
+    (batch_a, consumed_a), (batch_b, consumed_b) = a, b
+    assert consumed_a == consumed_b
+    assert batch_a.malformed == batch_b.malformed
+    assert batch_a.adc.tolist() == batch_b.adc.tolist()
+    assert batch_a.di.tolist() == batch_b.di.tolist()
+
+
+def vector_parse(data, timestamp):
+    """Jalur vektor untuk buffer sekecil apa pun: padding baris kosong di depan."""
+    padding = b"\n" * SMALL_BUFFER_BYTES
+    batch, consumed = parse_buffer(padding + data, timestamp)
+    return batch, max(consumed - len(padding), 0)
+
+
+@pytest.mark.parametrize("data", [
+    b"ADC0=512\r\nADC1=3\r\nIN2=1\r\n",
+    b"ADC4=1023\nIN0=0\n",
+    b"IN1=1\r\nADC0=7\r\nIN1=0\r\nADC3=65535\r\n",
+])
+def test_valid_lines(data):
+    batch, consumed = parse_buffer(data, 10.0)
+    assert consumed == len(data)
+    assert batch.malformed == 0
+    lines = data.replace(b"\r", b"").split(b"\n")[:-1]
+    adc = [(10.0, int(l[3:4]), int(l[5:])) for l in lines if l.startswith(b"ADC")]
+    di = [(10.0, int(l[2:3]), int(l[4:])) for l in lines if l.startswith(b"IN")]
+    assert batch.adc.tolist() == adc
+    assert batch.di.tolist() == di
+    assert_same((batch, consumed), vector_parse(data, 10.0))
+
+
+@pytest.mark.parametrize("line", [
+    b"ADCx=1", b"ADC1=", b"ADC1=12a", b"ADC12=5", b"IN=1", b"FOO", b"ADC1=70000", b"ADC1=123456", b"=5", b"ADC1 5",
+])
+def test_malformed_lines_are_counted(line):
+    data = b"ADC0=1\r\n" + line + b"\r\nIN0=1\r\n"
+    batch, consumed = parse_buffer(data, 1.0)
+    assert consumed == len(data)
+    assert batch.malformed == 1
+    assert batch.adc.tolist() == [(1.0, 0, 1)]
+    assert batch.di.tolist() == [(1.0, 0, 1)]
+    assert_same((batch, consumed), vector_parse(data, 1.0))
+
+
+def test_empty_lines_are_not_malformed():
+    data = b"\r\nADC0=1\r\n\n\r\n"
+    batch, consumed = parse_buffer(data, 1.0)
+    assert consumed == len(data)
+    assert batch.malformed == 0
+    assert len(batch) == 1
+
+
+@pytest.mark.parametrize("data, consumed", [
+    (b"", 0),
+    (b"ADC0=5", 0),
+    (b"ADC0=5\r\nADC1=", 8),
+    (b"ADC0=5\r\nADC1=6\r", 8),
+])
+def test_partial_line_is_left_for_the_caller(data, consumed):
+    batch, n = parse_buffer(data, 1.0)
+    assert n == consumed
+    assert len(batch) == data[:consumed].count(b"\n")
+    assert_same((batch, n), vector_parse(data, 1.0))
+
+
+def test_large_buffer_uses_vector_path():
+    lines = [f"ADC{i % 5}={i % 1024}\r\n".encode() for i in range(500)]
+    data = b"".join(lines) + b"ADC0="
+    assert len(data) >= SMALL_BUFFER_BYTES
+    batch, consumed = parse_buffer(memoryview(data), 2.0)
+    assert consumed == len(data) - 5
+    assert batch.adc['value'].tolist() == [i % 1024 for i in range(500)]
+    assert batch.adc['channel'].tolist() == [i % 5 for i in range(500)]
+
+
+def random_buffer(rnd):
+    lines = []
+    for _ in range(rnd.randint(0, 12)):
+        kind = rnd.random()
+        if kind < 0.6:
+            lines.append(f"ADC{rnd.randint(0, 9)}={rnd.randint(0, 1100)}\r\n")
+        elif kind < 0.85:
+            lines.append(f"IN{rnd.randint(0, 9)}={rnd.randint(0, 1)}\n")
+        elif kind < 0.9:
+            lines.append("\r\n")
+        else:
+            lines.append(rnd.choice(["ADC=1", "IN3=", "ADC1=99999999", "xx", "ADC5=1x"]) + "\r\n")
+    tail = rnd.choice(["", "ADC", "IN1=", "ADC2=3\r"])
+    return ("".join(lines) + tail).encode()
+
+
+def test_small_path_matches_regex_and_vector_paths():
+    rnd = random.Random(1)
+    buffers = [random_buffer(rnd) for _ in range(2000)]
+    telemetry._line_records.clear()
+    for _ in range(2): # Tabel baris kosong, lalu terisi
+        for data in buffers:
+            small = parse_buffer(data, 3.0)
+            assert_same(small, telemetry._parse_lines(data, 3.0))
+            assert_same(small, vector_parse(data, 3.0))
+
+
+def test_small_path_keeps_arrival_order_per_kind():
+    data = b"IN0=1\r\nADC1=2\r\nIN1=0\r\nADC0=3\r\nADC1=4\r\n"
+    parse_buffer(data, 0.0) # Isi tabel baris
+    batch, _ = parse_buffer(data, 5.0)
+    assert batch.adc.tolist() == [(5.0, 1, 2), (5.0, 0, 3), (5.0, 1, 4)]
+    assert batch.di.tolist() == [(5.0, 0, 1), (5.0, 1, 0)]
+    assert batch.adc.dtype == telemetry.SAMPLE_DTYPE
+    assert np.all(batch.adc['timestamp'] == 5.0)
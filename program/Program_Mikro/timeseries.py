@@ -0,0 +1,360 @@
+"""
+Penyimpanan histori time-series berbasis array NumPy yang dialokasikan di awal.
+
+Setiap channel (ADC0..ADC4, IN0..IN2) punya RingBuffer sendiri berisi
+timestamp (float64) dan nilai mentah (uint16). Kapasitas ditentukan dari
+lama histori x laju sampel, sehingga pemakaian memori bisa dihitung sebelum
+aplikasi berjalan (lihat TimeSeriesStore.nbytes).
+
+RingBuffer memakai buffer linear dengan ruang cadangan (slack): data baru
+ditulis di belakang, dan saat buffer penuh, `capacity` sampel terakhir
+digeser ke depan dengan satu memmove. Hasilnya append O(1) teramortisasi dan
+setiap query rentang waktu selalu berupa view kontigu (tanpa salinan),
+dengan biaya memori capacity * (1 + slack_ratio).
+
+Selain data mentah, setiap channel punya piramida rollup (config.ROLLUP_LEVELS:
+1 s, 1 menit, 10 menit, 1 jam) berisi min/max/sum/count per bucket waktu yang
+diperbarui setiap batch. envelope() memilih level paling kasar yang masih
+mengisi lebar plot, jadi biaya query bergantung pada jumlah piksel, bukan
+pada jumlah sampel yang tersimpan: zoom dari 10 detik sampai 7 hari sama cepatnya.
+"""
+import threading
+
+import numpy as np
+
+from config import ADC_CHANNELS, DI_CHANNELS, HISTORY_SECONDS, HISTORY_RATE_HZ, ROLLUP_LEVELS
+from samples import KIND_ADC, KIND_DI
+
+SLACK_RATIO = 0.25 # Ruang cadangan relatif terhadap kapasitas
+
+
+def decimate_minmax(t, y, t_start, t_end, n_bins):
+    """
+    Decimation min/max: setiap kolom piksel (bin waktu) diwakili oleh nilai
+    minimum dan maksimumnya, sehingga puncak sesaat tetap terlihat.
+    t harus urut naik. Mengembalikan (t, y) dengan panjang <= 2 * n_bins.
+    """
+    if len(t) <= 2 * n_bins:
+        return t, y
+    bins = ((t - t_start) * (n_bins / (t_end - t_start))).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bins)) + 1))
+    ends = np.append(starts[1:], len(t)) - 1
+    out_t = np.empty(2 * len(starts))
+    out_y = np.empty(2 * len(starts), dtype=y.dtype)
+    out_t[0::2] = t[starts]
+    out_t[1::2] = t[ends]
+    out_y[0::2] = np.minimum.reduceat(y, starts)
+    out_y[1::2] = np.maximum.reduceat(y, starts)
+    return out_t, out_y
+
+
+class RingBuffer:
+    """Buffer melingkar (timestamp, nilai) dengan view kontigu."""
+
+    def __init__(self, capacity, value_dtype=np.uint16, slack_ratio=SLACK_RATIO):
+        self.capacity = int(capacity)
+        size = self.capacity + max(1, int(self.capacity * slack_ratio))
+        self._timestamps = np.empty(size, dtype=np.float64)
+        self._values = np.empty(size, dtype=value_dtype)
+        self._start = 0 # Data valid ada di [_start, _end)
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def nbytes(self):
+        return self._timestamps.nbytes + self._values.nbytes
+
+    def _make_room(self, n):
+        """Pastikan ada tempat untuk n sampel baru; geser data lama ke depan jika perlu."""
+        if self._end + n <= len(self._timestamps):
+            return
+        keep = min(len(self), self.capacity - n)
+        src = slice(self._end - keep, self._end)
+        self._timestamps[:keep] = self._timestamps[src]
+        self._values[:keep] = self._values[src]
+        self._start, self._end = 0, keep
+
+    def append(self, timestamp, value):
+        """Menambah satu sampel, O(1) teramortisasi."""
+        self._make_room(1)
+        self._timestamps[self._end] = timestamp
+        self._values[self._end] = value
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def extend(self, timestamps, values):
+        """Menambah banyak sampel sekaligus (urut waktu)."""
+        n = len(timestamps)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            timestamps, values, n = timestamps[-self.capacity:], values[-self.capacity:], self.capacity
+        self._make_room(n)
+        end = self._end + n
+        self._timestamps[self._end:end] = timestamps
+        self._values[self._end:end] = values
+        self._end = end
+        self._start = max(self._start, end - self.capacity)
+
+    def timestamps(self):
+        return self._timestamps[self._start:self._end]
+
+    def values(self):
+        return self._values[self._start:self._end]
+
+    def range(self, t_start=None, t_end=None):
+        """
+        View (timestamps, values) untuk t_start <= t < t_end. Timestamp
+        diasumsikan naik (waktu terima burst), jadi pencarian memakai
+        searchsorted, O(log n). View hanya valid sampai append berikutnya.
+        """
+        timestamps = self.timestamps()
+        lo = 0 if t_start is None else int(np.searchsorted(timestamps, t_start, side='left'))
+        hi = len(timestamps) if t_end is None else int(np.searchsorted(timestamps, t_end, side='left'))
+        return timestamps[lo:hi], self.values()[lo:hi]
+
+    def latest(self, n):
+        """View n sampel terakhir."""
+        start = max(self._start, self._end - n)
+        return self._timestamps[start:self._end], self._values[start:self._end]
+
+
+class RollupLevel:
+    """
+    Satu level rollup: per bucket `resolution` detik disimpan waktu awal
+    bucket, min, max, sum dan count. Buffer linear dengan slack seperti
+    RingBuffer; bucket terakhir tetap terbuka dan digabung dengan sampel baru.
+    """
+
+    def __init__(self, resolution, capacity, value_dtype=np.uint16, slack_ratio=SLACK_RATIO):
+        self.resolution = resolution
+        self.capacity = int(capacity)
+        size = self.capacity + max(1, int(self.capacity * slack_ratio))
+        self._t = np.empty(size, dtype=np.float64)
+        self._min = np.empty(size, dtype=value_dtype)
+        self._max = np.empty(size, dtype=value_dtype)
+        self._sum = np.empty(size, dtype=np.float64)
+        self._count = np.empty(size, dtype=np.uint32)
+        self._columns = (self._t, self._min, self._max, self._sum, self._count)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns)
+
+    @property
+    def retention(self):
+        return self.capacity * self.resolution
+
+    def accepts(self, t_first, t_last):
+        """True jika sampel t_first..t_last seluruhnya masuk bucket yang masih terbuka."""
+        if self._end == self._start:
+            return False
+        open_t = self._t[self._end - 1]
+        return open_t <= t_first and t_last < open_t + self.resolution
+
+    def merge_open(self, v_min, v_max, v_sum, count):
+        """Menggabungkan statistik sampel ke bucket terbuka (lihat accepts())."""
+        last = self._end - 1
+        if v_min < self._min[last]:
+            self._min[last] = v_min
+        if v_max > self._max[last]:
+            self._max[last] = v_max
+        self._sum[last] += v_sum
+        self._count[last] += count
+
+    def extend(self, timestamps, values):
+        """Menggabungkan sampel (urut waktu) ke bucket; O(n) vektor per batch."""
+        if len(timestamps) == 0:
+            return
+        buckets = np.floor(timestamps / self.resolution)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        bucket_t = buckets[starts] * self.resolution
+        mins = np.minimum.reduceat(values, starts)
+        maxs = np.maximum.reduceat(values, starts)
+        sums = np.add.reduceat(values, starts, dtype=np.float64)
+        counts = np.diff(np.append(starts, len(values)))
+
+        if self._end > self._start and self._t[self._end - 1] == bucket_t[0]:
+            # Bucket pertama batch ini masih sama dengan bucket terbuka
+            last = self._end - 1
+            self._min[last] = min(self._min[last], mins[0])
+            self._max[last] = max(self._max[last], maxs[0])
+            self._sum[last] += sums[0]
+            self._count[last] += counts[0]
+            bucket_t, mins, maxs, sums, counts = bucket_t[1:], mins[1:], maxs[1:], sums[1:], counts[1:]
+        n = len(bucket_t)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            bucket_t, mins, maxs, sums, counts = (a[-self.capacity:] for a in (bucket_t, mins, maxs, sums, counts))
+            n = self.capacity
+        if self._end + n > len(self._t):
+            keep = min(len(self), self.capacity - n)
+            for column in self._columns:
+                column[:keep] = column[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        end = self._end + n
+        for column, data in zip(self._columns, (bucket_t, mins, maxs, sums, counts)):
+            column[self._end:end] = data
+        self._end = end
+        self._start = max(self._start, end - self.capacity)
+
+    def oldest(self):
+        return self._t[self._start] if len(self) else None
+
+    def range(self, t_start=None, t_end=None):
+        """View (t, min, max, sum, count) untuk bucket dengan t_start <= awal bucket < t_end."""
+        t = self._t[self._start:self._end]
+        lo = 0 if t_start is None else int(np.searchsorted(t, t_start - self.resolution, side='right'))
+        hi = len(t) if t_end is None else int(np.searchsorted(t, t_end, side='left'))
+        lo += self._start
+        hi += self._start
+        return tuple(column[lo:hi] for column in self._columns)
+
+
+class TimeSeriesStore:
+    """
+    Histori semua channel ADC dan DI. Ditulis oleh thread kontrol engine dan
+    dibaca oleh GUI; pembaca yang memakai view harus memegang `lock`, atau
+    memakai query() yang mengembalikan salinan.
+    """
+
+    def __init__(self, seconds=HISTORY_SECONDS, rate_hz=HISTORY_RATE_HZ, rollup_levels=ROLLUP_LEVELS):
+        capacity = int(seconds * rate_hz)
+        self.lock = threading.RLock()
+        self.buffers = {}
+        self.rollups = {} # (kind, ch) -> [RollupLevel], halus -> kasar
+        channels = [(KIND_ADC, ch, np.uint16) for ch in range(ADC_CHANNELS)] + [(KIND_DI, ch, np.uint8) for ch in range(DI_CHANNELS)]
+        for kind, ch, dtype in channels:
+            self.buffers[(kind, ch)] = RingBuffer(capacity, value_dtype=dtype)
+            self.rollups[(kind, ch)] = [
+                RollupLevel(resolution, (seconds if retention is None else retention) // resolution, value_dtype=dtype)
+                for resolution, retention in rollup_levels
+            ]
+
+    @property
+    def nbytes(self):
+        """Total memori yang dialokasikan (byte), tetap sejak awal."""
+        raw = sum(buffer.nbytes for buffer in self.buffers.values())
+        return raw + sum(level.nbytes for levels in self.rollups.values() for level in levels)
+
+    def extend_batch(self, batch):
+        """Memasukkan semua sampel dari satu SampleBatch."""
+        with self.lock:
+            for kind in (KIND_ADC, KIND_DI):
+                records = batch.records(kind)
+                if len(records) == 0:
+                    continue
+                for ch, channel_records in batch.channels(kind).items():
+                    buffer = self.buffers.get((kind, ch))
+                    if buffer is not None:
+                        buffer.extend(channel_records['timestamp'], channel_records['value'])
+                        self._extend_rollups(self.rollups[(kind, ch)], channel_records['timestamp'], channel_records['value'])
+
+    @staticmethod
+    def _extend_rollups(levels, timestamps, values):
+        # Batas bucket semua level sejajar (kelipatan resolusi terhalus): jika
+        # batch masuk bucket terbuka level terhalus, batch juga masuk bucket
+        # terbuka semua level lain, cukup hitung min/max/sum sekali.
+        if levels and levels[0].accepts(timestamps[0], timestamps[-1]):
+            stats = (values.min(), values.max(), float(values.sum()), len(values))
+            for level in levels:
+                level.merge_open(*stats)
+        else:
+            for level in levels:
+                level.extend(timestamps, values)
+
+    def buffer(self, ch, kind=KIND_ADC):
+        return self.buffers[(kind, ch)]
+
+    def query(self, ch, t_start=None, t_end=None, kind=KIND_ADC):
+        """Salinan (timestamps, values) untuk rentang waktu, aman dipakai di thread lain."""
+        with self.lock:
+            timestamps, values = self.buffers[(kind, ch)].range(t_start, t_end)
+            return timestamps.copy(), values.copy()
+
+    def pick_level(self, ch, t_start, t_end, n_points, kind=KIND_ADC):
+        """
+        Level rollup paling kasar yang masih memberi >= n_points bucket untuk
+        rentang ini dan masih menyimpan t_start, atau None jika data mentah
+        lebih tepat (rentang pendek). Jika awal rentang sudah dibuang dari
+        level itu, dipakai level paling halus yang masih mencakupnya.
+        """
+        span = t_end - t_start
+        levels = self.rollups[(kind, ch)]
+        if not levels:
+            return None
+        covering = [level for level in levels if len(level) and level.oldest() <= t_start]
+        for level in reversed(covering):
+            if span / level.resolution >= n_points:
+                return level
+        buffer = self.buffers[(kind, ch)]
+        if span / levels[0].resolution < n_points and len(buffer) and buffer.timestamps()[0] <= t_start:
+            return None # Rentang pendek yang masih ada di data mentah
+        if covering:
+            return covering[0]
+        return levels[-1] if len(levels[-1]) else None
+
+    def rollup(self, ch, t_start, t_end, n_points, kind=KIND_ADC):
+        """
+        Salinan statistik per bucket untuk rentang waktu pada level yang
+        dipilih pick_level(): (resolusi detik, t awal bucket, min, max, mean,
+        count). Resolusi 0 berarti data mentah (satu sampel per baris).
+        """
+        with self.lock:
+            level = self.pick_level(ch, t_start, t_end, n_points, kind)
+            if level is None:
+                t, values = self.buffers[(kind, ch)].range(t_start, t_end)
+                return 0, t.copy(), values.copy(), values.copy(), values.astype(np.float64), np.ones(len(t), dtype=np.uint32)
+            t, mins, maxs, sums, counts = level.range(t_start, t_end)
+            return level.resolution, t.copy(), mins.copy(), maxs.copy(), sums / counts, counts.copy()
+
+    def envelope(self, ch, t_start, t_end, n_bins, kind=KIND_ADC):
+        """
+        (t, nilai mentah) min/max untuk digambar dengan lebar n_bins piksel,
+        panjang <= ~2 * n_bins. Rentang pendek diambil dari data mentah
+        (decimate_minmax); rentang panjang dari level rollup yang dipilih.
+        """
+        with self.lock:
+            level = self.pick_level(ch, t_start, t_end, n_bins, kind)
+            if level is None:
+                t, values = self.buffers[(kind, ch)].range(t_start, t_end)
+                t, values = decimate_minmax(t, values, t_start, t_end, n_bins)
+                return t.copy(), values.copy()
+            t, mins, maxs, _, _ = level.range(t_start, t_end)
+            t_last = np.minimum(t + level.resolution, t_end) # Akhir setiap bucket
+            if len(t) > n_bins:
+                # Level terpilih bisa sampai ~60x lebih rapat dari piksel: gabungkan per kolom piksel
+                bins = ((t - t_start) * (n_bins / (t_end - t_start))).astype(np.int64)
+                starts = np.concatenate(([0], np.flatnonzero(np.diff(bins)) + 1))
+                ends = np.append(starts[1:], len(t)) - 1
+                t, t_last = t[starts], t_last[ends]
+                mins, maxs = np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts)
+            out_t = np.empty(2 * len(t))
+            out_y = np.empty(2 * len(t), dtype=mins.dtype)
+            out_t[0::2] = t
+            out_t[1::2] = t_last
+            out_y[0::2] = mins
+            out_y[1::2] = maxs
+            return out_t, out_y
+
+    def time_span(self):
+        """
+        (timestamp tertua, timestamp terbaru) di semua channel, atau None jika
+        kosong. Yang tertua termasuk bucket rollup yang retensinya lebih
+        panjang dari histori mentah.
+        """
+        with self.lock:
+            spans = [(b.timestamps()[0], b.timestamps()[-1]) for b in self.buffers.values() if len(b)]
+            oldest = [level.oldest() for levels in self.rollups.values() for level in levels if len(level)]
+        if not spans:
+            return None
+        return min([s[0] for s in spans] + oldest), max(s[1] for s in spans)